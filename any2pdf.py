@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+一括変換CLI
+
+入力ディレクトリ以下のOfficeファイル・画像・PDFを並列にPDFへ変換し、
+同じディレクトリ構成で出力ディレクトリに書き出します。
+変換結果は出力ディレクトリのマニフェストに記録され、再実行時は変更の無いファイルを飛ばします。
+
+    python any2pdf.py /mnt/share/docs /mnt/share/docs_pdf --workers 8
+
+--watch を指定すると、入力ディレクトリを監視し、置かれたファイルを書き込みが終わったものから変換し続けます。
+    python any2pdf.py /mnt/share/inbox /mnt/share/outbox --watch --folder /mnt/share/inbox2 /mnt/share/outbox2
+"""
+
+import argparse
+import logging
+import signal
+import sys
+
+from app import config
+from app.bulk import BulkConverter
+from app.image_profiles import image_profile_names
+from app.logging_setup import setup_logging
+from app.office_pool import get_office_pool, shutdown_office_pool
+from app.watcher import WatchFolderDaemon
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description="ディレクトリツリーの一括PDF変換")
+    parser.add_argument('source', help="入力ディレクトリ")
+    parser.add_argument('output', help="出力ディレクトリ（入力と同じディレクトリ構成で書き出す）")
+    parser.add_argument('--workers', type=int, default=config.BULK_WORKERS,
+                        help="同時に変換するファイル数（ANY2PDF_BULK_WORKERS）")
+    parser.add_argument('--optimize', action='store_true', default=config.PDF_OPTIMIZE,
+                        help="変換後にPDFを最適化する（ANY2PDF_PDF_OPTIMIZE）")
+    parser.add_argument('--profile', choices=image_profile_names(), help="画像の縮小・再圧縮のプロファイル")
+    parser.add_argument('--manifest', help="マニフェストのパス（省略時は 出力ディレクトリ/.any2pdf-manifest.sqlite3）")
+    parser.add_argument('--force', action='store_true', help="変更の無いファイルも変換し直す")
+    parser.add_argument('--retry-failed', action='store_true', help="前回失敗したファイルを変換し直す")
+    parser.add_argument('--verbose', action='store_true', help="変換ごとのログを表示する")
+    parser.add_argument('--watch', action='store_true', help="入力ディレクトリを監視し、置かれたファイルを変換し続ける")
+    parser.add_argument('--folder', nargs=2, action='append', default=[], metavar=('SOURCE', 'OUTPUT'),
+                        help="--watch で監視する入力・出力ディレクトリを追加する（複数指定可）")
+    parser.add_argument('--settle', type=float, default=config.WATCH_SETTLE_SECONDS,
+                        help="書き込みが終わったとみなすまでの変化の無い時間（秒、ANY2PDF_WATCH_SETTLE_SECONDS）")
+    parser.add_argument('--poll', action='store_true', help="inotifyを使わず、定期的な走査で監視する")
+    return parser.parse_args()
+
+
+def watch(args):
+    """監視フォルダの変換デーモンを実行"""
+    daemon = WatchFolderDaemon(
+        [(args.source, args.output)] + [tuple(folder) for folder in args.folder], workers=args.workers,
+        settle_seconds=args.settle, use_inotify=not args.poll, stream=sys.stdout,
+        optimize=args.optimize, profile=args.profile
+    )
+    # SIGTERMでも変換中のファイルの完了を待ってから終了する
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    try:
+        get_office_pool()
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"フォルダ監視エラー: {e}")
+        sys.exit(1)
+    finally:
+        shutdown_office_pool()
+
+
+def main():
+    """一括変換のメイン関数"""
+    args = parse_args()
+    # 変換ごとのログは進捗表示の妨げになるため、既定では警告以上だけをコンソールに表示する
+    setup_logging(log_file='', level='INFO' if args.verbose else 'WARNING')
+    if args.watch:
+        watch(args)
+        return
+
+    converter = BulkConverter(
+        args.source, args.output, workers=args.workers, manifest_path=args.manifest, force=args.force,
+        retry_failed=args.retry_failed, stream=sys.stdout, optimize=args.optimize, profile=args.profile
+    )
+    try:
+        # LibreOfficeワーカープールを事前に起動
+        get_office_pool()
+        summary = converter.run()
+    except KeyboardInterrupt:
+        print("中断しました。もう一度実行すると続きから変換します", file=sys.stderr)
+        sys.exit(130)
+    except Exception as e:
+        logger.error(f"一括変換エラー: {e}")
+        sys.exit(1)
+    finally:
+        shutdown_office_pool()
+
+    print(
+        f"完了: 成功 {summary['succeeded']}, 失敗 {summary['failed']}, 未対応 {summary['unsupported']}, "
+        f"変更なし {summary['skipped']}（{summary['elapsed_seconds']} 秒）"
+    )
+    sys.exit(1 if summary['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+APIサーバー共通の処理
+Flask（api_server）とASGI（asgi_server）の両方で使う、受け付けるファイル形式・オプションの解析・
+ZIPの作成と展開などのWebフレームワークに依存しない処理
+"""
+
+import json
+import os
+import re
+import zipfile
+from typing import Any, Dict, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from . import config
+from .exceptions import InvalidOptionError, PageRangeError
+from .formats import KIND_IMAGE, KIND_OFFICE, KIND_PDF, extensions_for
+from .pdf_splitter import parse_page_ranges, split_pdf, write_split_archive
+from .spreadsheet import check_spreadsheet_options, parse_spreadsheet_options
+from .uploads import UploadTooLargeError
+
+# 許可されるファイル拡張子（変換の振り分けは拡張子ではなくファイルの内容で行う）
+ALLOWED_OFFICE_EXTENSIONS = set(extensions_for(KIND_OFFICE))
+ALLOWED_IMAGE_EXTENSIONS = set(extensions_for(KIND_IMAGE))
+ALLOWED_ARCHIVE_EXTENSIONS = {'zip'}
+
+# ZIPアーカイブから画像を展開する際の読み込み単位
+_ZIP_CHUNK_SIZE = 1024 * 1024
+
+# 単一ファイルの変換で受け付ける内容の種類
+# （拡張子がOfficeファイルでも中身が画像なら画像として、PDFならそのまま返す）
+OFFICE_ENDPOINT_KINDS = (KIND_OFFICE, KIND_IMAGE, KIND_PDF)
+IMAGE_ENDPOINT_KINDS = (KIND_IMAGE, KIND_PDF)
+
+# 形式ごとのアップロードサイズ上限
+UPLOAD_LIMITS = {
+    **{ext: config.UPLOAD_MAX_OFFICE_BYTES for ext in ALLOWED_OFFICE_EXTENSIONS},
+    **{ext: config.UPLOAD_MAX_IMAGE_BYTES for ext in ALLOWED_IMAGE_EXTENSIONS},
+    **{ext: config.UPLOAD_MAX_ARCHIVE_BYTES for ext in ALLOWED_ARCHIVE_EXTENSIONS},
+}
+
+
+def allowed_file(filename: str, allowed_extensions: set) -> bool:
+    """
+    ファイル名が許可された拡張子を持つかチェック
+    
+    Args:
+        filename: チェックするファイル名
+        allowed_extensions: 許可された拡張子のセット
+    
+    Returns:
+        bool: 許可されている場合True
+    """
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+
+def natural_sort_key(name: str) -> list:
+    """
+    数字を数値として比較するソートキー（page2 < page10）
+
+    Args:
+        name: ファイル名
+
+    Returns:
+        list: ソートキー
+    """
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def request_outcome(status_code: int) -> str:
+    """ステータスコードをメトリクス用の結果に分類"""
+    if status_code < 400:
+        return 'success'
+    if status_code < 500:
+        return 'client_error'
+    return 'server_error'
+
+
+def parse_optimize_option(value: Optional[str]) -> Optional[bool]:
+    """
+    `optimize` の値を真偽値に変換
+
+    Returns:
+        bool: 指定された値（未指定の場合は設定の既定値、不正な値の場合はNone）
+    """
+    if value is None or value.strip() == '':
+        return config.PDF_OPTIMIZE
+    value = value.strip().lower()
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off'):
+        return False
+    return None
+
+
+def parse_split_options(split_pages: Optional[str], page_ranges: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    `split_pages`・`page_ranges` から分割の指定を作成
+
+    Returns:
+        dict: split_pdf に渡すオプション（分割しない場合はNone）
+
+    Raises:
+        PageRangeError: 指定が不正な場合
+    """
+    split_pages = (split_pages or '').strip()
+    page_ranges = (page_ranges or '').strip()
+    if not split_pages and not page_ranges:
+        return None
+    if split_pages and page_ranges:
+        raise PageRangeError("split_pages と page_ranges は同時に指定できません")
+    if page_ranges:
+        # ページ数に依存しない形式の誤りは変換前に検出する
+        parse_page_ranges(page_ranges)
+        return {'page_ranges': page_ranges}
+    try:
+        chunk_pages = int(split_pages)
+    except ValueError:
+        chunk_pages = 0
+    if chunk_pages < 1:
+        raise PageRangeError("split_pages には1以上の整数を指定してください")
+    return {'chunk_pages': chunk_pages}
+
+
+def spreadsheet_options_for(filename: str, sheets: Optional[str], print_area: Optional[str],
+                            max_rows: Optional[str], max_cols: Optional[str]) -> Dict[str, Any]:
+    """
+    スプレッドシートの変換範囲の指定を解析し、ファイル形式が対応しているか確認
+
+    Returns:
+        dict: convert_office_file_to_pdf に渡すオプション（指定が無い場合は空）
+
+    Raises:
+        SpreadsheetOptionError: 指定が不正な場合、または .xlsx 以外のファイルに指定された場合
+    """
+    options = parse_spreadsheet_options(sheets, print_area, max_rows, max_cols)
+    check_spreadsheet_options(filename, options)
+    return options
+
+
+def build_split_archive(pdf_path: str, output_dir: str, download_base: str, split: Dict[str, Any]) -> Tuple[str, int]:
+    """
+    PDFを分割し、チャンクのPDFと一覧（manifest.json）をまとめたZIPを作業ディレクトリに作成
+
+    Args:
+        download_base: ダウンロード時のファイル名（拡張子なし。チャンクのファイル名の接頭辞になる）
+
+    Returns:
+        tuple: (ZIPのパス, チャンク数)
+    """
+    chunks = split_pdf(pdf_path, os.path.join(output_dir, 'chunks'), base_name=secure_filename(download_base) or None,
+                       **split)
+    archive_path = os.path.join(output_dir, 'chunks.zip')
+    with open(archive_path, 'wb') as archive:
+        write_split_archive(archive, chunks, f"{download_base}.pdf")
+    return archive_path, len(chunks)
+
+
+def merge_batch_results(results: list, saved: list, converted: list) -> Dict[str, str]:
+    """
+    一括変換の結果を results に反映し、ダウンロード用のファイル名を割り当てる
+
+    Args:
+        results: ファイルごとの結果（保存したファイルの位置は None）
+        saved: (results内の位置, 元のファイル名, 保存先のパス) のリスト
+        converted: convert_office_files_to_pdf の戻り値
+
+    Returns:
+        Dict[str, str]: ダウンロード用のファイル名とPDFのパス（同名ファイルには連番を付与）
+    """
+    used_names = set()
+    pdf_paths = {}
+    for (position, filename, _), result in zip(saved, converted):
+        pdf_name = None
+        if result['success']:
+            original_name = os.path.splitext(filename)[0]
+            pdf_name = f"{original_name}.pdf"
+            counter = 2
+            while pdf_name in used_names:
+                pdf_name = f"{original_name}_{counter}.pdf"
+                counter += 1
+            used_names.add(pdf_name)
+            pdf_paths[pdf_name] = result['pdf_path']
+        results[position] = {
+            'filename': filename,
+            'success': result['success'],
+            'pdf_name': pdf_name,
+            'error': result['error']
+        }
+    return pdf_paths
+
+
+def write_batch_archive(archive, pdf_paths: Dict[str, str], results: list) -> None:
+    """変換されたPDFと変換結果（results.json）をZIPに書き込む"""
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for pdf_name, pdf_path in pdf_paths.items():
+            zf.write(pdf_path, arcname=pdf_name)
+        zf.writestr('results.json', json.dumps(results, ensure_ascii=False, indent=2))
+
+
+def extract_images_from_zip(archive_stream, extract_folder: str) -> list:
+    """
+    ZIPアーカイブから画像を1つずつ取り出して保存
+
+    ZIP爆弾で作業ディレクトリのディスクを使い切らないよう、画像の件数、
+    画像1件と合計の展開後のサイズを制限する（ヘッダーのサイズを確認したうえで、展開中も実際のサイズを数える）。
+
+    Args:
+        archive_stream: アップロードされたZIPファイルのストリーム、またはパス
+        extract_folder: 展開先フォルダ
+
+    Returns:
+        list: ファイル名の自然順に並べた画像ファイルのパス
+
+    Raises:
+        InvalidOptionError: 画像の件数が上限を超えた場合
+        UploadTooLargeError: 展開後のサイズが上限を超えた場合
+    """
+    os.makedirs(extract_folder, exist_ok=True)
+    with zipfile.ZipFile(archive_stream) as zf:
+        members = [
+            info for info in zf.infolist()
+            if not info.is_dir() and allowed_file(os.path.basename(info.filename), ALLOWED_IMAGE_EXTENSIONS)
+        ]
+        if config.ZIP_MAX_MEMBERS > 0 and len(members) > config.ZIP_MAX_MEMBERS:
+            raise InvalidOptionError(
+                f"ZIPアーカイブの画像の数が上限（{config.ZIP_MAX_MEMBERS}件）を超えています: {len(members)}件"
+            )
+        members.sort(key=lambda info: natural_sort_key(info.filename))
+
+        total = 0
+        image_paths = []
+        for index, info in enumerate(members):
+            name = os.path.basename(info.filename)
+            if config.ZIP_MAX_MEMBER_BYTES > 0 and info.file_size > config.ZIP_MAX_MEMBER_BYTES:
+                raise UploadTooLargeError(name, config.ZIP_MAX_MEMBER_BYTES)
+            if config.ZIP_MAX_TOTAL_BYTES > 0 and total + info.file_size > config.ZIP_MAX_TOTAL_BYTES:
+                raise UploadTooLargeError(name, config.ZIP_MAX_TOTAL_BYTES)
+
+            # アーカイブ内のパスは使わず、連番のファイル名で展開する
+            extension = os.path.splitext(info.filename)[1].lower()
+            image_path = os.path.join(extract_folder, f"{index:06d}{extension}")
+            with zf.open(info) as source, open(image_path, 'wb') as target:
+                # ヘッダーのサイズは偽装できるため、実際に展開したサイズでも上限を確認する
+                while True:
+                    chunk = source.read(_ZIP_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+                    if config.ZIP_MAX_MEMBER_BYTES > 0 and target.tell() + len(chunk) > config.ZIP_MAX_MEMBER_BYTES:
+                        raise UploadTooLargeError(name, config.ZIP_MAX_MEMBER_BYTES)
+                    if config.ZIP_MAX_TOTAL_BYTES > 0 and total > config.ZIP_MAX_TOTAL_BYTES:
+                        raise UploadTooLargeError(name, config.ZIP_MAX_TOTAL_BYTES)
+                    target.write(chunk)
+            image_paths.append(image_path)
+    return image_paths
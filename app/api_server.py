@@ -7,57 +7,92 @@ Officeファイルと画像ファイルをPDFに変換するAPIエンドポイ
 import os
 import uuid
 import logging
+import zipfile
+import tempfile
+import time
 from datetime import datetime
-from typing import Dict, Any
+from functools import partial
+from typing import Dict, Any, Optional, Tuple
 
-from flask import Flask, request, jsonify, send_file
-from werkzeug.utils import secure_filename
-from werkzeug.exceptions import RequestEntityTooLarge
+from flask import Flask, Request, Response, current_app, g, request, jsonify, send_file
+from werkzeug.utils import secure_filename, send_file as send_file_with_options
 
 # ローカルアプリケーションのインポート
-from .pdf_converter import convert_office_file_to_pdf, convert_image_to_pdf
-from .exceptions import ConvertToPdfError
-from .file_utils import validate_file_path
-
-# ログ設定
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('api_server.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from .api_common import (
+    ALLOWED_ARCHIVE_EXTENSIONS, ALLOWED_IMAGE_EXTENSIONS, ALLOWED_OFFICE_EXTENSIONS, IMAGE_ENDPOINT_KINDS,
+    OFFICE_ENDPOINT_KINDS, UPLOAD_LIMITS, allowed_file, build_split_archive, extract_images_from_zip,
+    merge_batch_results, parse_optimize_option, parse_split_options, request_outcome, spreadsheet_options_for,
+    write_batch_archive
 )
+from .pdf_converter import convert_file_to_pdf, convert_office_files_to_pdf, convert_images_to_single_pdf
+from .exceptions import (
+    ConvertToPdfError, InvalidOptionError, JobQueueFullError, PageRangeError, SpreadsheetOptionError,
+    UnsupportedFormatError
+)
+from .formats import resolve_format
+from .jobs import get_job_manager, JOB_SUCCEEDED
+from . import config
+from .storage import call_on_response_close, create_workspace, get_storage_janitor_status, start_storage_janitor
+from .uploads import HashingUploadStream, UploadTooLargeError, format_bytes, upload_limit_for
+from .office_pool import get_office_pool_status
+from .conversion_cache import get_conversion_cache, hash_file
+from .delivery import SENDFILE_X_ACCEL_REDIRECT, etag_matches, offload_headers, result_etag
+from .image_profiles import get_image_profile, image_profile_names
+from .logging_setup import setup_logging
+from .metrics import BYTES_IN_TOTAL, BYTES_OUT_TOTAL, REQUESTS_TOTAL, STAGE_DURATION, render_metrics, time_stage
+from .tracing import (
+    SPAN_KIND_SERVER, STATUS_CODE_ERROR, STATUS_CODE_OK, TRACE_ID_HEADER, activate, deactivate, start_span,
+    trace_context_from_headers
+)
+
+
+class StreamingRequest(Request):
+    """ファイル部分を HashingUploadStream で受け取るリクエストクラス"""
+
+    # ファイル以外のフォーム項目がメモリを占有しないよう制限する
+    max_form_memory_size = 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        limits = current_app.config.get('UPLOAD_LIMITS', {})
+        stream = HashingUploadStream(
+            current_app.config['UPLOAD_FOLDER'],
+            filename,
+            upload_limit_for(filename, limits)
+        )
+        # 解析途中で中断された場合も close() で一時ファイルを削除できるよう記録する
+        self.__dict__.setdefault('_upload_streams', []).append(stream)
+        return stream
+
+    def _load_form_data(self) -> None:
+        # フォームの解析 = アップロードの受信とディスクへの書き込み
+        if 'form' in self.__dict__:
+            return
+        with time_stage('upload_save'):
+            super()._load_form_data()
+
+    def close(self) -> None:
+        super().close()
+        for stream in self.__dict__.get('_upload_streams', []):
+            stream.close()
+
+
+# ログ設定（コンソールと api_server.log への書き出しはバックグラウンドのスレッドで行う）
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Flaskアプリケーションの初期化
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MBの最大ファイルサイズ
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['OUTPUT_FOLDER'] = 'output'
-
-# 許可されるファイル拡張子
-ALLOWED_OFFICE_EXTENSIONS = {'docx', 'pptx', 'xlsx', 'doc', 'ppt', 'xls'}
-ALLOWED_IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+# アップロードはチャンクごとにディスクへ直接書き込む
+app.request_class = StreamingRequest
+app.config['MAX_CONTENT_LENGTH'] = config.UPLOAD_MAX_REQUEST_BYTES  # リクエスト全体の最大サイズ
+app.config['UPLOAD_FOLDER'] = config.UPLOAD_FOLDER
+app.config['OUTPUT_FOLDER'] = config.OUTPUT_FOLDER
+# 形式ごとのアップロードサイズ上限
+app.config['UPLOAD_LIMITS'] = UPLOAD_LIMITS
 
 # 注意: ファイル変換結果は直接返されるため、結果保存辞書は不要
 
 
-def allowed_file(filename: str, allowed_extensions: set) -> bool:
-    """
-    ファイル名が許可された拡張子を持つかチェック
-    
-    Args:
-        filename: チェックするファイル名
-        allowed_extensions: 許可された拡張子のセット
-    
-    Returns:
-        bool: 許可されている場合True
-    """
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in allowed_extensions
-
-
 def create_response(success: bool, message: str, data: Dict[str, Any] = None, 
                    status_code: int = 200) -> tuple:
     """
@@ -81,43 +116,252 @@ def create_response(success: bool, message: str, data: Dict[str, Any] = None,
     return jsonify(response), status_code
 
 
-def save_uploaded_file(file, upload_folder: str) -> str:
+def save_uploaded_file_with_digest(file, upload_folder: str) -> Tuple[str, str]:
     """
-    アップロードされたファイルを安全に保存
-    
+    アップロードされたファイルを安全に保存し、内容のSHA-256を取得
+
+    ストリーミング受信済みのファイルはコピーせずに移動する
+
     Args:
         file: アップロードされたファイルオブジェクト
         upload_folder: アップロード先フォルダ
-    
+
     Returns:
-        str: 保存されたファイルのパス
+        tuple: (保存されたファイルのパス, SHA-256の16進数文字列)
     """
     # アップロードフォルダが存在しない場合は作成
     os.makedirs(upload_folder, exist_ok=True)
-    
+
     # ファイル名を安全にする
     filename = secure_filename(file.filename)
-    
+
     # ユニークなファイル名を生成
     unique_filename = f"{uuid.uuid4()}_{filename}"
     file_path = os.path.join(upload_folder, unique_filename)
-    
+
     # ファイルを保存
-    file.save(file_path)
+    if isinstance(file.stream, HashingUploadStream):
+        file.stream.claim(file_path)
+        digest = file.stream.hexdigest()
+    else:
+        file.save(file_path)
+        digest = hash_file(file_path)
     logger.info(f"ファイルが保存されました: {file_path}")
+
+    return file_path, digest
+
+
+def save_uploaded_file(file, upload_folder: str) -> str:
+    """
+    アップロードされたファイルを安全に保存
+    
+    Args:
+        file: アップロードされたファイルオブジェクト
+        upload_folder: アップロード先フォルダ
     
+    Returns:
+        str: 保存されたファイルのパス
+    """
+    file_path, _ = save_uploaded_file_with_digest(file, upload_folder)
     return file_path
 
 
+@app.before_request
+def start_request_trace():
+    """リクエストのトレースを開始（トレースIDは traceparent・X-Request-ID ヘッダーから取得し、無ければ生成）"""
+    g.trace_id, parent_span_id = trace_context_from_headers(request.headers)
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    g.trace_span = start_span(
+        f"{request.method} {route}", trace_id=g.trace_id, parent_span_id=parent_span_id, kind=SPAN_KIND_SERVER,
+        **{'http.request.method': request.method, 'http.route': route}
+    )
+    g.trace_token = activate(g.trace_span)
+
+
+@app.teardown_request
+def end_request_trace_context(_error=None):
+    """リクエストの処理を終えたスレッドに現在のスパンを残さない（スパンの終了は送信完了時）"""
+    token = g.pop('trace_token', None)
+    if token is not None:
+        deactivate(token)
+
+
+@app.after_request
+def record_request_metrics(response):
+    """リクエスト数・転送バイト数・レスポンスの送信時間を記録"""
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, outcome=request_outcome(response.status_code))
+    if request.content_length:
+        BYTES_IN_TOTAL.inc(request.content_length)
+
+    trace_id = g.get('trace_id')
+    if trace_id:
+        response.headers[TRACE_ID_HEADER] = trace_id
+    request_span = g.get('trace_span')
+    send_span = start_span('response_send')
+    started = time.perf_counter()
+
+    def _on_sent():
+        STAGE_DURATION.observe(time.perf_counter() - started, stage='response_send')
+        if response.content_length:
+            BYTES_OUT_TOTAL.inc(response.content_length)
+        if send_span is not None:
+            send_span.end()
+        if request_span is not None:
+            request_span.set_attribute('http.response.status_code', response.status_code)
+            request_span.status_code = STATUS_CODE_ERROR if response.status_code >= 500 else STATUS_CODE_OK
+            request_span.end()
+
+    return call_on_response_close(response, _on_sent)
+
+
+def get_requested_image_profile() -> Tuple[Optional[str], Optional[tuple]]:
+    """
+    フォームの `profile` から画像変換プロファイル名を取得
+
+    Returns:
+        tuple: (プロファイル名（未指定の場合はNone）, 不正な場合のエラーレスポンス)
+    """
+    profile = request.form.get('profile', '').strip() or None
+    try:
+        get_image_profile(profile)
+    except ConvertToPdfError as e:
+        logger.warning(str(e))
+        return None, create_response(
+            success=False,
+            message=str(e),
+            status_code=400
+        )
+    return profile, None
+
+
+def get_requested_optimize() -> Tuple[bool, Optional[tuple]]:
+    """
+    フォームの `optimize` から変換後にPDFを最適化するかを取得
+
+    Returns:
+        tuple: (最適化するか, 不正な場合のエラーレスポンス)
+    """
+    optimize = parse_optimize_option(request.form.get('optimize'))
+    if optimize is None:
+        logger.warning(f"optimize の値が不正です: {request.form.get('optimize')}")
+        return False, create_response(
+            success=False,
+            message="optimize には true または false を指定してください",
+            status_code=400
+        )
+    return optimize, None
+
+
+def get_requested_split() -> Tuple[Optional[Dict[str, Any]], Optional[tuple]]:
+    """
+    フォームの `split_pages`・`page_ranges` から分割の指定を取得
+
+    Returns:
+        tuple: (分割の指定（分割しない場合はNone）, 不正な場合のエラーレスポンス)
+    """
+    try:
+        return parse_split_options(request.form.get('split_pages'), request.form.get('page_ranges')), None
+    except PageRangeError as e:
+        logger.warning(str(e))
+        return None, create_response(
+            success=False,
+            message=str(e),
+            status_code=400
+        )
+
+
+def get_requested_spreadsheet_options(filename: str) -> Tuple[Dict[str, Any], Optional[tuple]]:
+    """
+    フォームの `sheets`・`print_area`・`max_rows`・`max_cols` からスプレッドシートの変換範囲の指定を取得
+
+    Returns:
+        tuple: (変換関数に渡すオプション, 不正な場合のエラーレスポンス)
+    """
+    try:
+        return spreadsheet_options_for(
+            filename, request.form.get('sheets'), request.form.get('print_area'),
+            request.form.get('max_rows'), request.form.get('max_cols')
+        ), None
+    except SpreadsheetOptionError as e:
+        logger.warning(str(e))
+        return {}, create_response(
+            success=False,
+            message=str(e),
+            status_code=400
+        )
+
+
+def not_modified_response(etag: str):
+    """If-None-Match がETagに一致した場合の304レスポンス（変換・送信を省略する）"""
+    logger.info(f"変換結果はクライアントが保持しているものと同じです (ETag: {etag})")
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def send_result_file(path: str, download_name: str, mimetype: str, workspace=None, etag: str = None):
+    """
+    変換結果のファイルを返すレスポンス
+
+    ETagを付け、GETでは If-None-Match（304）と Range（206）に応答する。
+    ANY2PDF_SENDFILE が有効な場合は X-Sendfile / X-Accel-Redirect でWebサーバーに送信を任せる。
+
+    Args:
+        path: 送信するファイル
+        download_name: ダウンロード時のファイル名
+        mimetype: Content-Type
+        workspace: 送信完了後に削除する作業ディレクトリ
+            （Webサーバーに送信を任せる場合は、Webサーバーが読み終えるまで残してジャニターに削除を任せる）
+        etag: ETag（引用符なし。省略時は付けない）
+    """
+    offload = offload_headers(path)
+    response = send_file_with_options(
+        os.path.abspath(path),
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        etag=etag or False,
+        use_x_sendfile=offload is not None,
+        response_class=app.response_class
+    )
+    if offload is not None:
+        response.headers.pop('X-Sendfile', None)
+        response.headers.update(offload)
+        if config.SENDFILE_MODE == SENDFILE_X_ACCEL_REDIRECT:
+            response.headers.pop('Content-Length', None)
+        if workspace is not None:
+            workspace.keep()
+        return response
+    if request.method in ('GET', 'HEAD'):
+        response.headers['Accept-Ranges'] = 'bytes'
+    return workspace.attach(response) if workspace is not None else response
+
+
+def send_split_archive(workspace, pdf_path: str, download_base: str, split: Dict[str, Any], etag: str = None):
+    """分割したチャンクのZIPを返すレスポンス（送信後に作業ディレクトリを削除）"""
+    archive_path, chunk_count = build_split_archive(pdf_path, workspace.output_dir, download_base, split)
+    logger.info(f"分割したPDFを送信します: {archive_path}（{chunk_count}チャンク）")
+    response = send_result_file(archive_path, f"{download_base}_pages.zip", 'application/zip', workspace, etag)
+    response.headers['X-Split-Chunks'] = str(chunk_count)
+    return response
+
+
 @app.errorhandler(413)
 def too_large(e):
     """
 ファイルサイズが大きすぎる場合のエラーハンドラー
     """
-    logger.warning("アップロードされたファイルのサイズが制限を超えています")
+    if isinstance(e, UploadTooLargeError):
+        logger.warning(f"アップロードされたファイルのサイズが制限を超えています: {e.filename}")
+        message = f"ファイルサイズが制限（{format_bytes(e.limit)}）を超えています: {e.filename}"
+    else:
+        logger.warning("アップロードされたリクエストのサイズが制限を超えています")
+        message = f"ファイルサイズが制限（{format_bytes(app.config['MAX_CONTENT_LENGTH'])}）を超えています"
     return create_response(
         success=False,
-        message="ファイルサイズが制限（50MB）を超えています",
+        message=message,
         status_code=413
     )
 
@@ -148,11 +392,24 @@ def health_check():
         data={
             'version': '1.0.0',
             'service': 'PDF変換API',
-            'status': 'healthy'
+            'status': 'healthy',
+            'office_pool': get_office_pool_status(),
+            'cache': get_conversion_cache().stats() if get_conversion_cache() else None,
+            'storage': get_storage_janitor_status(),
+            'image_profiles': image_profile_names()
         }
     )
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    メトリクスエンドポイント
+    Prometheusのテキスト形式でメトリクスを返す
+    """
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/api/convert/office', methods=['POST'])
 def convert_office_to_pdf():
     """
@@ -192,12 +449,37 @@ def convert_office_to_pdf():
             status_code=400
         )
     
+    # 変換後の最適化の指定をチェック
+    optimize, error_response = get_requested_optimize()
+    if error_response is not None:
+        return error_response
+
+    # ページ分割の指定をチェック
+    split, error_response = get_requested_split()
+    if error_response is not None:
+        return error_response
+
+    # スプレッドシートの変換範囲（シート・印刷範囲・行数・列数）の指定をチェック
+    spreadsheet_options, error_response = get_requested_spreadsheet_options(file.filename)
+    if error_response is not None:
+        return error_response
+    
+    # リクエスト専用の作業ディレクトリ（送信後またはエラー時に削除）
+    workspace = create_workspace(app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'])
     try:
         # ファイルを保存
-        file_path = save_uploaded_file(file, app.config['UPLOAD_FOLDER'])
+        file_path, digest = save_uploaded_file_with_digest(file, workspace.upload_dir)
+
+        # 同じ内容・オプションの変換結果をクライアントが持っていれば変換しない
+        etag = result_etag(digest, {'kinds': OFFICE_ENDPOINT_KINDS, 'optimize': optimize, 'split': split,
+                                    **spreadsheet_options})
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return not_modified_response(etag)
         
-        # PDFに変換
-        pdf_path = convert_office_file_to_pdf(file_path, app.config['OUTPUT_FOLDER'])
+        # ファイルの内容から形式を判定してPDFに変換
+        pdf_path = convert_file_to_pdf(file_path, workspace.output_dir, input_digest=digest,
+                                       filename=file.filename, kinds=OFFICE_ENDPOINT_KINDS,
+                                       optimize=optimize, **spreadsheet_options)
         
         # 一時ファイルを削除
         os.remove(file_path)
@@ -219,17 +501,23 @@ def convert_office_to_pdf():
         # ダウンロード用のファイル名を生成
         original_name = os.path.splitext(file.filename)[0]
         download_name = f"{original_name}.pdf"
+
+        # 分割の指定があればチャンクのPDFと一覧をZIPで返す
+        if split is not None:
+            return send_split_archive(workspace, absolute_pdf_path, original_name, split, etag)
         
         logger.info(f"PDFファイルを送信します: {absolute_pdf_path}")
         
         # PDFファイルを直接返す
-        return send_file(
-            absolute_pdf_path,
-            as_attachment=True,
-            download_name=download_name,
-            mimetype='application/pdf'
-        )
+        return send_result_file(absolute_pdf_path, download_name, 'application/pdf', workspace, etag)
         
+    except InvalidOptionError as e:
+        logger.warning(str(e))
+        return create_response(
+            success=False,
+            message=str(e),
+            status_code=400
+        )
     except ConvertToPdfError as e:
         logger.error(f"PDF変換エラー: {str(e)}")
         return create_response(
@@ -244,10 +532,99 @@ def convert_office_to_pdf():
             message="予期しないエラーが発生しました",
             status_code=500
         )
+    finally:
+        workspace.release()
+
+
+@app.route('/api/convert/office/batch', methods=['POST'])
+def convert_office_batch_to_pdf():
+    """
+    複数のOfficeファイルをまとめてPDFに変換するエンドポイント
+
+    sofficeの起動を1回にまとめて変換し、PDFとファイルごとの結果（results.json）を
+    ZIPアーカイブで返す
+
+    Returns:
+        ZIP: 変換されたPDFと変換結果
+    """
+    logger.info("Officeファイル一括変換リクエストを受信しました")
+
+    files = [file for file in request.files.getlist('files') if file.filename != '']
+    if not files:
+        logger.warning("ファイルがリクエストに含まれていません")
+        return create_response(
+            success=False,
+            message="ファイルが指定されていません",
+            status_code=400
+        )
+
+    # リクエスト専用の作業ディレクトリ（ZIP作成後に削除）
+    workspace = create_workspace(app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'])
+    try:
+        results = []
+        saved = []
+        for file in files:
+            if not allowed_file(file.filename, ALLOWED_OFFICE_EXTENSIONS):
+                logger.warning(f"サポートされていないファイル形式: {file.filename}")
+                results.append({
+                    'filename': file.filename,
+                    'success': False,
+                    'pdf_name': None,
+                    'error': f"サポートされていないファイル形式です。許可される形式: {', '.join(ALLOWED_OFFICE_EXTENSIONS)}"
+                })
+                continue
+            saved.append((len(results), file.filename, save_uploaded_file(file, workspace.upload_dir)))
+            results.append(None)
+
+        try:
+            converted = convert_office_files_to_pdf([path for _, _, path in saved], workspace.output_dir)
+        except ConvertToPdfError as e:
+            logger.error(f"PDF変換エラー: {str(e)}")
+            return create_response(
+                success=False,
+                message=f"PDF変換中にエラーが発生しました: {str(e)}",
+                status_code=500
+            )
+        except Exception as e:
+            logger.error(f"予期しないエラー: {str(e)}")
+            return create_response(
+                success=False,
+                message="予期しないエラーが発生しました",
+                status_code=500
+            )
+
+        pdf_paths = merge_batch_results(results, saved, converted)
+        succeeded = sum(1 for result in results if result['success'])
+        logger.info(f"Officeファイルの一括変換が完了しました: 成功 {succeeded}/{len(results)}")
+
+        if succeeded == 0:
+            return create_response(
+                success=False,
+                message="すべてのファイルの変換に失敗しました",
+                data={'results': results},
+                status_code=500
+            )
+
+        # PDFと変換結果をZIPにまとめる
+        archive = tempfile.TemporaryFile()
+        write_batch_archive(archive, pdf_paths, results)
+        archive.seek(0)
+
+        response = send_file(
+            archive,
+            as_attachment=True,
+            download_name='converted_pdfs.zip',
+            mimetype='application/zip'
+        )
+        response.headers['X-Convert-Succeeded'] = str(succeeded)
+        response.headers['X-Convert-Failed'] = str(len(results) - succeeded)
+        return response
+    finally:
+        workspace.release()
 
 
 @app.route('/api/convert/image', methods=['POST'])
-def convert_image_to_pdf():
+def convert_image_file_to_pdf():
     """
     画像ファイルをPDFに変換するエンドポイント
     
@@ -284,13 +661,38 @@ def convert_image_to_pdf():
             message=f"サポートされていないファイル形式です。許可される形式: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}",
             status_code=400
         )
+
+    # 縮小・再圧縮のプロファイルをチェック
+    profile, error_response = get_requested_image_profile()
+    if error_response is not None:
+        return error_response
+
+    # 変換後の最適化の指定をチェック
+    optimize, error_response = get_requested_optimize()
+    if error_response is not None:
+        return error_response
+
+    # ページ分割の指定をチェック
+    split, error_response = get_requested_split()
+    if error_response is not None:
+        return error_response
     
+    # リクエスト専用の作業ディレクトリ（送信後またはエラー時に削除）
+    workspace = create_workspace(app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'])
     try:
         # ファイルを保存
-        file_path = save_uploaded_file(file, app.config['UPLOAD_FOLDER'])
+        file_path, digest = save_uploaded_file_with_digest(file, workspace.upload_dir)
+
+        # 同じ内容・オプションの変換結果をクライアントが持っていれば変換しない
+        etag = result_etag(digest, {'kinds': IMAGE_ENDPOINT_KINDS, 'profile': profile, 'optimize': optimize,
+                                    'split': split})
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return not_modified_response(etag)
         
-        # PDFに変換
-        pdf_path = convert_image_to_pdf(file_path, app.config['OUTPUT_FOLDER'])
+        # ファイルの内容から形式を判定してPDFに変換
+        pdf_path = convert_file_to_pdf(file_path, workspace.output_dir, input_digest=digest,
+                                       filename=file.filename, kinds=IMAGE_ENDPOINT_KINDS,
+                                       profile=profile, optimize=optimize)
         
         # 一時ファイルを削除
         os.remove(file_path)
@@ -312,17 +714,23 @@ def convert_image_to_pdf():
         # ダウンロード用のファイル名を生成
         original_name = os.path.splitext(file.filename)[0]
         download_name = f"{original_name}.pdf"
+
+        # 分割の指定があればチャンクのPDFと一覧をZIPで返す
+        if split is not None:
+            return send_split_archive(workspace, absolute_pdf_path, original_name, split, etag)
         
         logger.info(f"PDFファイルを送信します: {absolute_pdf_path}")
         
         # PDFファイルを直接返す
-        return send_file(
-            absolute_pdf_path,
-            as_attachment=True,
-            download_name=download_name,
-            mimetype='application/pdf'
-        )
+        return send_result_file(absolute_pdf_path, download_name, 'application/pdf', workspace, etag)
         
+    except InvalidOptionError as e:
+        logger.warning(str(e))
+        return create_response(
+            success=False,
+            message=str(e),
+            status_code=400
+        )
     except ConvertToPdfError as e:
         logger.error(f"PDF変換エラー: {str(e)}")
         return create_response(
@@ -337,6 +745,327 @@ def convert_image_to_pdf():
             message="予期しないエラーが発生しました",
             status_code=500
         )
+    finally:
+        workspace.release()
+
+
+@app.route('/api/convert/images', methods=['POST'])
+def convert_images_to_single_pdf_endpoint():
+    """
+    複数の画像ファイルを1つのPDFに変換するエンドポイント
+
+    画像はmultipartの `files`（送信順）またはZIPアーカイブの `archive`
+    （ファイル名の自然順）で指定する
+
+    Returns:
+        PDF: 全画像を順番にページとした1つのPDF
+    """
+    logger.info("複数画像変換リクエストを受信しました")
+
+    files = [file for file in request.files.getlist('files') if file.filename != '']
+    archive = request.files.get('archive')
+    if archive is not None and archive.filename == '':
+        archive = None
+
+    if not files and archive is None:
+        logger.warning("ファイルがリクエストに含まれていません")
+        return create_response(
+            success=False,
+            message="ファイルが指定されていません",
+            status_code=400
+        )
+
+    for file in files:
+        if not allowed_file(file.filename, ALLOWED_IMAGE_EXTENSIONS):
+            logger.warning(f"サポートされていないファイル形式: {file.filename}")
+            return create_response(
+                success=False,
+                message=f"サポートされていないファイル形式です（{file.filename}）。許可される形式: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}",
+                status_code=400
+            )
+
+    if archive is not None and not allowed_file(archive.filename, ALLOWED_ARCHIVE_EXTENSIONS):
+        logger.warning(f"サポートされていないアーカイブ形式: {archive.filename}")
+        return create_response(
+            success=False,
+            message="アーカイブはZIP形式で指定してください",
+            status_code=400
+        )
+
+    profile, error_response = get_requested_image_profile()
+    if error_response is not None:
+        return error_response
+
+    optimize, error_response = get_requested_optimize()
+    if error_response is not None:
+        return error_response
+
+    split, error_response = get_requested_split()
+    if error_response is not None:
+        return error_response
+
+    output_name = secure_filename(request.form.get('name', '')) or 'images'
+    # リクエスト専用の作業ディレクトリ（送信後またはエラー時に削除）
+    workspace = create_workspace(app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'])
+
+    try:
+        image_paths = [save_uploaded_file(file, workspace.upload_dir) for file in files]
+        if archive is not None:
+            image_paths.extend(extract_images_from_zip(archive.stream, os.path.join(workspace.upload_dir, 'archive')))
+
+        if not image_paths:
+            return create_response(
+                success=False,
+                message="アーカイブに変換できる画像が含まれていません",
+                status_code=400
+            )
+
+        # PDFに変換
+        pdf_path = convert_images_to_single_pdf(image_paths, workspace.output_dir, output_name, profile=profile,
+                                                optimize=optimize)
+        logger.info(f"{len(image_paths)}枚の画像の変換が完了しました: {pdf_path}")
+
+        if split is not None:
+            return send_split_archive(workspace, pdf_path, output_name, split)
+
+        return send_result_file(pdf_path, f"{output_name}.pdf", 'application/pdf', workspace)
+
+    except zipfile.BadZipFile:
+        logger.warning("ZIPアーカイブが不正です")
+        return create_response(
+            success=False,
+            message="ZIPアーカイブを読み込めません",
+            status_code=400
+        )
+    except InvalidOptionError as e:
+        logger.warning(str(e))
+        return create_response(
+            success=False,
+            message=str(e),
+            status_code=400
+        )
+    except ConvertToPdfError as e:
+        logger.error(f"PDF変換エラー: {str(e)}")
+        return create_response(
+            success=False,
+            message=f"PDF変換中にエラーが発生しました: {str(e)}",
+            status_code=500
+        )
+    except UploadTooLargeError:
+        raise
+    except Exception as e:
+        logger.error(f"予期しないエラー: {str(e)}")
+        return create_response(
+            success=False,
+            message="予期しないエラーが発生しました",
+            status_code=500
+        )
+    finally:
+        workspace.release()
+
+
+def submit_conversion_job(kind: str, allowed_extensions: set, kinds: tuple, options: Dict[str, Any] = None) -> tuple:
+    """
+    アップロードされたファイルを保存し、内容の形式を確認して変換ジョブとして登録
+
+    Args:
+        kind: 変換の種類（'office', 'image'）
+        allowed_extensions: 許可された拡張子のセット
+        kinds: 受け付ける内容の種類
+        options: 変換関数に渡すオプション
+
+    Returns:
+        tuple: (レスポンス, ステータスコード)
+    """
+    # ファイルがリクエストに含まれているかチェック
+    if 'file' not in request.files:
+        logger.warning("ファイルがリクエストに含まれていません")
+        return create_response(
+            success=False,
+            message="ファイルが指定されていません",
+            status_code=400
+        )
+
+    file = request.files['file']
+
+    # ファイルが選択されているかチェック
+    if file.filename == '':
+        logger.warning("ファイルが選択されていません")
+        return create_response(
+            success=False,
+            message="ファイルが選択されていません",
+            status_code=400
+        )
+
+    # ファイル拡張子をチェック
+    if not allowed_file(file.filename, allowed_extensions):
+        logger.warning(f"サポートされていないファイル形式: {file.filename}")
+        return create_response(
+            success=False,
+            message=f"サポートされていないファイル形式です。許可される形式: {', '.join(allowed_extensions)}",
+            status_code=400
+        )
+
+    # 作業ディレクトリはジョブの有効期限が切れるまで保持する
+    workspace = create_workspace(app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'])
+    file_path, digest = save_uploaded_file_with_digest(file, workspace.upload_dir)
+
+    # 対応していない内容のファイルはキューに入れる前に拒否する
+    try:
+        file_format = resolve_format(file_path, file.filename, kinds)
+    except UnsupportedFormatError as e:
+        workspace.cleanup()
+        logger.warning(str(e))
+        return create_response(
+            success=False,
+            message=str(e),
+            status_code=400
+        )
+
+    converter = partial(convert_file_to_pdf, input_digest=digest, file_format=file_format, **(options or {}))
+    try:
+        job = get_job_manager().submit(
+            kind, file.filename, file_path, converter, workspace.output_dir,
+            workspace=workspace, etag=result_etag(digest, {'kinds': kinds, **(options or {})})
+        )
+    except JobQueueFullError as e:
+        workspace.cleanup()
+        logger.warning(str(e))
+        return create_response(
+            success=False,
+            message=str(e),
+            status_code=503
+        )
+
+    return create_response(
+        success=True,
+        message="変換ジョブを登録しました",
+        data={
+            **job.to_dict(),
+            'status_url': f"/api/jobs/{job.id}",
+            'result_url': f"/api/jobs/{job.id}/result"
+        },
+        status_code=202
+    )
+
+
+@app.route('/api/jobs/office', methods=['POST'])
+def submit_office_job():
+    """
+    Officeファイルの非同期変換ジョブを登録するエンドポイント
+
+    Returns:
+        JSON: ジョブIDと状態確認用URL
+    """
+    logger.info("Officeファイル変換ジョブのリクエストを受信しました")
+    optimize, error_response = get_requested_optimize()
+    if error_response is not None:
+        return error_response
+    file = request.files.get('file')
+    spreadsheet_options, error_response = get_requested_spreadsheet_options(file.filename if file else '')
+    if error_response is not None:
+        return error_response
+    return submit_conversion_job('office', ALLOWED_OFFICE_EXTENSIONS, OFFICE_ENDPOINT_KINDS,
+                                 {'optimize': optimize, **spreadsheet_options})
+
+
+@app.route('/api/jobs/image', methods=['POST'])
+def submit_image_job():
+    """
+    画像ファイルの非同期変換ジョブを登録するエンドポイント
+
+    Returns:
+        JSON: ジョブIDと状態確認用URL
+    """
+    logger.info("画像ファイル変換ジョブのリクエストを受信しました")
+    profile, error_response = get_requested_image_profile()
+    if error_response is not None:
+        return error_response
+    optimize, error_response = get_requested_optimize()
+    if error_response is not None:
+        return error_response
+    return submit_conversion_job('image', ALLOWED_IMAGE_EXTENSIONS, IMAGE_ENDPOINT_KINDS,
+                                 {'profile': profile, 'optimize': optimize})
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id: str):
+    """
+    変換ジョブの状態を取得するエンドポイント
+
+    Returns:
+        JSON: ジョブの状態
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return create_response(
+            success=False,
+            message="ジョブが見つかりません",
+            status_code=404
+        )
+    return create_response(
+        success=True,
+        message="ジョブの状態を取得しました",
+        data=job.to_dict()
+    )
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id: str):
+    """
+    変換ジョブの結果（PDF）を取得するエンドポイント
+
+    Returns:
+        PDF: 変換されたPDFファイル
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return create_response(
+            success=False,
+            message="ジョブが見つかりません",
+            status_code=404
+        )
+
+    if job.status != JOB_SUCCEEDED:
+        return create_response(
+            success=False,
+            message="変換はまだ完了していません" if not job.finished else f"変換に失敗しました: {job.error}",
+            data=job.to_dict(),
+            status_code=409
+        )
+
+    absolute_pdf_path = os.path.abspath(job.result_path)
+    if not os.path.exists(absolute_pdf_path):
+        logger.error(f"変換されたPDFファイルが見つかりません: {absolute_pdf_path}")
+        return create_response(
+            success=False,
+            message="変換されたPDFファイルが見つかりません",
+            status_code=410
+        )
+
+    # 途中で切れたダウンロードは Range で続きから取得できる
+    return send_result_file(absolute_pdf_path, f"{os.path.splitext(job.filename)[0]}.pdf", 'application/pdf',
+                            etag=job.etag)
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id: str):
+    """
+    完了した変換ジョブと結果を削除するエンドポイント
+
+    Returns:
+        JSON: 削除結果
+    """
+    if not get_job_manager().delete(job_id):
+        return create_response(
+            success=False,
+            message="削除できるジョブが見つかりません",
+            status_code=404
+        )
+    return create_response(
+        success=True,
+        message="ジョブを削除しました"
+    )
 
 
 # 注意: ダウンロードエンドポイントは削除されました
@@ -347,6 +1076,7 @@ if __name__ == '__main__':
     # 必要なディレクトリを作成
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+    start_storage_janitor([app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']])
     
     logger.info("PDF変換APIサーバーを起動しています...")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
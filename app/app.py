@@ -1,12 +1,52 @@
 # 標準ライブラリのインポート
 import gradio as gr
 import os
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple
 
 # ローカルアプリケーションのインポート
+from . import config
 from .css import custom_css
-from .pdf_converter import (
-    convert_office_file_to_pdf, convert_image_to_pdf
-)
+from .exceptions import UnsupportedFormatError
+from .formats import KIND_IMAGE, KIND_OFFICE, KIND_PDF, FileFormat, extensions_for, resolve_format
+from .image_profiles import IMAGE_PROFILES
+from .logging_setup import setup_logging
+from .office_pool import get_office_pool
+from .storage import start_storage_janitor
+from .pdf_converter import convert_file_to_pdf
+
+
+def _convert_upload(file_path: str, output_dir: str, profile: str, optimize: bool) -> Tuple[str, FileFormat]:
+    """1ファイルの形式を判定してPDFに変換（バッチ変換のワーカースレッドで実行）"""
+    # ファイルの内容から形式を判定（拡張子ではなくマジックバイトで判定する）
+    file_format = resolve_format(file_path)
+    # 形式に応じた変換を実行（PDFはそのまま、画像は画像の変換、OfficeファイルはLibreOffice）
+    pdf_path = convert_file_to_pdf(file_path, output_dir, file_format=file_format,
+                                   profile=profile or None, optimize=bool(optimize))
+    return pdf_path, file_format
+
+
+def _unique_pdf_names(file_names: List[str]) -> List[str]:
+    """ZIP内のPDFのファイル名を決める（同名のファイルには連番を付与）"""
+    used_names = set()
+    pdf_names = []
+    for file_name in file_names:
+        original_name = os.path.splitext(file_name)[0]
+        pdf_name = f"{original_name}.pdf"
+        counter = 2
+        while pdf_name in used_names:
+            pdf_name = f"{original_name}_{counter}.pdf"
+            counter += 1
+        used_names.add(pdf_name)
+        pdf_names.append(pdf_name)
+    return pdf_names
+
+
+def _batch_status(header: str, rows: List[str]) -> str:
+    """バッチ変換の状態表示（全体の進捗とファイルごとの状態）"""
+    return header + "\n\n" + "\n".join(rows)
 
 
 def create_app():
@@ -31,9 +71,26 @@ def create_app():
                     # 左列：ファイルアップロードとコントロール
                     with gr.Column(scale=1):
                         # ファイルアップロード領域
-                        file_input = gr.File(label="Officeファイルまたは画像をアップロード",
-                                             file_types=[".docx", ".pptx", ".xlsx", ".doc", ".ppt", ".xls", ".jpg",
-                                                         ".jpeg", ".png"])
+                        file_input = gr.File(label="Officeファイルまたは画像をアップロード（複数選択可）",
+                                             file_count="multiple",
+                                             file_types=[f".{extension}" for extension in
+                                                         extensions_for(KIND_OFFICE, KIND_IMAGE, KIND_PDF)])
+
+                        # 画像の縮小・再圧縮プロファイル（Officeファイルには適用されない）
+                        profile_input = gr.Dropdown(
+                            label="画像プロファイル",
+                            choices=[("なし（元の解像度・画質）", "")] + [
+                                (f"{name} - {profile.description}", name)
+                                for name, profile in IMAGE_PROFILES.items()
+                            ],
+                            value=""
+                        )
+
+                        # 変換後のPDF最適化（リニアライズ・圧縮・重複リソースの統合）
+                        optimize_input = gr.Checkbox(
+                            label="PDFを最適化（Web表示向け・ファイルサイズ削減）",
+                            value=config.PDF_OPTIMIZE
+                        )
 
                         # ボタンとログのレイアウト
                         with gr.Row():
@@ -45,7 +102,7 @@ def create_app():
                         status_output = gr.Textbox(
                             label="変換ステータス",
                             lines=8,
-                            max_lines=8,
+                            max_lines=20,
                             interactive=False,
                             container=False,
                             placeholder="変換ステータスがここに表示されます..."
@@ -61,40 +118,77 @@ def create_app():
 
                         # ファイル変換を処理する関数
 
-                def convert_file(file):
-                    """アップロードされたファイルをPDFに変換する"""
-                    if not file:
-                        return "まずファイルをアップロードしてください", None
-
-                    try:
-                        # ファイルパスを取得
-                        file_path = file.name
-                        os.makedirs("output", exist_ok=True)
-                        output_dir = "output"
-
-                        # ファイルタイプを判定して変換
-                        file_extension = file_path.lower().split('.')[-1]
-                        if file_extension in ['docx', 'pptx', 'xlsx']:
-                            # Officeファイルを変換
-                            pdf_path = convert_office_file_to_pdf(file_path, output_dir)
-                            status = f"✅ 変換成功\n\nファイルタイプ: Officeファイル (.{file_extension})\n出力パス: {pdf_path}\n\n変換完了、PDFファイルをダウンロードできます。"
-                        elif file_extension in ['jpg', 'jpeg', 'png']:
-                            # 画像を変換
-                            pdf_path = convert_image_to_pdf(file_path, output_dir)
-                            status = f"✅ 変換成功\n\nファイルタイプ: 画像ファイル (.{file_extension})\n出力パス: {pdf_path}\n\n変換完了、PDFファイルをダウンロードできます。"
-                        else:
-                            return "❌ 変換失敗\n\nエラー原因: サポートされていないファイルタイプ\nサポート形式: Officeファイル(.docx, .pptx, .xlsx)と画像(.jpg, .jpeg, .png)", None
-
-                        # PDFをダウンロード可能にする
-                        return status, gr.DownloadButton(value=pdf_path, label="PDFをダウンロード", visible=True)
-
-                    except Exception as e:
-                        return f"❌ 変換失敗\n\nエラー情報: {str(e)}", None
+                def convert_files(files, profile, optimize, progress=gr.Progress()):
+                    """アップロードされたファイルを並列にPDFに変換し、ファイルごとの状態を逐次表示する"""
+                    if not files:
+                        yield "まずファイルをアップロードしてください", None
+                        return
+
+                    # Gradioのバージョンによってファイルパスまたはファイルオブジェクトが渡される
+                    file_paths = [getattr(file, 'name', file) for file in files]
+                    file_names = [os.path.basename(path) for path in file_paths]
+                    total = len(file_paths)
+                    rows = [f"⏳ {name}" for name in file_names]
+                    pdf_paths = [None] * total
+
+                    # 同名ファイルが他のユーザーの結果を上書きしないよう変換ごとにフォルダを分ける
+                    # （結果はストレージジャニターが保持期間後に削除する）
+                    batch_dir = os.path.join(config.OUTPUT_FOLDER, uuid.uuid4().hex)
+                    os.makedirs(batch_dir, exist_ok=True)
+
+                    yield _batch_status(f"🔄 変換中 0/{total}", rows), None
+                    done = 0
+                    succeeded = 0
+                    with ThreadPoolExecutor(max_workers=max(1, config.UI_BATCH_WORKERS)) as executor:
+                        # アップロードされたファイル名が重複してもよいよう、ファイルごとに出力フォルダを分ける
+                        futures = {
+                            executor.submit(_convert_upload, path, os.path.join(batch_dir, f"{index:04d}"),
+                                            profile, optimize): index
+                            for index, path in enumerate(file_paths)
+                        }
+                        for future in as_completed(futures):
+                            index = futures[future]
+                            try:
+                                pdf_paths[index], file_format = future.result()
+                                rows[index] = f"✅ {file_names[index]}（{file_format.label}）"
+                                succeeded += 1
+                            except UnsupportedFormatError as e:
+                                rows[index] = f"❌ {file_names[index]}: {e}"
+                            except Exception as e:
+                                rows[index] = f"❌ {file_names[index]}: {str(e)}"
+                            done += 1
+                            progress(done / total, desc=f"{done}/{total} 件を処理しました")
+                            yield _batch_status(f"🔄 変換中 {done}/{total}（成功 {succeeded}）", rows), None
+
+                    if succeeded == 0:
+                        supported = ', '.join(
+                            f".{extension}" for extension in extensions_for(KIND_OFFICE, KIND_IMAGE, KIND_PDF)
+                        )
+                        yield _batch_status(f"❌ 変換失敗\nサポート形式: {supported}", rows), None
+                        return
+
+                    header = f"✅ 変換完了（成功 {succeeded}/{total}）"
+                    if total == 1:
+                        # 1ファイルの場合はPDFをそのままダウンロード可能にする
+                        yield _batch_status(header, rows), gr.DownloadButton(
+                            value=pdf_paths[0], label="PDFをダウンロード", visible=True
+                        )
+                        return
+
+                    # 変換できたPDFをZIPにまとめてダウンロード可能にする
+                    archive_path = os.path.join(batch_dir, 'converted_pdfs.zip')
+                    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                        for pdf_name, pdf_path in zip(_unique_pdf_names(file_names), pdf_paths):
+                            if pdf_path is not None:
+                                zf.write(pdf_path, arcname=pdf_name)
+                    yield _batch_status(header, rows), gr.DownloadButton(
+                        value=archive_path, label=f"PDFをまとめてダウンロード（ZIP, {succeeded}件）", visible=True
+                    )
 
                 # ボタンクリックイベントを設定
                 convert_file_btn.click(
-                    fn=convert_file,
-                    inputs=file_input,
+                    fn=convert_files,
+                    inputs=[file_input, profile_input, optimize_input],
                     outputs=[status_output, download_link]
                 )
 
@@ -108,9 +202,18 @@ def create_app():
 
 def main():
     """アプリケーションを起動するメイン関数"""
+    # ログはコンソールにだけ出力する
+    setup_logging(log_file='')
     app = create_app()
 
-    app.queue()
+    # LibreOfficeワーカープールを事前に起動
+    get_office_pool()
+
+    # output/ のジャニターを開始
+    start_storage_janitor([config.OUTPUT_FOLDER])
+
+    # 同時に処理するバッチ数を制限する（バッチ内の並列数は ANY2PDF_UI_BATCH_WORKERS）
+    app.queue(default_concurrency_limit=max(1, config.UI_CONCURRENCY))
     app.launch()
 
 
@@ -0,0 +1,802 @@
+# -*- coding: utf-8 -*-
+"""
+ASGI APIサーバー（本番モード）
+FastAPI/uvicornで api_server.py と同じ /api/convert/*・/api/health・/api/metrics を提供する
+
+エンドポイントは非同期で動作し、アップロードの保存・変換・ZIP作成などのブロッキング処理は
+スレッドプールで実行するため、変換中も他のアップロード・ダウンロードを並行して処理できる
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, File, Form, Header, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.routing import APIRoute
+from starlette.background import BackgroundTask
+from starlette.datastructures import FormData, Headers, MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.requests import Request
+from werkzeug.utils import secure_filename
+
+from . import config
+from .api_common import (
+    ALLOWED_ARCHIVE_EXTENSIONS, ALLOWED_IMAGE_EXTENSIONS, ALLOWED_OFFICE_EXTENSIONS, IMAGE_ENDPOINT_KINDS,
+    OFFICE_ENDPOINT_KINDS, UPLOAD_LIMITS, allowed_file, build_split_archive, extract_images_from_zip,
+    merge_batch_results, parse_optimize_option, parse_split_options, request_outcome, spreadsheet_options_for,
+    write_batch_archive
+)
+from .conversion_cache import get_conversion_cache
+from .delivery import etag_matches, offload_headers, result_etag
+from .exceptions import ConvertToPdfError, InvalidOptionError, PageRangeError, SpreadsheetOptionError
+from .image_profiles import get_image_profile, image_profile_names
+from .logging_setup import setup_logging
+from .metrics import BYTES_IN_TOTAL, BYTES_OUT_TOTAL, REQUESTS_TOTAL, STAGE_DURATION, render_metrics, time_stage
+from .office_pool import get_office_pool, get_office_pool_status, shutdown_office_pool
+from .pdf_converter import convert_file_to_pdf, convert_images_to_single_pdf, convert_office_files_to_pdf
+from .storage import RequestWorkspace, create_workspace, get_storage_janitor_status, start_storage_janitor
+from .tracing import (
+    SPAN_KIND_SERVER, STATUS_CODE_ERROR, STATUS_CODE_OK, TRACE_ID_HEADER, activate, bind_context, deactivate,
+    start_span, trace_context_from_headers
+)
+from .uploads import HashingUploadStream, UploadTooLargeError, format_bytes, upload_limit_for
+
+# ログ設定（uvicornのワーカープロセスごとに、コンソールと api_server.log への書き出しを設定する）
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# 変換などのブロッキング処理を実行するスレッドプール
+_executor = ThreadPoolExecutor(max_workers=max(1, config.ASGI_CONVERT_THREADS), thread_name_prefix='asgi-convert')
+
+
+async def run_blocking(func, *args, **kwargs):
+    """ブロッキング処理をスレッドプールで実行し、イベントループを塞がないようにする"""
+    loop = asyncio.get_running_loop()
+    # run_in_executor はコンテキストを引き継がないため、リクエストのトレースを明示的に渡す
+    return await loop.run_in_executor(_executor, bind_context(partial(func, *args, **kwargs)))
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """ワーカープロセスの起動・終了処理"""
+    os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(config.OUTPUT_FOLDER, exist_ok=True)
+    # LibreOfficeワーカープールを事前に起動（プロセスごとに別のポート・プロファイルを使う）
+    await run_blocking(get_office_pool)
+    start_storage_janitor()
+    yield
+    await run_blocking(shutdown_office_pool)
+    _executor.shutdown(wait=False)
+
+
+class StreamingMultiPartParser(MultiPartParser):
+    """ファイル部分を一時ファイルに貯めず、HashingUploadStream に直接書き込むmultipartパーサー"""
+
+    def on_headers_finished(self) -> None:
+        super().on_headers_finished()
+        upload = self._current_part.file
+        if upload is None:
+            return
+        # 受信と同時に形式ごとのサイズ上限を確認し、ハッシュを計算する（保存時にコピーし直さない）
+        upload.file.close()
+        stream = HashingUploadStream(config.UPLOAD_FOLDER, upload.filename, upload_limit_for(upload.filename, UPLOAD_LIMITS))
+        upload.file = stream
+        self._files_to_close_on_error.append(stream)
+
+    async def parse(self) -> FormData:
+        try:
+            return await super().parse()
+        except UploadTooLargeError:
+            # 上限を超えた時点で受信を中断し、書き込み途中の一時ファイルを削除する
+            for file in self._files_to_close_on_error:
+                file.close()
+            raise
+
+
+class UploadTooLargeHTTPException(HTTPException):
+    """
+    フォームの解析中に UploadTooLargeError が発生したことを示す例外
+
+    FastAPIはフォームの解析中の例外を400に変換するため、HTTPException として送出し、too_large で413を返す
+    """
+
+    def __init__(self, error: UploadTooLargeError):
+        super().__init__(status_code=413)
+        self.error = error
+
+
+class StreamingRequest(Request):
+    """ファイル部分を HashingUploadStream で受け取るリクエストクラス"""
+
+    async def _get_form(self, *, max_files: int = 1000, max_fields: int = 1000,
+                        max_part_size: int = 1024 * 1024) -> FormData:
+        if self._form is None and self.headers.get('content-type', '').startswith('multipart/form-data'):
+            parser = StreamingMultiPartParser(
+                self.headers, self.stream(), max_files=max_files, max_fields=max_fields, max_part_size=max_part_size
+            )
+            try:
+                # フォームの解析 = アップロードの受信とディスクへの書き込み
+                with time_stage('upload_save'):
+                    self._form = await parser.parse()
+            except MultiPartException as e:
+                raise HTTPException(status_code=400, detail=e.message)
+            except UploadTooLargeError as e:
+                raise UploadTooLargeHTTPException(e)
+        return await super()._get_form(max_files=max_files, max_fields=max_fields, max_part_size=max_part_size)
+
+
+class StreamingRoute(APIRoute):
+    """エンドポイントに StreamingRequest を渡すルート"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def streaming_handler(request: Request) -> Response:
+            return await handler(StreamingRequest(request.scope, request.receive))
+
+        return streaming_handler
+
+
+app = FastAPI(title="PDF変換API", version='1.0.0', lifespan=lifespan)
+# アップロードはチャンクごとにディスクへ直接書き込む
+app.router.route_class = StreamingRoute
+
+
+class MetricsMiddleware:
+    """リクエスト数・転送バイト数・レスポンスの送信時間を記録するASGIミドルウェア"""
+
+    def __init__(self, asgi_app):
+        self.app = asgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        state = {'status': 500, 'started': None, 'sent_bytes': 0}
+
+        async def receive_with_metrics():
+            message = await receive()
+            if message['type'] == 'http.request':
+                BYTES_IN_TOTAL.inc(len(message.get('body', b'')))
+            return message
+
+        async def send_with_metrics(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+                state['started'] = time.perf_counter()
+            elif message['type'] == 'http.response.body':
+                state['sent_bytes'] += len(message.get('body', b''))
+                if not message.get('more_body', False) and state['started'] is not None:
+                    STAGE_DURATION.observe(time.perf_counter() - state['started'], stage='response_send')
+                    BYTES_OUT_TOTAL.inc(state['sent_bytes'])
+            await send(message)
+
+        try:
+            await self.app(scope, receive_with_metrics, send_with_metrics)
+        finally:
+            # ルーティング後は scope['route'] にマッチしたルートが入る
+            route = scope.get('route')
+            endpoint = getattr(route, 'path', None) or 'unmatched'
+            REQUESTS_TOTAL.inc(endpoint=endpoint, method=scope['method'], outcome=request_outcome(state['status']))
+
+
+class TracingMiddleware:
+    """リクエストのトレースを開始し、レスポンスにトレースIDを付けるASGIミドルウェア"""
+
+    def __init__(self, asgi_app):
+        self.app = asgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_span_id = trace_context_from_headers(Headers(scope=scope))
+        request_span = start_span(
+            f"{scope['method']} {scope['path']}", trace_id=trace_id, parent_span_id=parent_span_id,
+            kind=SPAN_KIND_SERVER, **{'http.request.method': scope['method']}
+        )
+        token = activate(request_span)
+        state = {'status': 500, 'send_span': None}
+
+        async def send_with_trace(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+                MutableHeaders(scope=message).append(TRACE_ID_HEADER, trace_id)
+                state['send_span'] = start_span('response_send')
+            elif message['type'] == 'http.response.body' and not message.get('more_body', False):
+                if state['send_span'] is not None:
+                    state['send_span'].end()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except Exception as e:
+            if request_span is not None:
+                request_span.set_error(e)
+            raise
+        finally:
+            deactivate(token)
+            if request_span is not None:
+                route = getattr(scope.get('route'), 'path', None)
+                if route:
+                    request_span.name = f"{scope['method']} {route}"
+                    request_span.set_attribute('http.route', route)
+                request_span.set_attribute('http.response.status_code', state['status'])
+                if request_span.status_code != STATUS_CODE_ERROR:
+                    request_span.status_code = STATUS_CODE_ERROR if state['status'] >= 500 else STATUS_CODE_OK
+                request_span.end()
+
+
+class RequestSizeLimitMiddleware:
+    """
+    リクエスト全体の上限を超える場合に413を返すASGIミドルウェア
+
+    Content-Length が上限を超える場合は本文を読む前に返し、Content-Length の無い（chunked）リクエストは
+    受信したバイト数を数えて、上限を超えた時点で受信を中断する
+    """
+
+    def __init__(self, asgi_app, max_bytes: int):
+        self.app = asgi_app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get('headers') or [])
+        content_length = headers.get(b'content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        state = {'received': 0, 'started': False}
+
+        async def receive_with_limit():
+            message = await receive()
+            if message['type'] == 'http.request':
+                state['received'] += len(message.get('body', b''))
+                if state['received'] > self.max_bytes:
+                    raise UploadTooLargeError('', self.max_bytes)
+            return message
+
+        async def send_with_state(message):
+            if message['type'] == 'http.response.start':
+                state['started'] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_with_limit, send_with_state)
+        except UploadTooLargeError:
+            # フォームの解析以外で本文を読んだ場合（フォームの解析中は too_large が413を返す）
+            if state['started']:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        logger.warning("アップロードされたリクエストのサイズが制限を超えています")
+        response = create_response(
+            success=False,
+            message=f"ファイルサイズが制限（{format_bytes(self.max_bytes)}）を超えています",
+            status_code=413
+        )
+        await response(scope, receive, send)
+
+
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=config.UPLOAD_MAX_REQUEST_BYTES)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
+
+def create_response(success: bool, message: str, data: Dict[str, Any] = None,
+                    status_code: int = 200, headers: Dict[str, str] = None) -> JSONResponse:
+    """
+    統一されたAPIレスポンス形式を作成（api_server.create_response と同じ形式）
+
+    Args:
+        success: 成功フラグ
+        message: レスポンスメッセージ
+        data: レスポンスデータ
+        status_code: HTTPステータスコード
+        headers: 追加のレスポンスヘッダー
+
+    Returns:
+        JSONResponse: レスポンス
+    """
+    return JSONResponse(
+        {
+            'success': success,
+            'message': message,
+            'timestamp': datetime.now().isoformat(),
+            'data': data or {}
+        },
+        status_code=status_code,
+        headers=headers
+    )
+
+
+@app.exception_handler(UploadTooLargeError)
+async def too_large(_request, e: UploadTooLargeError):
+    """ファイルサイズが形式ごと（またはリクエスト全体）の上限を超えた場合のエラーハンドラー"""
+    if not e.filename:
+        logger.warning("アップロードされたリクエストのサイズが制限を超えています")
+        message = f"ファイルサイズが制限（{format_bytes(e.limit)}）を超えています"
+    else:
+        logger.warning(f"アップロードされたファイルのサイズが制限を超えています: {e.filename}")
+        message = f"ファイルサイズが制限（{format_bytes(e.limit)}）を超えています: {e.filename}"
+    return create_response(success=False, message=message, status_code=413)
+
+
+@app.exception_handler(UploadTooLargeHTTPException)
+async def too_large_while_parsing(request, e: UploadTooLargeHTTPException):
+    """フォームの解析（アップロードの受信）中に上限を超えた場合のエラーハンドラー"""
+    return await too_large(request, e.error)
+
+
+@app.exception_handler(Exception)
+async def internal_error(_request, e: Exception):
+    """内部サーバーエラーのハンドラー"""
+    logger.error(f"内部サーバーエラー: {str(e)}")
+    return create_response(
+        success=False,
+        message="内部サーバーエラーが発生しました",
+        status_code=500
+    )
+
+
+def save_upload_with_digest(upload: UploadFile, upload_folder: str) -> Tuple[str, str]:
+    """
+    アップロードされたファイルを保存し、内容のSHA-256を取得（ブロッキング処理）
+
+    ファイルは受信時に StreamingMultiPartParser が形式ごとのサイズ上限を確認しながら書き込み済みのため、
+    ここでは保存先に移動するだけでコピーしない
+
+    Args:
+        upload: アップロードされたファイル
+        upload_folder: アップロード先フォルダ
+
+    Returns:
+        tuple: (保存されたファイルのパス, SHA-256の16進数文字列)
+    """
+    filename = secure_filename(upload.filename)
+    stream: HashingUploadStream = upload.file
+    file_path = stream.claim(os.path.join(upload_folder, f"{uuid.uuid4()}_{filename}"))
+    logger.info(f"ファイルが保存されました: {file_path}")
+    return file_path, stream.hexdigest()
+
+
+def _file_response(workspace: RequestWorkspace, path: str, download_name: str, media_type: str,
+                   headers: Dict[str, str] = None, etag: str = None) -> Response:
+    """
+    ファイルを返し、送信完了後に作業ディレクトリを削除するレスポンス（Range に対応）
+
+    ANY2PDF_SENDFILE が有効な場合は X-Sendfile / X-Accel-Redirect でWebサーバーに送信を任せ、
+    作業ディレクトリはWebサーバーが読み終えるまで残してジャニターに削除を任せる。
+    """
+    headers = dict(headers or {})
+    if etag:
+        headers['ETag'] = f'"{etag}"'
+
+    offload = offload_headers(path)
+    if offload is not None:
+        workspace.keep()
+        disposition = FileResponse(path, filename=download_name).headers['content-disposition']
+        response = Response(
+            status_code=200, media_type=media_type,
+            headers={**headers, **offload, 'Content-Disposition': disposition}
+        )
+        del response.headers['content-length']
+        return response
+
+    workspace.defer()
+    return FileResponse(
+        os.path.abspath(path),
+        media_type=media_type,
+        filename=download_name,
+        headers=headers,
+        background=BackgroundTask(workspace.cleanup)
+    )
+
+
+def _validate_single_upload(file: Optional[UploadFile], allowed_extensions: set) -> Optional[JSONResponse]:
+    """単一ファイルのアップロードを検証（問題が無ければNone）"""
+    if file is None:
+        logger.warning("ファイルがリクエストに含まれていません")
+        return create_response(success=False, message="ファイルが指定されていません", status_code=400)
+    if not file.filename:
+        logger.warning("ファイルが選択されていません")
+        return create_response(success=False, message="ファイルが選択されていません", status_code=400)
+    if not allowed_file(file.filename, allowed_extensions):
+        logger.warning(f"サポートされていないファイル形式: {file.filename}")
+        return create_response(
+            success=False,
+            message=f"サポートされていないファイル形式です。許可される形式: {', '.join(allowed_extensions)}",
+            status_code=400
+        )
+    return None
+
+
+def _validate_image_profile(profile: Optional[str]) -> Optional[JSONResponse]:
+    """画像変換プロファイル名を検証（問題が無ければNone）"""
+    try:
+        get_image_profile(profile)
+    except ConvertToPdfError as e:
+        logger.warning(str(e))
+        return create_response(success=False, message=str(e), status_code=400)
+    return None
+
+
+def _parse_optimize(value: str) -> Tuple[bool, Optional[JSONResponse]]:
+    """`optimize` の値を検証して真偽値に変換（不正な場合はエラーレスポンスを返す）"""
+    optimize = parse_optimize_option(value)
+    if optimize is None:
+        logger.warning(f"optimize の値が不正です: {value}")
+        return False, create_response(
+            success=False, message="optimize には true または false を指定してください", status_code=400
+        )
+    return optimize, None
+
+
+def _parse_split(split_pages: str, page_ranges: str) -> Tuple[Optional[Dict[str, Any]], Optional[JSONResponse]]:
+    """`split_pages`・`page_ranges` を検証して分割の指定に変換（不正な場合はエラーレスポンスを返す）"""
+    try:
+        return parse_split_options(split_pages, page_ranges), None
+    except PageRangeError as e:
+        logger.warning(str(e))
+        return None, create_response(success=False, message=str(e), status_code=400)
+
+
+async def _split_response(workspace: RequestWorkspace, pdf_path: str, download_base: str,
+                          split: Dict[str, Any], etag: str = None) -> Response:
+    """分割したチャンクのPDFと一覧をZIPで返すレスポンス"""
+    archive_path, chunk_count = await run_blocking(
+        build_split_archive, pdf_path, workspace.output_dir, download_base, split
+    )
+    logger.info(f"分割したPDFを送信します: {archive_path}（{chunk_count}チャンク）")
+    return _file_response(
+        workspace, archive_path, f"{download_base}_pages.zip", 'application/zip',
+        headers={'X-Split-Chunks': str(chunk_count)}, etag=etag
+    )
+
+
+async def _convert_single(file: UploadFile, converter, split: Dict[str, Any] = None, if_none_match: str = None,
+                         **options) -> Response:
+    """
+    1ファイルを保存・変換してPDFを返す（Office・画像共通。split の指定があれば分割してZIPで返す）
+
+    If-None-Match が同じ内容・オプションの変換結果のETagに一致する場合は、変換せずに304を返す。
+    """
+    workspace = create_workspace()
+    try:
+        file_path, digest = await run_blocking(save_upload_with_digest, file, workspace.upload_dir)
+        etag = result_etag(digest, {**{name: value for name, value in options.items() if name != 'filename'},
+                                    'split': split})
+        if etag_matches(if_none_match, etag):
+            logger.info(f"変換結果はクライアントが保持しているものと同じです (ETag: {etag})")
+            return Response(status_code=304, headers={'ETag': f'"{etag}"'})
+        pdf_path = await run_blocking(converter, file_path, workspace.output_dir, input_digest=digest, **options)
+        await run_blocking(os.remove, file_path)
+
+        absolute_pdf_path = os.path.abspath(pdf_path)
+        if not os.path.exists(absolute_pdf_path):
+            logger.error(f"変換されたPDFファイルが見つかりません: {absolute_pdf_path}")
+            return create_response(
+                success=False,
+                message="PDF変換は完了しましたが、ファイルが見つかりません",
+                status_code=500
+            )
+
+        download_base = os.path.splitext(file.filename)[0]
+        if split is not None:
+            return await _split_response(workspace, absolute_pdf_path, download_base, split, etag)
+
+        logger.info(f"PDFファイルを送信します: {absolute_pdf_path}")
+        return _file_response(workspace, absolute_pdf_path, f"{download_base}.pdf", 'application/pdf', etag=etag)
+    except InvalidOptionError as e:
+        logger.warning(str(e))
+        return create_response(success=False, message=str(e), status_code=400)
+    except ConvertToPdfError as e:
+        logger.error(f"PDF変換エラー: {str(e)}")
+        return create_response(
+            success=False,
+            message=f"PDF変換中にエラーが発生しました: {str(e)}",
+            status_code=500
+        )
+    except UploadTooLargeError:
+        raise
+    except Exception as e:
+        logger.error(f"予期しないエラー: {str(e)}")
+        return create_response(
+            success=False,
+            message="予期しないエラーが発生しました",
+            status_code=500
+        )
+    finally:
+        await run_blocking(workspace.release)
+
+
+@app.get('/api/health')
+async def health_check():
+    """
+    ヘルスチェックエンドポイント
+    APIサーバーの状態を確認
+    """
+    logger.info("ヘルスチェックが要求されました")
+    cache = get_conversion_cache()
+    return create_response(
+        success=True,
+        message="APIサーバーは正常に動作しています",
+        data={
+            'version': '1.0.0',
+            'service': 'PDF変換API',
+            'status': 'healthy',
+            'office_pool': get_office_pool_status(),
+            'cache': await run_blocking(cache.stats) if cache else None,
+            'storage': get_storage_janitor_status(),
+            'image_profiles': image_profile_names()
+        }
+    )
+
+
+@app.get('/api/metrics')
+async def metrics():
+    """
+    メトリクスエンドポイント
+    Prometheusのテキスト形式でメトリクスを返す（値はワーカープロセスごと）
+    """
+    return Response(render_metrics(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.post('/api/convert/office')
+async def convert_office_to_pdf(file: Optional[UploadFile] = File(None), optimize: str = Form(''),
+                                split_pages: str = Form(''), page_ranges: str = Form(''),
+                                sheets: str = Form(''), print_area: str = Form(''),
+                                max_rows: str = Form(''), max_cols: str = Form(''),
+                                if_none_match: Optional[str] = Header(None)):
+    """
+    OfficeファイルをPDFに変換するエンドポイント
+
+    Returns:
+        PDF: 変換されたPDFファイル
+    """
+    logger.info("Officeファイル変換リクエストを受信しました")
+    error = _validate_single_upload(file, ALLOWED_OFFICE_EXTENSIONS)
+    if error is not None:
+        return error
+    optimize, error = _parse_optimize(optimize)
+    if error is not None:
+        return error
+    split, error = _parse_split(split_pages, page_ranges)
+    if error is not None:
+        return error
+    try:
+        spreadsheet_options = spreadsheet_options_for(file.filename, sheets, print_area, max_rows, max_cols)
+    except SpreadsheetOptionError as e:
+        logger.warning(str(e))
+        return create_response(success=False, message=str(e), status_code=400)
+    return await _convert_single(file, convert_file_to_pdf, split=split, if_none_match=if_none_match,
+                                 filename=file.filename, kinds=OFFICE_ENDPOINT_KINDS, optimize=optimize,
+                                 **spreadsheet_options)
+
+
+@app.post('/api/convert/image')
+async def convert_image_file_to_pdf(file: Optional[UploadFile] = File(None), profile: str = Form(''),
+                                    optimize: str = Form(''), split_pages: str = Form(''),
+                                    page_ranges: str = Form(''), if_none_match: Optional[str] = Header(None)):
+    """
+    画像ファイルをPDFに変換するエンドポイント
+
+    Returns:
+        PDF: 変換されたPDFファイル
+    """
+    logger.info("画像ファイル変換リクエストを受信しました")
+    error = _validate_single_upload(file, ALLOWED_IMAGE_EXTENSIONS)
+    if error is not None:
+        return error
+    profile = profile.strip() or None
+    error = _validate_image_profile(profile)
+    if error is not None:
+        return error
+    optimize, error = _parse_optimize(optimize)
+    if error is not None:
+        return error
+    split, error = _parse_split(split_pages, page_ranges)
+    if error is not None:
+        return error
+    return await _convert_single(file, convert_file_to_pdf, split=split, if_none_match=if_none_match,
+                                 filename=file.filename, kinds=IMAGE_ENDPOINT_KINDS, profile=profile,
+                                 optimize=optimize)
+
+
+@app.post('/api/convert/office/batch')
+async def convert_office_batch_to_pdf(files: Optional[List[UploadFile]] = File(None)):
+    """
+    複数のOfficeファイルをまとめてPDFに変換するエンドポイント
+
+    Returns:
+        ZIP: 変換されたPDFと変換結果（results.json）
+    """
+    logger.info("Officeファイル一括変換リクエストを受信しました")
+
+    files = [file for file in files or [] if file.filename]
+    if not files:
+        logger.warning("ファイルがリクエストに含まれていません")
+        return create_response(success=False, message="ファイルが指定されていません", status_code=400)
+
+    workspace = create_workspace()
+    try:
+        results: List[Optional[Dict[str, Any]]] = []
+        saved = []
+        for file in files:
+            if not allowed_file(file.filename, ALLOWED_OFFICE_EXTENSIONS):
+                logger.warning(f"サポートされていないファイル形式: {file.filename}")
+                results.append({
+                    'filename': file.filename,
+                    'success': False,
+                    'pdf_name': None,
+                    'error': f"サポートされていないファイル形式です。許可される形式: {', '.join(ALLOWED_OFFICE_EXTENSIONS)}"
+                })
+                continue
+            file_path, _ = await run_blocking(save_upload_with_digest, file, workspace.upload_dir)
+            saved.append((len(results), file.filename, file_path))
+            results.append(None)
+
+        try:
+            converted = await run_blocking(
+                convert_office_files_to_pdf, [path for _, _, path in saved], workspace.output_dir
+            )
+        except ConvertToPdfError as e:
+            logger.error(f"PDF変換エラー: {str(e)}")
+            return create_response(
+                success=False,
+                message=f"PDF変換中にエラーが発生しました: {str(e)}",
+                status_code=500
+            )
+
+        pdf_paths = merge_batch_results(results, saved, converted)
+        succeeded = sum(1 for result in results if result['success'])
+        logger.info(f"Officeファイルの一括変換が完了しました: 成功 {succeeded}/{len(results)}")
+
+        if succeeded == 0:
+            return create_response(
+                success=False,
+                message="すべてのファイルの変換に失敗しました",
+                data={'results': results},
+                status_code=500
+            )
+
+        # PDFと変換結果をZIPにまとめる（作業ディレクトリ内に作成し、送信後に削除）
+        archive_path = os.path.join(workspace.output_dir, 'converted_pdfs.zip')
+
+        def _write_archive():
+            with open(archive_path, 'wb') as archive:
+                write_batch_archive(archive, pdf_paths, results)
+
+        await run_blocking(_write_archive)
+        return _file_response(
+            workspace, archive_path, 'converted_pdfs.zip', 'application/zip',
+            headers={
+                'X-Convert-Succeeded': str(succeeded),
+                'X-Convert-Failed': str(len(results) - succeeded)
+            }
+        )
+    finally:
+        await run_blocking(workspace.release)
+
+
+@app.post('/api/convert/images')
+async def convert_images_to_single_pdf_endpoint(files: Optional[List[UploadFile]] = File(None),
+                                                archive: Optional[UploadFile] = File(None),
+                                                name: str = Form(''),
+                                                profile: str = Form(''),
+                                                optimize: str = Form(''),
+                                                split_pages: str = Form(''),
+                                                page_ranges: str = Form('')):
+    """
+    複数の画像ファイルを1つのPDFに変換するエンドポイント
+
+    画像はmultipartの `files`（送信順）またはZIPアーカイブの `archive`
+    （ファイル名の自然順）で指定する
+
+    Returns:
+        PDF: 全画像を順番にページとした1つのPDF
+    """
+    logger.info("複数画像変換リクエストを受信しました")
+
+    files = [file for file in files or [] if file.filename]
+    if archive is not None and not archive.filename:
+        archive = None
+
+    if not files and archive is None:
+        logger.warning("ファイルがリクエストに含まれていません")
+        return create_response(success=False, message="ファイルが指定されていません", status_code=400)
+
+    for file in files:
+        if not allowed_file(file.filename, ALLOWED_IMAGE_EXTENSIONS):
+            logger.warning(f"サポートされていないファイル形式: {file.filename}")
+            return create_response(
+                success=False,
+                message=f"サポートされていないファイル形式です（{file.filename}）。許可される形式: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}",
+                status_code=400
+            )
+
+    if archive is not None and not allowed_file(archive.filename, ALLOWED_ARCHIVE_EXTENSIONS):
+        logger.warning(f"サポートされていないアーカイブ形式: {archive.filename}")
+        return create_response(success=False, message="アーカイブはZIP形式で指定してください", status_code=400)
+
+    profile = profile.strip() or None
+    error = _validate_image_profile(profile)
+    if error is not None:
+        return error
+    optimize, error = _parse_optimize(optimize)
+    if error is not None:
+        return error
+    split, error = _parse_split(split_pages, page_ranges)
+    if error is not None:
+        return error
+
+    output_name = secure_filename(name) or 'images'
+    workspace = create_workspace()
+    try:
+        image_paths = []
+        for file in files:
+            file_path, _ = await run_blocking(save_upload_with_digest, file, workspace.upload_dir)
+            image_paths.append(file_path)
+        if archive is not None:
+            archive_path, _ = await run_blocking(save_upload_with_digest, archive, workspace.upload_dir)
+            image_paths.extend(await run_blocking(
+                extract_images_from_zip, archive_path, os.path.join(workspace.upload_dir, 'archive')
+            ))
+
+        if not image_paths:
+            return create_response(
+                success=False,
+                message="アーカイブに変換できる画像が含まれていません",
+                status_code=400
+            )
+
+        pdf_path = await run_blocking(
+            convert_images_to_single_pdf, image_paths, workspace.output_dir, output_name, profile=profile,
+            optimize=optimize
+        )
+        logger.info(f"{len(image_paths)}枚の画像の変換が完了しました: {pdf_path}")
+        if split is not None:
+            return await _split_response(workspace, pdf_path, output_name, split)
+        return _file_response(workspace, pdf_path, f"{output_name}.pdf", 'application/pdf')
+
+    except zipfile.BadZipFile:
+        logger.warning("ZIPアーカイブが不正です")
+        return create_response(success=False, message="ZIPアーカイブを読み込めません", status_code=400)
+    except InvalidOptionError as e:
+        logger.warning(str(e))
+        return create_response(success=False, message=str(e), status_code=400)
+    except ConvertToPdfError as e:
+        logger.error(f"PDF変換エラー: {str(e)}")
+        return create_response(
+            success=False,
+            message=f"PDF変換中にエラーが発生しました: {str(e)}",
+            status_code=500
+        )
+    except UploadTooLargeError:
+        raise
+    except Exception as e:
+        logger.error(f"予期しないエラー: {str(e)}")
+        return create_response(
+            success=False,
+            message="予期しないエラーが発生しました",
+            status_code=500
+        )
+    finally:
+        await run_blocking(workspace.release)
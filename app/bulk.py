@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""
+ディレクトリツリーの一括変換
+入力ディレクトリ以下のファイルを並列にPDFへ変換し、同じ構成の出力ディレクトリに書き出す
+
+変換結果はマニフェスト（SQLite）にファイルごとに記録し、再実行時は変更の無いファイルを飛ばす。
+記録は1ファイルの変換が終わるたびに確定し、PDFは一時ファイルから置き換えて書き出すため、
+途中で異常終了しても再実行すれば続きから変換できる。
+"""
+
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from .conversion_cache import hash_file
+from .exceptions import UnsupportedFormatError
+from .formats import KIND_IMAGE, KIND_OFFICE, KIND_PDF, extensions_for, resolve_format
+from .pdf_converter import convert_file_to_pdf
+
+logger = logging.getLogger(__name__)
+
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+STATUS_UNSUPPORTED = 'unsupported'
+# 変換しなかったファイル（マニフェストには記録しない）
+STATUS_SKIPPED = 'skipped'
+
+# 出力ディレクトリ内のマニフェストと作業ディレクトリの名前
+MANIFEST_NAME = '.any2pdf-manifest.sqlite3'
+WORK_DIR_NAME = '.any2pdf-work'
+
+# 変換対象とする拡張子（内容が異なる場合は内容に従って変換する）
+SOURCE_EXTENSIONS = set(extensions_for(KIND_OFFICE, KIND_IMAGE, KIND_PDF))
+
+
+class ConversionManifest:
+    """
+    ファイルごとの変換結果の記録
+
+    入力ファイルのパス（入力ディレクトリからの相対パス）ごとに、サイズ・更新時刻・SHA-256・
+    状態・出力パス・変換オプション・所要時間を保存する。書き込みは呼び出し元の1スレッドから行う。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT, '
+                'status TEXT NOT NULL, output TEXT, options TEXT NOT NULL, duration_ms REAL, error TEXT, '
+                'updated_at REAL NOT NULL)'
+            )
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """すべての記録を入力ファイルのパスごとに取得"""
+        return {row['path']: dict(row) for row in self._conn.execute('SELECT * FROM files')}
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """入力ファイルの記録を取得（無い場合はNone）"""
+        row = self._conn.execute('SELECT * FROM files WHERE path = ?', (path,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """変換結果を記録（同じパスの記録は置き換える）"""
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO files '
+                '(path, size, mtime_ns, sha256, status, output, options, duration_ms, error, updated_at) '
+                'VALUES (:path, :size, :mtime_ns, :sha256, :status, :output, :options, :duration_ms, :error, '
+                ':updated_at)',
+                {**entry, 'updated_at': time.time()}
+            )
+
+    def touch(self, path: str, size: int, mtime_ns: int) -> None:
+        """内容が変わっていないファイルのサイズ・更新時刻だけを更新"""
+        with self._conn:
+            self._conn.execute(
+                'UPDATE files SET size = ?, mtime_ns = ?, updated_at = ? WHERE path = ?',
+                (size, mtime_ns, time.time(), path)
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def options_key(options: Dict[str, Any]) -> str:
+    """変換オプションを比較用の文字列に変換（未指定のオプションは省略）"""
+    return json.dumps({name: value for name, value in options.items() if value}, sort_keys=True)
+
+
+def is_source_file(name: str) -> bool:
+    """変換対象のファイル名か（隠しファイルとOfficeの所有者ファイル ~$xxx.docx は対象外）"""
+    if name.startswith(('.', '~$')) or '.' not in name:
+        return False
+    return name.rsplit('.', 1)[1].lower() in SOURCE_EXTENSIONS
+
+
+def scan_tree(source_root: str, exclude: List[str] = None) -> List[Tuple[str, int, int]]:
+    """
+    入力ディレクトリ以下の変換対象ファイルを列挙
+
+    Args:
+        source_root: 入力ディレクトリ
+        exclude: たどらないディレクトリ（入力ディレクトリ内に出力ディレクトリがある場合など）
+
+    Returns:
+        List[Tuple[str, int, int]]: (相対パス, サイズ, 更新時刻（ナノ秒）) のパス順のリスト
+    """
+    excluded = {os.path.abspath(path) for path in exclude or []}
+    files = []
+    for dir_path, dir_names, file_names in os.walk(source_root):
+        dir_names[:] = sorted(
+            name for name in dir_names
+            if os.path.abspath(os.path.join(dir_path, name)) not in excluded and not name.startswith('.any2pdf')
+        )
+        for name in sorted(file_names):
+            if not is_source_file(name):
+                continue
+            path = os.path.join(dir_path, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((os.path.relpath(path, source_root), stat.st_size, stat.st_mtime_ns))
+    return files
+
+
+def plan_output_paths(rel_paths: List[str]) -> Dict[str, str]:
+    """
+    入力ファイルの相対パスから出力PDFの相対パスを決める
+
+    report.docx は report.pdf になる。同じディレクトリに拡張子だけが異なるファイル
+    （report.docx と report.xlsx など）がある場合は、拡張子を残して report.docx.pdf とする。
+    """
+    stems: Dict[Tuple[str, str], int] = {}
+    for rel_path in rel_paths:
+        key = (os.path.dirname(rel_path), os.path.splitext(os.path.basename(rel_path))[0].lower())
+        stems[key] = stems.get(key, 0) + 1
+
+    outputs = {}
+    for rel_path in rel_paths:
+        directory, name = os.path.split(rel_path)
+        stem = os.path.splitext(name)[0]
+        if stems[(directory, stem.lower())] > 1:
+            stem = name
+        outputs[rel_path] = os.path.join(directory, f"{stem}.pdf")
+    return outputs
+
+
+def plan_output_path(source_root: str, rel_path: str) -> str:
+    """1ファイルの出力PDFの相対パスを、同じディレクトリのファイルと合わせて plan_output_paths の規則で決める"""
+    directory = os.path.dirname(rel_path)
+    try:
+        names = os.listdir(os.path.join(source_root, directory))
+    except OSError:
+        names = []
+    siblings = {os.path.join(directory, name) for name in names if is_source_file(name)}
+    siblings.add(rel_path)
+    return plan_output_paths(sorted(siblings))[rel_path]
+
+
+def convert_to_output(source_path: str, output_path: str, work_root: str, filename: str = None,
+                      **options) -> str:
+    """
+    1ファイルを変換し、出力先に置き換えで書き出す（利用者が書き込み途中のPDFを見ることはない）
+
+    Args:
+        source_path: 入力ファイルのパス
+        output_path: 出力PDFのパス
+        work_root: 作業ディレクトリの親（出力先と同じファイルシステム上に置く）
+        filename: 元のファイル名（エラーメッセージ用）
+        **options: convert_file_to_pdf に渡すオプション
+
+    Returns:
+        str: 出力PDFのパス
+    """
+    work_dir = os.path.join(work_root, uuid.uuid4().hex)
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        pdf_path = convert_file_to_pdf(source_path, work_dir, filename=filename, **options)
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        os.replace(pdf_path, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
+
+
+def _format_duration(seconds: float) -> str:
+    """秒数を H:MM:SS 形式に変換"""
+    seconds = int(max(0, seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressReporter:
+    """変換の進捗・スループット・残り時間の表示"""
+
+    def __init__(self, total_files: int, total_bytes: int, stream: TextIO):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.stream = stream
+        self.started = time.monotonic()
+        self.done_files = 0
+        self.done_bytes = 0
+        self.counts = {STATUS_SUCCEEDED: 0, STATUS_FAILED: 0, STATUS_UNSUPPORTED: 0, STATUS_SKIPPED: 0}
+
+    def update(self, rel_path: str, size: int, status: str, detail: str = None) -> None:
+        """1ファイルの処理完了を記録して進捗を表示"""
+        self.done_files += 1
+        self.done_bytes += size
+        self.counts[status] += 1
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        files_per_second = self.done_files / elapsed
+        bytes_per_second = self.done_bytes / elapsed
+        # ファイルサイズの偏りが大きいため、残り時間は処理済みのバイト数から見積もる
+        if bytes_per_second > 0:
+            eta = (self.total_bytes - self.done_bytes) / bytes_per_second
+        else:
+            eta = (self.total_files - self.done_files) / files_per_second
+        percent = self.done_files * 100 / self.total_files if self.total_files else 100.0
+        line = (
+            f"[{self.done_files}/{self.total_files}] {percent:5.1f}% "
+            f"{files_per_second:.1f} files/s {bytes_per_second / 1024 / 1024:.1f} MB/s "
+            f"ETA {_format_duration(eta)} {status}: {rel_path}"
+        )
+        if detail:
+            line += f" ({detail})"
+        print(line, file=self.stream, flush=True)
+
+    def summary(self) -> Dict[str, Any]:
+        """処理結果の集計"""
+        return {
+            'files': self.done_files,
+            'bytes': self.done_bytes,
+            'elapsed_seconds': round(time.monotonic() - self.started, 1),
+            **self.counts,
+        }
+
+
+class BulkConverter:
+    """
+    ディレクトリツリーの一括変換
+
+    LibreOfficeの変換はワーカープールの空きを待って実行し、画像・PDFは並列数の上限まで同時に処理する。
+    ワーカープールが無効な場合も、sofficeは呼び出しごとに専用のプロファイルで起動するため並列に実行できる。
+    """
+
+    def __init__(self, source_root: str, output_root: str, workers: int = 4, manifest_path: str = None,
+                 force: bool = False, retry_failed: bool = False, stream: TextIO = None, **options):
+        """
+        Args:
+            source_root: 入力ディレクトリ
+            output_root: 出力ディレクトリ
+            workers: 同時に変換するファイル数
+            manifest_path: マニフェストのパス（省略時は出力ディレクトリ内の .any2pdf-manifest.sqlite3）
+            force: マニフェストの記録にかかわらずすべて変換し直すか
+            retry_failed: 前回失敗したファイルを、変更が無くても変換し直すか
+            stream: 進捗の出力先
+            **options: 変換オプション（optimize, profile）
+        """
+        self.source_root = os.path.abspath(source_root)
+        self.output_root = os.path.abspath(output_root)
+        self.workers = max(1, workers)
+        self.manifest_path = manifest_path or os.path.join(self.output_root, MANIFEST_NAME)
+        self.force = force
+        self.retry_failed = retry_failed
+        self.stream = stream
+        self.options = options
+        self.options_key = options_key(options)
+        self.work_root = os.path.join(self.output_root, WORK_DIR_NAME)
+
+    def is_current(self, entry: Optional[Dict[str, Any]], output_rel: str) -> bool:
+        """記録された変換結果を再利用できるか（入力ファイルの内容は呼び出し元で確認する）"""
+        if self.force or entry is None or entry['options'] != self.options_key:
+            return False
+        if entry['status'] == STATUS_SUCCEEDED:
+            return entry['output'] == output_rel and os.path.exists(os.path.join(self.output_root, output_rel))
+        if entry['status'] == STATUS_FAILED:
+            return not self.retry_failed
+        return entry['status'] == STATUS_UNSUPPORTED
+
+    def convert_file(self, rel_path: str, output_rel: str, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """1ファイルを変換して結果を返す（ワーカースレッドで実行。マニフェストへの記録は record_result で行う）"""
+        source_path = os.path.join(self.source_root, rel_path)
+        started = time.perf_counter()
+        result = {'path': rel_path, 'sha256': None, 'output': None, 'error': None}
+        try:
+            result['sha256'] = hash_file(source_path)
+            # 更新時刻だけが変わったファイルは、内容が同じなら前回の結果を使う
+            if previous is not None and previous['sha256'] == result['sha256'] \
+                    and self.is_current(previous, output_rel):
+                result['status'] = STATUS_SKIPPED
+                return result
+
+            file_format = resolve_format(source_path, rel_path)
+            output_path = os.path.join(self.output_root, output_rel)
+            options = {'file_format': file_format, 'input_digest': result['sha256'], **self.options}
+            convert_to_output(source_path, output_path, self.work_root, rel_path, **options)
+            result['status'] = STATUS_SUCCEEDED
+            result['output'] = output_rel
+        except UnsupportedFormatError as e:
+            result['status'] = STATUS_UNSUPPORTED
+            result['error'] = str(e)
+        except Exception as e:
+            result['status'] = STATUS_FAILED
+            result['error'] = str(e)
+        result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def run(self) -> Dict[str, Any]:
+        """
+        一括変換を実行
+
+        Returns:
+            Dict: 処理結果の集計（files, bytes, elapsed_seconds, 状態ごとの件数）
+        """
+        if not os.path.isdir(self.source_root):
+            raise NotADirectoryError(f"入力ディレクトリが存在しません: {self.source_root}")
+        os.makedirs(self.output_root, exist_ok=True)
+        # 前回の異常終了で残った作業ディレクトリを削除
+        shutil.rmtree(self.work_root, ignore_errors=True)
+
+        manifest = ConversionManifest(self.manifest_path)
+        try:
+            return self._run(manifest)
+        finally:
+            manifest.close()
+            shutil.rmtree(self.work_root, ignore_errors=True)
+
+    def _run(self, manifest: ConversionManifest) -> Dict[str, Any]:
+        files = scan_tree(self.source_root, exclude=[self.output_root])
+        outputs = plan_output_paths([rel_path for rel_path, _, _ in files])
+        entries = manifest.load()
+
+        # サイズ・更新時刻が記録と同じファイルはハッシュも計算せずに飛ばす
+        pending = []
+        skipped = 0
+        for rel_path, size, mtime_ns in files:
+            entry = entries.get(rel_path)
+            if entry is not None and entry['size'] == size and entry['mtime_ns'] == mtime_ns \
+                    and self.is_current(entry, outputs[rel_path]):
+                skipped += 1
+                continue
+            pending.append((rel_path, size, mtime_ns))
+
+        total_bytes = sum(size for _, size, _ in pending)
+        print(
+            f"{len(files)}ファイル中 {len(pending)}ファイルを変換します"
+            f"（変更なし {skipped}ファイル, {total_bytes / 1024 / 1024:.1f} MB, 並列数 {self.workers}）",
+            file=self.stream, flush=True
+        )
+        progress = ProgressReporter(len(pending), total_bytes, self.stream)
+        progress.counts[STATUS_SKIPPED] = skipped
+
+        tasks = iter(pending)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='any2pdf-bulk') as executor:
+            in_flight = {}
+
+            def _submit_next() -> bool:
+                task = next(tasks, None)
+                if task is None:
+                    return False
+                rel_path = task[0]
+                future = executor.submit(self.convert_file, rel_path, outputs[rel_path], entries.get(rel_path))
+                in_flight[future] = task
+                return True
+
+            # 未処理のファイルを一度にキューへ積まず、並列数の2倍までに抑える
+            for _ in range(self.workers * 2):
+                if not _submit_next():
+                    break
+            try:
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        rel_path, size, mtime_ns = in_flight.pop(future)
+                        result = future.result()
+                        self.record_result(manifest, result, size, mtime_ns)
+                        progress.update(rel_path, size, result['status'], result['error'])
+                        _submit_next()
+            except KeyboardInterrupt:
+                # 実行中の変換の完了を待たずに終了する（記録済みの結果は次回の実行で再利用される）
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+        summary = progress.summary()
+        summary['files'] += skipped
+        return summary
+
+    def record_result(self, manifest: ConversionManifest, result: Dict[str, Any], size: int, mtime_ns: int) -> None:
+        """変換結果をマニフェストに記録"""
+        if result['status'] == STATUS_SKIPPED:
+            manifest.touch(result['path'], size, mtime_ns)
+            return
+        manifest.record({
+            'path': result['path'],
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': result['sha256'],
+            'status': result['status'],
+            'output': result['output'],
+            'options': self.options_key,
+            'duration_ms': result['duration_ms'],
+            'error': result['error'],
+        })
+        if result['status'] == STATUS_FAILED:
+            logger.warning(f"変換に失敗しました: {result['path']}: {result['error']}")
+
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+アプリケーション設定
+環境変数から読み込む設定値を一元管理
+"""
+
+import os
+import tempfile
+
+
+def _env_int(name: str, default: int) -> int:
+    """環境変数を整数として読み込む（未設定・不正値の場合はデフォルト値）"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """環境変数を浮動小数点数として読み込む（未設定・不正値の場合はデフォルト値）"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """環境変数を真偽値として読み込む（1/true/yes/on を真とみなす。未設定の場合はデフォルト値）"""
+    value = os.environ.get(name)
+    if value is None or value.strip() == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# アップロード・出力フォルダ
+UPLOAD_FOLDER = os.environ.get('ANY2PDF_UPLOAD_FOLDER', 'uploads')
+OUTPUT_FOLDER = os.environ.get('ANY2PDF_OUTPUT_FOLDER', 'output')
+
+# LibreOffice実行ファイル
+SOFFICE_BINARY = os.environ.get('ANY2PDF_SOFFICE', 'soffice')
+
+# LibreOffice変換のタイムアウト（秒）
+# ファイルごとに 基本時間 + サイズ(MB) × 1MBあたりの時間（表計算は2倍、プレゼンテーションは1.5倍）とし、
+# OFFICE_CONVERT_TIMEOUT を1ファイルあたりの上限とする
+OFFICE_CONVERT_TIMEOUT = _env_int('ANY2PDF_OFFICE_CONVERT_TIMEOUT', 300)
+OFFICE_TIMEOUT_BASE = _env_float('ANY2PDF_OFFICE_TIMEOUT_BASE', 60.0)
+OFFICE_TIMEOUT_PER_MB = _env_float('ANY2PDF_OFFICE_TIMEOUT_PER_MB', 10.0)
+
+# sofficeのリソース上限
+# CPU時間はタイムアウトに対する倍率（0で無効化、常駐ワーカーには適用しない）、
+# アドレス空間はプロセスごとのMB（0で無効化）
+SOFFICE_CPU_LIMIT_FACTOR = _env_float('ANY2PDF_SOFFICE_CPU_LIMIT_FACTOR', 1.0)
+SOFFICE_MEMORY_LIMIT_MB = _env_int('ANY2PDF_SOFFICE_MEMORY_LIMIT_MB', 4096)
+
+# 一括変換で1回のsoffice起動にまとめる最大ファイル数
+OFFICE_BATCH_MAX_FILES = _env_int('ANY2PDF_OFFICE_BATCH_MAX_FILES', 50)
+
+# LibreOfficeワーカープール（0で無効化し、変換ごとにsofficeを起動する）
+OFFICE_POOL_SIZE = _env_int('ANY2PDF_OFFICE_POOL_SIZE', 2)
+OFFICE_POOL_HOST = os.environ.get('ANY2PDF_OFFICE_POOL_HOST', '127.0.0.1')
+OFFICE_POOL_BASE_PORT = _env_int('ANY2PDF_OFFICE_POOL_BASE_PORT', 2002)
+OFFICE_POOL_PROFILE_DIR = os.environ.get(
+    'ANY2PDF_OFFICE_POOL_PROFILE_DIR',
+    os.path.join(tempfile.gettempdir(), 'any2pdf_office_pool')
+)
+OFFICE_POOL_STARTUP_TIMEOUT = _env_float('ANY2PDF_OFFICE_POOL_STARTUP_TIMEOUT', 60.0)
+OFFICE_POOL_HEALTH_INTERVAL = _env_float('ANY2PDF_OFFICE_POOL_HEALTH_INTERVAL', 10.0)
+OFFICE_POOL_ACQUIRE_TIMEOUT = _env_float('ANY2PDF_OFFICE_POOL_ACQUIRE_TIMEOUT', 600.0)
+
+# 変換結果キャッシュ（上限に0を指定すると無効化）
+CACHE_DIR = os.environ.get('ANY2PDF_CACHE_DIR', 'cache')
+CACHE_MAX_BYTES = _env_int('ANY2PDF_CACHE_MAX_BYTES', 1024 * 1024 * 1024)
+CACHE_MAX_ENTRIES = _env_int('ANY2PDF_CACHE_MAX_ENTRIES', 10000)
+
+# 同時に要求された同じ変換（入力ファイルの内容と変換オプションが同じもの）を1回にまとめる
+# 別ワーカープロセスとの調整には CACHE_DIR/locks のロックファイルを使う（キャッシュが無効の場合はプロセス内のみ）
+SINGLE_FLIGHT = _env_bool('ANY2PDF_SINGLE_FLIGHT', True)
+SINGLE_FLIGHT_WAIT_TIMEOUT = _env_float('ANY2PDF_SINGLE_FLIGHT_WAIT_TIMEOUT', 600.0)
+
+# 変換後のPDF最適化（リニアライズ・オブジェクトストリーム・再圧縮・重複リソースの削除）
+# リクエストで optimize を指定しない場合の既定値と、再圧縮時のzlib圧縮レベル（1〜9）
+PDF_OPTIMIZE = _env_bool('ANY2PDF_PDF_OPTIMIZE', False)
+PDF_OPTIMIZE_FLATE_LEVEL = _env_int('ANY2PDF_PDF_OPTIMIZE_FLATE_LEVEL', 9)
+
+# 非同期変換ジョブ（ワーカー数、未完了ジョブの上限、完了後の保持期間（秒））
+JOB_WORKERS = _env_int('ANY2PDF_JOB_WORKERS', 2)
+JOB_MAX_PENDING = _env_int('ANY2PDF_JOB_MAX_PENDING', 100)
+JOB_TTL = _env_float('ANY2PDF_JOB_TTL', 3600.0)
+
+# Gradio画面（同時に処理するバッチ数、1つのバッチで同時に変換するファイル数）
+UI_CONCURRENCY = _env_int('ANY2PDF_UI_CONCURRENCY', 2)
+UI_BATCH_WORKERS = _env_int('ANY2PDF_UI_BATCH_WORKERS', 4)
+
+# 一括変換CLI（any2pdf.py）の同時に変換するファイル数
+BULK_WORKERS = _env_int('ANY2PDF_BULK_WORKERS', 4)
+
+# 監視フォルダ（書き込みが終わったとみなすまでの変化の無い時間（秒）、inotifyが使えない場合の走査間隔（秒））
+WATCH_SETTLE_SECONDS = _env_float('ANY2PDF_WATCH_SETTLE_SECONDS', 2.0)
+WATCH_POLL_INTERVAL = _env_float('ANY2PDF_WATCH_POLL_INTERVAL', 5.0)
+
+# アップロードサイズの上限（バイト）: リクエスト全体と形式ごと
+UPLOAD_MAX_REQUEST_BYTES = _env_int('ANY2PDF_UPLOAD_MAX_REQUEST_BYTES', 2 * 1024 * 1024 * 1024)
+UPLOAD_MAX_OFFICE_BYTES = _env_int('ANY2PDF_UPLOAD_MAX_OFFICE_BYTES', 512 * 1024 * 1024)
+UPLOAD_MAX_IMAGE_BYTES = _env_int('ANY2PDF_UPLOAD_MAX_IMAGE_BYTES', 100 * 1024 * 1024)
+UPLOAD_MAX_ARCHIVE_BYTES = _env_int('ANY2PDF_UPLOAD_MAX_ARCHIVE_BYTES', 1024 * 1024 * 1024)
+
+# ZIPアーカイブの展開の上限: 画像の件数、画像1件の展開後のサイズ（バイト）、展開後の合計サイズ（バイト）
+ZIP_MAX_MEMBERS = _env_int('ANY2PDF_ZIP_MAX_MEMBERS', 1000)
+ZIP_MAX_MEMBER_BYTES = _env_int('ANY2PDF_ZIP_MAX_MEMBER_BYTES', UPLOAD_MAX_IMAGE_BYTES)
+ZIP_MAX_TOTAL_BYTES = _env_int('ANY2PDF_ZIP_MAX_TOTAL_BYTES', 2 * 1024 * 1024 * 1024)
+
+# uploads/・output/ のジャニター（保持期間（秒）、フォルダごとの容量・件数の上限、
+# 削除対象外とする作成直後の猶予（秒）、実行間隔（秒））
+STORAGE_TTL = _env_float('ANY2PDF_STORAGE_TTL', 3600.0)
+STORAGE_MAX_BYTES = _env_int('ANY2PDF_STORAGE_MAX_BYTES', 10 * 1024 * 1024 * 1024)
+STORAGE_MAX_ITEMS = _env_int('ANY2PDF_STORAGE_MAX_ITEMS', 10000)
+STORAGE_MIN_AGE = _env_float('ANY2PDF_STORAGE_MIN_AGE', 300.0)
+STORAGE_JANITOR_INTERVAL = _env_float('ANY2PDF_STORAGE_JANITOR_INTERVAL', 300.0)
+
+# ASGI本番モード（uvicornのワーカープロセス数、プロセスごとの変換スレッド数）
+ASGI_WORKERS = _env_int('ANY2PDF_ASGI_WORKERS', 1)
+ASGI_CONVERT_THREADS = _env_int('ANY2PDF_ASGI_CONVERT_THREADS', 4)
+
+# トレース（エクスポーター: 未設定で無効、"stdout"・"file"、または "パッケージ.モジュール:ファクトリ"）
+TRACE_EXPORTER = os.environ.get('ANY2PDF_TRACE_EXPORTER', '').strip()
+TRACE_FILE = os.environ.get('ANY2PDF_TRACE_FILE', 'traces.jsonl')
+TRACE_SERVICE_NAME = os.environ.get('ANY2PDF_TRACE_SERVICE_NAME', 'any2pdf')
+
+# ログ（レベル、JSON Linesのログファイル（空でファイルに出力しない）とローテーションのサイズ・世代数、
+# コンソールの形式（text・json）、書き出し待ちのキューの上限）
+LOG_LEVEL = os.environ.get('ANY2PDF_LOG_LEVEL', 'INFO')
+LOG_FILE = os.environ.get('ANY2PDF_LOG_FILE', 'api_server.log')
+# ログファイル名にプロセスIDを付ける（ローテーションは1つのファイルを1つのプロセスだけが書き込む前提のため、
+# 複数のワーカープロセスを起動する場合は既定で有効）
+LOG_FILE_PER_PROCESS = _env_bool('ANY2PDF_LOG_FILE_PER_PROCESS', ASGI_WORKERS > 1)
+LOG_MAX_BYTES = _env_int('ANY2PDF_LOG_MAX_BYTES', 10 * 1024 * 1024)
+LOG_BACKUP_COUNT = _env_int('ANY2PDF_LOG_BACKUP_COUNT', 5)
+LOG_CONSOLE_FORMAT = os.environ.get('ANY2PDF_LOG_CONSOLE_FORMAT', 'text').strip().lower()
+LOG_QUEUE_SIZE = _env_int('ANY2PDF_LOG_QUEUE_SIZE', 10000)
+
+# INFO以下のログの間引き（出力する割合、出力箇所ごとの期間あたりの上限（0で無効化）と期間（秒））
+LOG_SAMPLE_RATE = _env_float('ANY2PDF_LOG_SAMPLE_RATE', 1.0)
+LOG_RATE_LIMIT = _env_int('ANY2PDF_LOG_RATE_LIMIT', 100)
+LOG_RATE_LIMIT_INTERVAL = _env_float('ANY2PDF_LOG_RATE_LIMIT_INTERVAL', 60.0)
+
+# 変換結果のファイルの送信をフロントのWebサーバーに任せる（未設定で無効、"x-sendfile"・"x-accel-redirect"）
+# x-accel-redirect の場合は、出力フォルダを公開するnginxの internal なlocationを指定する
+SENDFILE_MODE = os.environ.get('ANY2PDF_SENDFILE', '').strip().lower()
+ACCEL_REDIRECT_PREFIX = os.environ.get('ANY2PDF_ACCEL_REDIRECT_PREFIX', '/_any2pdf_output/')
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+変換結果キャッシュ
+入力ファイルの内容ハッシュと変換オプションをキーに、変換済みPDFをディスクに保存する
+（合計サイズ・件数の上限を超えた場合はLRUで削除）
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, Optional
+
+from . import config
+from .file_utils import validate_file_path, create_directory_safely
+from .single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+# キーの形式を変更した場合は値を上げて既存エントリを無効化する
+CACHE_KEY_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """ファイル内容のSHA-256ハッシュを計算"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def conversion_key(kind: str, input_digest: str, options: Dict[str, Any] = None) -> str:
+    """
+    入力ファイルのSHA-256と変換オプションから変換結果のキーを作成
+
+    キャッシュのキーと、レスポンスのETagに使う。
+
+    Returns:
+        str: キー（16進数のSHA-256）
+    """
+    payload = json.dumps({
+        'version': CACHE_KEY_VERSION,
+        'kind': kind,
+        'input': input_digest,
+        # 未指定（None）のオプションは省略した場合と同じキーにする
+        'options': {name: value for name, value in (options or {}).items() if value is not None},
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ConversionCache:
+    """
+    コンテンツアドレス方式のディスクキャッシュ
+
+    エントリの索引はSQLiteで管理するため、同一ホスト上の複数ワーカープロセスから
+    同時に利用できる。キャッシュファイルは一時ファイルへの書き込み後に置き換えるため、
+    読み込み側が書き込み途中のファイルを参照することはない。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_entries: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.db_path = os.path.join(cache_dir, 'index.sqlite3')
+
+        if not create_directory_safely(self.objects_dir):
+            raise OSError(f"キャッシュディレクトリの作成に失敗しました: {cache_dir}")
+
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+            conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """スレッド・プロセス間で共有しない短命の接続を作成（終了時にコミットして閉じる）"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.objects_dir, key[:2], f"{key}.pdf")
+
+    @staticmethod
+    def _increment(conn: sqlite3.Connection, name: str, amount: int = 1) -> None:
+        conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    def make_key(self, input_path: str, kind: str, options: Dict[str, Any] = None,
+                 input_digest: str = None) -> str:
+        """
+        キャッシュキーを作成
+
+        Args:
+            input_path: 入力ファイルのパス
+            kind: 変換の種類（'office', 'image' など）
+            options: 変換オプション
+            input_digest: 計算済みの入力ファイルのSHA-256（省略時はファイルから計算）
+
+        Returns:
+            str: キャッシュキー（16進数のSHA-256）
+        """
+        return conversion_key(kind, input_digest or hash_file(input_path), options)
+
+    def fetch(self, key: str, target_path: str) -> bool:
+        """
+        キャッシュ済みのPDFを target_path にコピー
+
+        Returns:
+            bool: キャッシュにヒットした場合True
+        """
+        object_path = self._object_path(key)
+        with self._connect() as conn:
+            row = conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._increment(conn, 'misses')
+                return False
+
+        try:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            temp_path = f"{target_path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(object_path, temp_path)
+            os.replace(temp_path, target_path)
+        except FileNotFoundError:
+            # 別のワーカーが同時に削除した場合はミスとして扱う
+            with self._connect() as conn:
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._increment(conn, 'misses')
+            return False
+
+        with self._connect() as conn:
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._increment(conn, 'hits')
+        return True
+
+    def store(self, key: str, pdf_path: str) -> None:
+        """変換済みPDFをキャッシュに保存し、上限を超えた分をLRUで削除"""
+        size = os.path.getsize(pdf_path)
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        object_path = self._object_path(key)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        temp_path = f"{object_path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(pdf_path, temp_path)
+        os.replace(temp_path, object_path)
+
+        evicted = []
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, size, last_access) VALUES (?, ?, ?)',
+                (key, size, time.time())
+            )
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+            if (self.max_entries and count > self.max_entries) or (self.max_bytes and total > self.max_bytes):
+                for old_key, old_size in conn.execute(
+                        'SELECT key, size FROM entries WHERE key != ? ORDER BY last_access ASC', (key,)).fetchall():
+                    if not ((self.max_entries and count > self.max_entries)
+                            or (self.max_bytes and total > self.max_bytes)):
+                        break
+                    evicted.append(old_key)
+                    count -= 1
+                    total -= old_size
+                conn.executemany('DELETE FROM entries WHERE key = ?', [(k,) for k in evicted])
+                if evicted:
+                    self._increment(conn, 'evictions', len(evicted))
+
+        for old_key in evicted:
+            try:
+                os.remove(self._object_path(old_key))
+            except FileNotFoundError:
+                pass
+
+        if evicted:
+            logger.info(f"キャッシュから{len(evicted)}件のエントリを削除しました")
+
+    def stats(self) -> Dict[str, int]:
+        """キャッシュの統計情報を取得"""
+        with self._connect() as conn:
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+            counters = dict(conn.execute('SELECT name, value FROM stats').fetchall())
+        return {
+            'entries': count,
+            'bytes': total,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'evictions': counters.get('evictions', 0),
+        }
+
+    def clear(self) -> None:
+        """すべてのエントリを削除"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries')
+        shutil.rmtree(self.objects_dir, ignore_errors=True)
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+
+_cache: Optional[ConversionCache] = None
+_cache_lock = threading.Lock()
+_cache_disabled = False
+
+
+def get_conversion_cache() -> Optional[ConversionCache]:
+    """
+    共有キャッシュを取得
+
+    Returns:
+        ConversionCache: キャッシュが無効、または初期化に失敗した場合はNone
+    """
+    global _cache, _cache_disabled
+
+    if _cache is not None or _cache_disabled:
+        return _cache
+
+    with _cache_lock:
+        if _cache is not None or _cache_disabled:
+            return _cache
+
+        if config.CACHE_MAX_BYTES <= 0 or config.CACHE_MAX_ENTRIES <= 0:
+            _cache_disabled = True
+            return None
+
+        try:
+            _cache = ConversionCache(config.CACHE_DIR, config.CACHE_MAX_BYTES, config.CACHE_MAX_ENTRIES)
+        except Exception as e:
+            logger.error(f"変換キャッシュの初期化に失敗しました: {e}")
+            _cache_disabled = True
+        return _cache
+
+
+def target_pdf_path(output_dir: str, base_name: str) -> str:
+    """変換結果の配置先 output/ファイル名_pdf/ファイル名.pdf を取得"""
+    return os.path.join(output_dir, f"{base_name}_pdf", f"{base_name}.pdf")
+
+
+def cached_conversion(kind: str):
+    """
+    変換関数の前段でキャッシュを確認し、同時に要求された同じ変換をまとめるデコレータ
+
+    ヒットした場合は変換を行わずにキャッシュ済みPDFを出力先に配置し、
+    ミスした場合は変換結果をキャッシュに保存する。入力ファイルと出力先以外の引数（位置引数・キーワード引数）は
+    変換オプションとしてキーに含める。
+    同じキーの変換が実行中の場合は、完了を待ってその結果を共有する（single_flight を参照）。
+    キーワード引数 input_digest に計算済みの入力ファイルのSHA-256を渡すと、ハッシュの再計算を省略する。
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        # 入力ファイルと出力先を除いた引数が変換オプション
+        path_params = list(signature.parameters)[:2]
+
+        @wraps(func)
+        def wrapper(input_path: str, output_dir: str, *args, input_digest: str = None, **kwargs):
+            # 位置引数で渡されたオプションもキーに含めるよう、引数名に対応付ける（省略されたものは既定値）
+            bound = signature.bind(input_path, output_dir, *args, **kwargs)
+            bound.apply_defaults()
+            options = {name: value for name, value in bound.arguments.items() if name not in path_params}
+
+            cache = get_conversion_cache()
+            single_flight = get_single_flight()
+            if (cache is None and single_flight is None) or not validate_file_path(input_path):
+                return func(*bound.args, **bound.kwargs)
+
+            try:
+                key = conversion_key(kind, input_digest or hash_file(input_path), options)
+                base_name = os.path.splitext(os.path.basename(input_path))[0]
+                target_path = target_pdf_path(output_dir, base_name)
+                if cache is not None and cache.fetch(key, target_path):
+                    logger.info(f"キャッシュから変換結果を返します: {input_path}")
+                    return target_path
+            except Exception as e:
+                logger.warning(f"キャッシュの参照に失敗しました: {e}")
+                return func(*bound.args, **bound.kwargs)
+
+            def convert() -> str:
+                pdf_path = func(*bound.args, **bound.kwargs)
+                if cache is not None:
+                    try:
+                        cache.store(key, pdf_path)
+                    except Exception as e:
+                        logger.warning(f"キャッシュへの保存に失敗しました: {e}")
+                return pdf_path
+
+            if single_flight is None:
+                return convert()
+            fetch = (lambda: cache.fetch(key, target_path)) if cache is not None else None
+            return single_flight.run(key, kind, target_path, convert, fetch)
+
+        return wrapper
+
+    return decorator
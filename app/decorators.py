@@ -1,7 +1,8 @@
 import logging
 from functools import wraps
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from .tracing import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,3 +24,17 @@ def safe_file_operation(func):
             raise
 
     return wrapper
+
+
+def traced_operation(name: str):
+    """トレースデコレータ - 関数の実行を現在のトレースのスパンとして記録"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **{'code.function': func.__qualname__}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+変換結果の配信
+入力ファイルの内容ハッシュと変換オプションから作るETagの判定と、
+フロントのWebサーバーにファイルの送信を任せる X-Sendfile / X-Accel-Redirect のヘッダーを提供する
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from . import config
+from .conversion_cache import conversion_key
+
+logger = logging.getLogger(__name__)
+
+SENDFILE_X_SENDFILE = 'x-sendfile'
+SENDFILE_X_ACCEL_REDIRECT = 'x-accel-redirect'
+
+
+def result_etag(input_digest: str, options: Dict[str, Any] = None) -> str:
+    """
+    変換結果のETag（引用符なし）を作成
+
+    同じ内容の入力ファイルを同じオプションで変換した結果は同じETagになるため、
+    結果を持っているクライアントは If-None-Match で再ダウンロードを省略できる。
+
+    Args:
+        input_digest: 入力ファイルのSHA-256
+        options: レスポンスの内容に影響する指定（変換オプション・受け付ける種類・分割の指定）
+    """
+    return conversion_key('result', input_digest, options)
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """If-None-Match ヘッダーが etag（引用符なし）に一致するか（弱いETagも一致とみなす）"""
+    if not if_none_match or not etag:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def offload_headers(path: str) -> Optional[Dict[str, str]]:
+    """
+    ファイルの送信をフロントのWebサーバーに任せるヘッダーを作成
+
+    ANY2PDF_SENDFILE が "x-sendfile" の場合は X-Sendfile（Apache mod_xsendfile など）に絶対パスを、
+    "x-accel-redirect" の場合は X-Accel-Redirect（nginx）に出力フォルダからの相対パスを
+    ANY2PDF_ACCEL_REDIRECT_PREFIX の下に置いた内部URIを指定する。
+
+    Returns:
+        Dict[str, str]: ヘッダー（無効な場合、または出力フォルダの外のファイルの場合はNone）
+    """
+    mode = config.SENDFILE_MODE
+    if not mode:
+        return None
+
+    absolute_path = os.path.abspath(path)
+    output_root = os.path.abspath(config.OUTPUT_FOLDER)
+    if os.path.commonpath([absolute_path, output_root]) != output_root:
+        return None
+
+    if mode == SENDFILE_X_SENDFILE:
+        return {'X-Sendfile': absolute_path}
+    if mode == SENDFILE_X_ACCEL_REDIRECT:
+        relative_path = os.path.relpath(absolute_path, output_root).replace(os.sep, '/')
+        return {'X-Accel-Redirect': config.ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(relative_path)}
+
+    logger.warning(f"ANY2PDF_SENDFILE の値が不正なため、ファイルを直接送信します: {mode}")
+    return None
@@ -1,3 +1,28 @@
 class ConvertToPdfError(Exception):
     """PDF変換エラーのカスタム例外。"""
     pass
+
+
+class JobQueueFullError(Exception):
+    """変換ジョブの待ち数が上限に達した場合の例外。"""
+    pass
+
+
+class InvalidOptionError(ConvertToPdfError):
+    """変換の入力・オプションの指定が不正な場合の例外（APIでは400を返す）。"""
+    pass
+
+
+class PageRangeError(InvalidOptionError):
+    """ページ分割の指定（ページ数・ページ範囲）が不正な場合の例外。"""
+    pass
+
+
+class SpreadsheetOptionError(InvalidOptionError):
+    """スプレッドシートの変換範囲の指定（シート・印刷範囲・行数・列数）が不正な場合の例外。"""
+    pass
+
+
+class UnsupportedFormatError(InvalidOptionError):
+    """ファイルの内容が変換に対応していない形式の場合の例外。"""
+    pass
@@ -1,7 +1,11 @@
+import logging
 import os
-from loguru import logger
 from pathlib import Path
 
+from .metrics import time_stage
+
+logger = logging.getLogger(__name__)
+
 
 def validate_file_path(file_path: str) -> bool:
     """ファイルパスの有効性を検証する"""
@@ -14,7 +18,8 @@ def validate_file_path(file_path: str) -> bool:
 def create_directory_safely(directory: str) -> bool:
     """安全にディレクトリを作成する"""
     try:
-        os.makedirs(directory, exist_ok=True)
+        with time_stage('directory_create'):
+            os.makedirs(directory, exist_ok=True)
         return True
     except Exception as e:
         logger.error(f"ディレクトリ作成エラー: {e}")
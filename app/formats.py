@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+ファイル形式の判定
+拡張子ではなくファイル先頭のマジックバイト（ZIPコンテナの場合は格納されたパーツ）から実際の形式を判定する
+（名前を付け間違えたファイルが LibreOffice の変換まで進んでから失敗するのを防ぐため）
+"""
+
+import logging
+import os
+import zipfile
+from typing import Dict, Iterable, List, Optional
+
+from .exceptions import UnsupportedFormatError
+from .metrics import time_stage
+
+logger = logging.getLogger(__name__)
+
+# 変換の種類
+KIND_OFFICE = 'office'
+KIND_IMAGE = 'image'
+KIND_PDF = 'pdf'
+
+_KIND_LABELS = {
+    KIND_OFFICE: 'Officeファイル',
+    KIND_IMAGE: '画像ファイル',
+    KIND_PDF: 'PDFファイル',
+}
+
+# 判定に読み込む先頭のバイト数（PDFはヘッダーの前に任意のデータを置けるため1024バイトまで探す）
+_SNIFF_BYTES = 1024
+
+# OLE2複合ファイル（.doc・.xls・.ppt）のシグネチャ
+_OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# BMPの情報ヘッダーのサイズ（"BM" だけでは誤判定しやすいため併せて確認する）
+_BMP_INFO_HEADER_SIZES = (12, 40, 52, 56, 64, 108, 124)
+
+
+class FileFormat:
+    """判定できるファイル形式"""
+
+    def __init__(self, name: str, kind: str, extensions: Iterable[str], description: str):
+        """
+        Args:
+            name: 形式名
+            kind: 変換の種類（KIND_OFFICE・KIND_IMAGE・KIND_PDF）
+            extensions: この形式のファイルに付く拡張子（先頭が標準の拡張子）
+            description: 説明
+        """
+        self.name = name
+        self.kind = kind
+        self.extensions = tuple(extensions)
+        self.description = description
+
+    @property
+    def label(self) -> str:
+        """表示用の名前（例: "Officeファイル (.docx)"）"""
+        return f"{_KIND_LABELS[self.kind]} (.{self.extensions[0]})"
+
+
+FILE_FORMATS: Dict[str, FileFormat] = {
+    file_format.name: file_format for file_format in (
+        FileFormat('docx', KIND_OFFICE, ['docx'], "Word文書"),
+        FileFormat('xlsx', KIND_OFFICE, ['xlsx'], "Excelブック"),
+        FileFormat('pptx', KIND_OFFICE, ['pptx'], "PowerPointプレゼンテーション"),
+        # 旧形式はいずれもOLE2複合ファイルのため、中身からは区別せず拡張子に従う
+        FileFormat('ole', KIND_OFFICE, ['doc', 'xls', 'ppt'], "Office 97-2003形式"),
+        FileFormat('jpeg', KIND_IMAGE, ['jpg', 'jpeg'], "JPEG画像"),
+        FileFormat('png', KIND_IMAGE, ['png'], "PNG画像"),
+        FileFormat('tiff', KIND_IMAGE, ['tif', 'tiff'], "TIFF画像"),
+        FileFormat('bmp', KIND_IMAGE, ['bmp'], "BMP画像"),
+        FileFormat('gif', KIND_IMAGE, ['gif'], "GIF画像"),
+        FileFormat('webp', KIND_IMAGE, ['webp'], "WebP画像"),
+        FileFormat('pdf', KIND_PDF, ['pdf'], "PDF"),
+    )
+}
+
+# OOXMLのパッケージに必ず含まれるメインパーツ
+_OOXML_MAIN_PARTS = (
+    ('word/document.xml', 'docx'),
+    ('xl/workbook.xml', 'xlsx'),
+    ('ppt/presentation.xml', 'pptx'),
+)
+
+
+def extensions_for(*kinds: str) -> List[str]:
+    """指定した変換の種類で受け付ける拡張子（登録順）"""
+    return [
+        extension
+        for file_format in FILE_FORMATS.values() if file_format.kind in kinds
+        for extension in file_format.extensions
+    ]
+
+
+def _sniff_header(header: bytes) -> Optional[str]:
+    """先頭のバイト列から形式名を判定（ZIPコンテナは 'zip'）"""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'tiff'
+    if header.startswith(b'BM') and int.from_bytes(header[14:18], 'little') in _BMP_INFO_HEADER_SIZES:
+        return 'bmp'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+        return 'webp'
+    if header.startswith(_OLE_SIGNATURE):
+        return 'ole'
+    if header.startswith(b'PK\x03\x04'):
+        return 'zip'
+    if b'%PDF-' in header:
+        return 'pdf'
+    return None
+
+
+def _sniff_zip(path: str) -> Optional[str]:
+    """ZIPコンテナの中央ディレクトリだけを読み、OOXMLのメインパーツから形式名を判定"""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            names = set(zf.namelist())
+    except (zipfile.BadZipFile, OSError):
+        return None
+    if '[Content_Types].xml' not in names:
+        return None
+    for part_name, format_name in _OOXML_MAIN_PARTS:
+        if part_name in names:
+            return format_name
+    return None
+
+
+def sniff_format(path: str) -> Optional[FileFormat]:
+    """
+    ファイルの内容から形式を判定
+
+    Args:
+        path: 判定するファイルのパス
+
+    Returns:
+        FileFormat: 判定した形式（対応していない形式の場合はNone）
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_SNIFF_BYTES)
+    format_name = _sniff_header(header)
+    if format_name == 'zip':
+        format_name = _sniff_zip(path)
+    return FILE_FORMATS.get(format_name) if format_name else None
+
+
+def resolve_format(path: str, filename: str = None, kinds: Iterable[str] = None) -> FileFormat:
+    """
+    変換に使う形式を決定
+
+    内容から判定した形式を拡張子より優先する（例: 拡張子が .docx のJPEG画像は画像として変換する）。
+
+    Args:
+        path: 判定するファイルのパス
+        filename: 元のファイル名（エラーメッセージ用。省略時はパスのファイル名）
+        kinds: 受け付ける変換の種類（省略時はすべて）
+
+    Returns:
+        FileFormat: 判定した形式
+
+    Raises:
+        UnsupportedFormatError: 内容が対応していない形式、または受け付けない種類の場合
+    """
+    filename = filename or os.path.basename(path)
+    with time_stage('validation'):
+        file_format = sniff_format(path)
+        if file_format is None:
+            raise UnsupportedFormatError(f"ファイルの内容が対応している形式ではありません: {filename}")
+        if kinds is not None and file_format.kind not in kinds:
+            accepted = '・'.join(_KIND_LABELS[kind] for kind in kinds)
+            raise UnsupportedFormatError(
+                f"ファイルの内容が{file_format.description}のため変換できません（対応: {accepted}）: {filename}"
+            )
+
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if extension not in file_format.extensions:
+            logger.info(f"拡張子と内容が異なるため、内容に従って{file_format.description}として変換します: {filename}")
+    return file_format
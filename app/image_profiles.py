@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+画像変換プロファイル
+画像→PDF変換時の最大ピクセル数・DPI・JPEG品質・グレースケール化をまとめた名前付き設定
+"""
+
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from .exceptions import ConvertToPdfError
+
+
+class ImageProfile:
+    """画像→PDF変換の縮小・再圧縮の設定"""
+
+    def __init__(self, name: str, description: str, max_dimension: Optional[int] = None,
+                 dpi: Optional[int] = None, jpeg_quality: int = 95, grayscale: bool = False,
+                 recompress_jpeg: bool = False):
+        """
+        Args:
+            name: プロファイル名
+            description: 説明
+            max_dimension: 長辺の最大ピクセル数（Noneの場合は縮小しない）
+            dpi: PDFのページサイズを決めるDPI（Noneの場合は画像の埋め込みDPIを使う）
+            jpeg_quality: 再エンコード時のJPEG品質
+            grayscale: グレースケールに変換するか
+            recompress_jpeg: 縮小不要なJPEGも jpeg_quality で再エンコードするか
+        """
+        self.name = name
+        self.description = description
+        self.max_dimension = max_dimension
+        self.dpi = dpi
+        self.jpeg_quality = jpeg_quality
+        self.grayscale = grayscale
+        self.recompress_jpeg = recompress_jpeg
+
+    def target_size(self, size: tuple) -> Optional[tuple]:
+        """縮小後のサイズ（縮小が不要な場合はNone）"""
+        width, height = size
+        if not self.max_dimension or max(width, height) <= self.max_dimension:
+            return None
+        scale = self.max_dimension / max(width, height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def requires_reencode(self, img: Image.Image) -> bool:
+        """元の画像データをそのまま埋め込めず、デコード・再エンコードが必要か"""
+        if self.target_size(img.size) is not None:
+            return True
+        if self.grayscale and img.mode not in ('L', '1'):
+            return True
+        return self.recompress_jpeg and img.format == 'JPEG'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'description': self.description,
+            'max_dimension': self.max_dimension,
+            'dpi': self.dpi,
+            'jpeg_quality': self.jpeg_quality,
+            'grayscale': self.grayscale,
+            'recompress_jpeg': self.recompress_jpeg,
+        }
+
+
+IMAGE_PROFILES: Dict[str, ImageProfile] = {
+    profile.name: profile for profile in (
+        ImageProfile(
+            'archive', "保存用（画質を保ったまま極端に大きな画像だけを縮小）",
+            max_dimension=6000, jpeg_quality=92
+        ),
+        ImageProfile(
+            'ocr-300dpi', "OCR用（A4・300dpi相当に縮小してグレースケール化）",
+            max_dimension=3508, dpi=300, jpeg_quality=85, grayscale=True
+        ),
+        ImageProfile(
+            'preview', "プレビュー用（小さく軽量なPDF）",
+            max_dimension=1600, dpi=150, jpeg_quality=70, recompress_jpeg=True
+        ),
+    )
+}
+
+
+def image_profile_names() -> List[str]:
+    """利用できるプロファイル名の一覧"""
+    return list(IMAGE_PROFILES)
+
+
+def get_image_profile(name: Optional[str]) -> Optional[ImageProfile]:
+    """
+    名前からプロファイルを取得
+
+    Args:
+        name: プロファイル名（None・空文字の場合はプロファイル無し）
+
+    Returns:
+        ImageProfile: プロファイル（指定が無い場合はNone）
+
+    Raises:
+        ConvertToPdfError: 存在しないプロファイル名の場合
+    """
+    if not name:
+        return None
+    profile = IMAGE_PROFILES.get(name)
+    if profile is None:
+        raise ConvertToPdfError(
+            f"画像プロファイルが見つかりません: {name}（利用可能: {', '.join(image_profile_names())}）"
+        )
+    return profile
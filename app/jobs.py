@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+非同期変換ジョブ
+変換をバックグラウンドのワーカープールで実行し、ジョブIDで状態と結果を参照できるようにする
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from . import config
+from .exceptions import JobQueueFullError
+from .metrics import JOB_QUEUE_DEPTH
+from .storage import RequestWorkspace
+from .tracing import bind_context
+
+logger = logging.getLogger(__name__)
+
+# ジョブの状態
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+class Job:
+    """変換ジョブの状態"""
+
+    def __init__(self, kind: str, filename: str, input_path: str, workspace: RequestWorkspace = None,
+                 etag: str = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.filename = filename
+        self.input_path = input_path
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.expires_at: Optional[float] = None
+        self.result_path: Optional[str] = None
+        self.error: Optional[str] = None
+        self.workspace = workspace
+        # 結果のETag（入力ファイルの内容ハッシュと変換オプションから作成）
+        self.etag = etag
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """APIレスポンス用の辞書に変換"""
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'filename': self.filename,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'expires_at': self.expires_at,
+            'error': self.error,
+        }
+
+
+class JobManager:
+    """
+    上限付きのワーカープールで変換ジョブを実行
+
+    完了したジョブは有効期限（TTL）を過ぎると結果ファイルとともに削除される
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, ttl: float):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='convert-job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._janitor = threading.Thread(target=self._janitor_loop, name='job-janitor', daemon=True)
+        self._janitor.start()
+
+    def pending_count(self) -> int:
+        """待機中・実行中のジョブ数"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def queued_count(self) -> int:
+        """実行待ちのジョブ数"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == JOB_QUEUED)
+
+    def submit(self, kind: str, filename: str, input_path: str,
+               func: Callable[[str, str], str], output_dir: str, workspace: RequestWorkspace = None,
+               etag: str = None) -> Job:
+        """
+        変換ジョブを登録
+
+        Args:
+            kind: 変換の種類（'office', 'image'）
+            filename: 元のファイル名
+            input_path: 保存済みの入力ファイル（ジョブ終了時に削除される）
+            func: 変換関数 func(input_path, output_dir) -> PDFのパス
+            output_dir: 出力ディレクトリ
+            workspace: ジョブの作業ディレクトリ（有効期限切れ時に削除される）
+            etag: 結果のETag
+
+        Returns:
+            Job: 登録されたジョブ
+
+        Raises:
+            JobQueueFullError: 未完了のジョブ数が上限に達している場合
+        """
+        job = Job(kind, filename, input_path, workspace, etag)
+        with self._lock:
+            pending = sum(1 for queued in self._jobs.values() if not queued.finished)
+            if pending >= self.max_pending:
+                raise JobQueueFullError(f"変換ジョブの待ち数が上限（{self.max_pending}件）に達しています")
+            self._jobs[job.id] = job
+
+        # ジョブの変換を登録したリクエストのトレースに関連付ける
+        self._executor.submit(bind_context(self._run), job, func, output_dir)
+        logger.info(f"変換ジョブを登録しました: {job.id} ({filename})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """ジョブを取得（存在しない・期限切れの場合はNone）"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job.expires_at is not None and job.expires_at <= time.time():
+            self._expire(job)
+            return None
+        return job
+
+    def delete(self, job_id: str) -> bool:
+        """完了したジョブと結果ファイルを削除"""
+        job = self.get(job_id)
+        if job is None or not job.finished:
+            return False
+        self._expire(job)
+        return True
+
+    def shutdown(self) -> None:
+        """ワーカープールを停止"""
+        self._stop_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, func: Callable[[str, str], str], output_dir: str) -> None:
+        """ワーカースレッドでジョブを実行"""
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            job.result_path = func(job.input_path, output_dir)
+            job.status = JOB_SUCCEEDED
+            logger.info(f"変換ジョブが完了しました: {job.id} -> {job.result_path}")
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_FAILED
+            logger.error(f"変換ジョブが失敗しました: {job.id}: {e}")
+        finally:
+            job.finished_at = time.time()
+            job.expires_at = job.finished_at + self.ttl
+            if os.path.exists(job.input_path):
+                os.remove(job.input_path)
+            if job.workspace is not None:
+                job.workspace.keep()
+
+    def _expire(self, job: Job) -> None:
+        """ジョブを一覧から外し、結果ファイルを削除"""
+        with self._lock:
+            if self._jobs.pop(job.id, None) is None:
+                return
+        if job.workspace is not None:
+            job.workspace.cleanup()
+        elif job.result_path:
+            # 結果は output/ファイル名_pdf/ 単位で削除する
+            shutil.rmtree(os.path.dirname(job.result_path), ignore_errors=True)
+        logger.info(f"変換ジョブの有効期限が切れました: {job.id}")
+
+    def _janitor_loop(self) -> None:
+        """期限切れのジョブを定期的に削除"""
+        interval = max(1.0, min(60.0, self.ttl / 2))
+        while not self._stop_event.wait(interval):
+            now = time.time()
+            with self._lock:
+                expired = [job for job in self._jobs.values()
+                           if job.expires_at is not None and job.expires_at <= now]
+            for job in expired:
+                self._expire(job)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """共有ジョブマネージャーを取得（初回呼び出し時に作成）"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager(config.JOB_WORKERS, config.JOB_MAX_PENDING, config.JOB_TTL)
+                JOB_QUEUE_DEPTH.set_callback(_manager.queued_count)
+    return _manager
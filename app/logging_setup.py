@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+ログ設定
+すべてのログをキュー経由でバックグラウンドのスレッドから書き出し、リクエストの処理中にファイルI/Oを行わない。
+ファイルにはトレースID付きのJSON Linesを出力してサイズでローテーションし、
+同じ箇所から繰り返し出力されるINFO以下のログはサンプリング・レート制限で間引く
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from . import config
+from .metrics import LOG_RECORDS_DROPPED_TOTAL
+from .tracing import current_span
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_setup_lock = threading.Lock()
+
+
+class TraceContextFilter(logging.Filter):
+    """ログを出力したスレッドの現在のスパンから、トレースID・スパンIDをレコードに付ける"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None else None
+        record.span_id = span.span_id if span is not None else None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    INFO以下のログをサンプリングし、出力箇所（ファイル・行）ごとに一定時間あたりの件数を制限する
+
+    WARNING以上のログは間引かない。制限で抑制した件数は、次の期間の最初のログに付記する。
+    """
+
+    def __init__(self, sample_rate: float, limit: int, interval: float):
+        """
+        Args:
+            sample_rate: 出力する割合（0〜1、1で間引かない）
+            limit: 出力箇所ごとの interval 秒あたりの上限（0で制限しない）
+            interval: レート制限の期間（秒）
+        """
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.limit = limit
+        self.interval = interval
+        # 出力箇所 -> [期間の開始時刻, 出力した件数, 抑制した件数]
+        self._windows: Dict[Tuple[str, int], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        if self.limit <= 0:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = int(window[2]) if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.limit:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+
+        if suppressed:
+            record.msg = f"{record.getMessage()}（同じ箇所のログを{suppressed}件抑制しました）"
+            record.args = None
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """キューが満杯の場合はレコードを捨てて件数を数える（ログの書き出しでリクエストを待たせない）"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """引数を埋め込んだメッセージと例外のテキストを、書き出しスレッドに渡せる形にする"""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED_TOTAL.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """1行1件のJSONに整形"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'trace_id': getattr(record, 'trace_id', None),
+            'span_id': getattr(record, 'span_id', None),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _formatter(name: str) -> logging.Formatter:
+    return JsonFormatter() if name == 'json' else logging.Formatter(TEXT_FORMAT)
+
+
+def per_process_log_file(log_file: str) -> str:
+    """ログファイル名にプロセスIDを付ける（例: api_server.log -> api_server.1234.log）"""
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.{os.getpid()}{ext}"
+
+
+def setup_logging(log_file: str = None, level: str = None) -> None:
+    """
+    ログ出力を設定（プロセスで最初の呼び出しだけが有効）
+
+    ルートロガーにはキューに積むハンドラーだけを登録し、
+    コンソール・ファイルへの書き出しはバックグラウンドのスレッドで行う。
+
+    RotatingFileHandler は1つのファイルを1つのプロセスだけが書き込む前提のため、
+    ANY2PDF_LOG_FILE_PER_PROCESS が有効な場合（複数のワーカープロセスを起動する場合）は、
+    ファイル名にプロセスIDを付けてプロセスごとに別のファイルに書き出す。
+
+    Args:
+        log_file: ログファイル（JSON Lines。Noneの場合は ANY2PDF_LOG_FILE、空の場合はファイルに出力しない）
+        level: ログレベル（省略時は ANY2PDF_LOG_LEVEL）
+    """
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        log_file = config.LOG_FILE if log_file is None else log_file
+        if log_file and config.LOG_FILE_PER_PROCESS:
+            log_file = per_process_log_file(log_file)
+        handlers: List[logging.Handler] = []
+
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(_formatter(config.LOG_CONSOLE_FORMAT))
+        handlers.append(console)
+
+        if log_file:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT, encoding='utf-8'
+            )
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max(0, config.LOG_QUEUE_SIZE)))
+        queue_handler.addFilter(TraceContextFilter())
+        queue_handler.addFilter(
+            RateLimitFilter(config.LOG_SAMPLE_RATE, config.LOG_RATE_LIMIT, config.LOG_RATE_LIMIT_INTERVAL)
+        )
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        _queue_handler = queue_handler
+        root.setLevel((level or config.LOG_LEVEL).upper())
+
+        _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """キューに残ったログを書き出して、書き出しスレッドを停止"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
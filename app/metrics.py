@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+メトリクス
+リクエスト数・処理段階ごとのレイテンシ・処理中の変換数などを集計し、
+Prometheusのテキスト形式で出力する
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .tracing import span
+
+# レイテンシのヒストグラムのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Dict[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra.items())
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """メトリクスの基底クラス"""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """単調増加するカウンター"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items()) or ([((), 0)] if not self.labelnames else [])
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """増減する値（callbackを指定すると出力時に値を取得する）"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_callback(self, callback: Optional[Callable[[], float]]) -> None:
+        self._callback = callback
+
+    def value(self, **labels) -> float:
+        if self._callback is not None:
+            return self._callback()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        if self._callback is not None:
+            try:
+                return [f"{self.name} {_format_value(self._callback())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """値の分布（累積バケット・合計・件数）"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """ブロックの経過時間を記録"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            return sum(self._counts.get(self._key(labels), []))
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, {'le': _format_value(bound)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """メトリクスの登録先"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheusのテキスト形式（version 0.0.4）で出力"""
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_requests_total', "HTTPリクエスト数（エンドポイント・結果別）", ('endpoint', 'method', 'outcome')
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'any2pdf_stage_duration_seconds', "変換の処理段階ごとの所要時間（秒）", ('stage',)
+))
+CONVERSIONS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'any2pdf_conversions_in_flight', "処理中の変換数", ('kind',)
+))
+JOB_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'any2pdf_job_queue_depth', "実行待ちの変換ジョブ数"
+))
+BYTES_IN_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_bytes_in_total', "受信したリクエストボディのバイト数"
+))
+BYTES_OUT_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_bytes_out_total', "送信したレスポンスボディのバイト数"
+))
+SOFFICE_TIMEOUTS_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_soffice_timeouts_total', "LibreOffice変換のタイムアウト数"
+))
+SOFFICE_FAILURES_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_soffice_failures_total', "LibreOffice変換の失敗数（タイムアウトを除く）"
+))
+SOFFICE_KILLS_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_soffice_kills_total', "LibreOfficeのプロセスグループを強制終了した回数（理由別）", ('reason',)
+))
+CONVERSIONS_COALESCED_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_conversions_coalesced_total', "実行中の同じ変換の完了を待って結果を共有した件数（種類・範囲別）",
+    ('kind', 'scope')
+))
+LOG_RECORDS_DROPPED_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_log_records_dropped_total', "ログのキューが満杯のため捨てたログの件数"
+))
+PDF_OPTIMIZE_BYTES_BEFORE_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_pdf_optimize_bytes_before_total', "最適化前のPDFのバイト数"
+))
+PDF_OPTIMIZE_BYTES_AFTER_TOTAL = REGISTRY.register(Counter(
+    'any2pdf_pdf_optimize_bytes_after_total', "最適化後のPDFのバイト数"
+))
+
+
+@contextmanager
+def time_stage(stage: str):
+    """処理段階の所要時間を記録し、トレース中であれば同名のスパンとして書き出すコンテキストマネージャ"""
+    with STAGE_DURATION.time(stage=stage), span(stage):
+        yield
+
+
+def track_in_flight(kind: str):
+    """変換関数の実行中、処理中の変換数に加算するデコレータ"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            CONVERSIONS_IN_FLIGHT.inc(kind=kind)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                CONVERSIONS_IN_FLIGHT.dec(kind=kind)
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics() -> str:
+    """全メトリクスをPrometheusのテキスト形式で出力"""
+    return REGISTRY.render()
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+LibreOfficeワーカープール
+常駐するヘッドレスLibreOfficeインスタンスをUNOソケット経由で利用し、
+変換ごとのsoffice起動コストを削減する
+"""
+
+import atexit
+import logging
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from filelock import FileLock, Timeout
+
+from . import config
+from .exceptions import ConvertToPdfError
+from .metrics import SOFFICE_FAILURES_TOTAL, SOFFICE_TIMEOUTS_TOTAL, time_stage
+from .soffice_process import (
+    KILL_REASON_TIMEOUT, apply_resource_limits, conversion_timeout, kill_process_group, record_kill
+)
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:  # LibreOffice付属のPython-UNOブリッジが無い環境
+    uno = None
+    PropertyValue = None
+
+logger = logging.getLogger(__name__)
+
+# ドキュメント種別ごとのPDFエクスポートフィルター
+_PDF_EXPORT_FILTERS = (
+    ('com.sun.star.sheet.SpreadsheetDocument', 'calc_pdf_Export'),
+    ('com.sun.star.presentation.PresentationDocument', 'impress_pdf_Export'),
+    ('com.sun.star.drawing.DrawingDocument', 'draw_pdf_Export'),
+    ('com.sun.star.text.TextDocument', 'writer_pdf_Export'),
+)
+
+
+def _property(name: str, value: Any):
+    """UNOのPropertyValueを作成"""
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class OfficeWorker:
+    """専用ユーザープロファイルを持つ常駐LibreOfficeインスタンス"""
+
+    def __init__(self, index: int, host: str, port: int, profile_dir: str):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.profile_dir = profile_dir
+        self.process: Optional[subprocess.Popen] = None
+        self.desktop = None
+        self.conversions = 0
+        self.restarts = 0
+        self.busy = False
+        self.lock = threading.Lock()
+
+    @property
+    def uno_url(self) -> str:
+        return f"socket,host={self.host},port={self.port};urp;StarOffice.ComponentContext"
+
+    def start(self) -> None:
+        """LibreOfficeを起動し、UNOリスナーに接続できるまで待機"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        cmd = [
+            config.SOFFICE_BINARY,
+            '--headless',
+            '--invisible',
+            '--nologo',
+            '--nodefault',
+            '--norestore',
+            '--nolockcheck',
+            f'-env:UserInstallation={Path(self.profile_dir).resolve().as_uri()}',
+            f'--accept={self.uno_url}',
+        ]
+        # 子プロセス（soffice.bin）ごと終了できるよう専用のプロセスグループで起動する
+        # 常駐プロセスはCPU時間が累積するため、アドレス空間の上限だけを設定する
+        self.process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        apply_resource_limits(self.process.pid)
+        self.desktop = None
+
+        deadline = time.monotonic() + config.OFFICE_POOL_STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise ConvertToPdfError(
+                    f"LibreOfficeワーカー{self.index}が起動直後に終了しました (code={self.process.returncode})"
+                )
+            try:
+                self._connect()
+                logger.info(f"LibreOfficeワーカー{self.index}を起動しました (port={self.port})")
+                return
+            except Exception:
+                time.sleep(0.5)
+
+        self.stop()
+        raise ConvertToPdfError(f"LibreOfficeワーカー{self.index}の起動がタイムアウトしました")
+
+    def stop(self) -> None:
+        """LibreOfficeプロセスを終了"""
+        self.desktop = None
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                kill_process_group(self.process)
+                self.process.wait()
+        # 終了したsofficeの子プロセスが残っていれば回収する
+        kill_process_group(self.process)
+        self.process = None
+
+    def restart(self) -> None:
+        """LibreOfficeプロセスを再起動"""
+        logger.warning(f"LibreOfficeワーカー{self.index}を再起動します")
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def is_healthy(self) -> bool:
+        """プロセスの生存とUNOソケットへの接続可否を確認"""
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection((self.host, self.port), timeout=2):
+                pass
+        except OSError:
+            return False
+        return True
+
+    def _connect(self) -> None:
+        """UNOソケットに接続してDesktopを取得"""
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            'com.sun.star.bridge.UnoUrlResolver', local_ctx
+        )
+        ctx = resolver.resolve(f"uno:{self.uno_url}")
+        self.desktop = ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+
+    def convert(self, input_path: str, output_path: str, timeout: float) -> None:
+        """
+        ドキュメントを読み込みPDFとして保存
+
+        タイムアウトした場合はプロセスを強制終了して変換を中断する
+        """
+        if self.desktop is None:
+            self._connect()
+
+        timed_out = threading.Event()
+
+        def _on_timeout():
+            timed_out.set()
+            if self.process is not None and kill_process_group(self.process):
+                record_kill(KILL_REASON_TIMEOUT, [input_path], f", worker={self.index}, timeout={timeout:.0f}s")
+
+        timer = threading.Timer(timeout, _on_timeout)
+        timer.start()
+        try:
+            document = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(input_path)),
+                '_blank',
+                0,
+                (_property('Hidden', True), _property('ReadOnly', True))
+            )
+            if document is None:
+                raise ConvertToPdfError(f"ドキュメントを読み込めません: {input_path}")
+            try:
+                filter_name = next(
+                    (name for service, name in _PDF_EXPORT_FILTERS if document.supportsService(service)),
+                    'writer_pdf_Export'
+                )
+                document.storeToURL(
+                    uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                    (_property('FilterName', filter_name),)
+                )
+            finally:
+                document.close(True)
+        except ConvertToPdfError:
+            raise
+        except Exception as e:
+            if timed_out.is_set():
+                SOFFICE_TIMEOUTS_TOTAL.inc()
+                raise ConvertToPdfError("LibreOfficeの変換がタイムアウトしました")
+            SOFFICE_FAILURES_TOTAL.inc()
+            raise ConvertToPdfError(f"LibreOffice変換エラー: {e}")
+        finally:
+            timer.cancel()
+
+        self.conversions += 1
+
+
+class OfficeWorkerPool:
+    """常駐LibreOfficeワーカーのプール（ヘルスチェックと自動再起動付き）"""
+
+    def __init__(self, size: int, host: str = None, base_port: int = None, profile_root: str = None):
+        self.size = size
+        self.host = host or config.OFFICE_POOL_HOST
+        self.base_port = base_port or config.OFFICE_POOL_BASE_PORT
+        self.profile_root = profile_root or config.OFFICE_POOL_PROFILE_DIR
+        self.workers: List[OfficeWorker] = [
+            OfficeWorker(i, self.host, self.base_port + i, os.path.join(self.profile_root, f"worker_{i}"))
+            for i in range(size)
+        ]
+        self._idle: "queue.Queue[OfficeWorker]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+        # 他プロセスとポート・プロファイルを分けるために確保したスロットのロック
+        self.slot_lock: Optional[FileLock] = None
+
+    def start(self) -> None:
+        """全ワーカーを起動し、ヘルスチェックスレッドを開始"""
+        for worker in self.workers:
+            worker.start()
+            self._idle.put(worker)
+
+        self._monitor = threading.Thread(target=self._monitor_loop, name='office-pool-monitor', daemon=True)
+        self._monitor.start()
+        logger.info(f"LibreOfficeワーカープールを開始しました (size={self.size})")
+
+    def shutdown(self) -> None:
+        """全ワーカーを停止"""
+        self._stop_event.set()
+        for worker in self.workers:
+            with worker.lock:
+                worker.stop()
+        shutil.rmtree(self.profile_root, ignore_errors=True)
+        if self.slot_lock is not None:
+            self.slot_lock.release()
+            self.slot_lock = None
+        logger.info("LibreOfficeワーカープールを停止しました")
+
+    def convert(self, input_path: str, output_path: str, timeout: float = None) -> None:
+        """空きワーカーを取得してPDFに変換（タイムアウトの省略時は入力から算出）"""
+        timeout = timeout or conversion_timeout([input_path])
+        try:
+            worker = self._idle.get(timeout=config.OFFICE_POOL_ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise ConvertToPdfError("利用可能なLibreOfficeワーカーがありません")
+
+        try:
+            with worker.lock:
+                worker.busy = True
+                try:
+                    if not worker.is_healthy():
+                        worker.restart()
+                    with time_stage('soffice_run'):
+                        worker.convert(input_path, output_path, timeout)
+                except ConvertToPdfError:
+                    if not worker.is_healthy():
+                        worker.restart()
+                    raise
+                finally:
+                    worker.busy = False
+        finally:
+            self._idle.put(worker)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """各ワーカーの状態を取得"""
+        return [
+            {
+                'index': worker.index,
+                'port': worker.port,
+                'pid': worker.process.pid if worker.process else None,
+                'busy': worker.busy,
+                'healthy': worker.is_healthy(),
+                'conversions': worker.conversions,
+                'restarts': worker.restarts,
+            }
+            for worker in self.workers
+        ]
+
+    def _monitor_loop(self) -> None:
+        """待機中のワーカーを定期的に確認し、停止していれば再起動"""
+        while not self._stop_event.wait(config.OFFICE_POOL_HEALTH_INTERVAL):
+            for worker in self.workers:
+                if not worker.lock.acquire(blocking=False):
+                    continue  # 変換中のワーカーは変換側で確認する
+                try:
+                    if not self._stop_event.is_set() and not worker.is_healthy():
+                        worker.restart()
+                except Exception as e:
+                    logger.error(f"LibreOfficeワーカー{worker.index}の再起動に失敗しました: {e}")
+                finally:
+                    worker.lock.release()
+
+
+_pool: Optional[OfficeWorkerPool] = None
+_pool_lock = threading.Lock()
+_pool_unavailable = False
+
+# 同一ホストで同時にプールを起動できるプロセス数の上限
+_MAX_POOL_SLOTS = 64
+
+
+def _claim_pool_slot() -> Tuple[int, FileLock]:
+    """
+    プロセスごとに重ならないスロット番号を確保
+
+    複数のサーバープロセス（ASGIのワーカーなど）がそれぞれプールを起動する場合に、
+    UNOのポート範囲とユーザープロファイルが衝突しないようにする。
+    ロックはプールの停止時、またはプロセスの終了時に解放される。
+    """
+    os.makedirs(config.OFFICE_POOL_PROFILE_DIR, exist_ok=True)
+    for slot in range(_MAX_POOL_SLOTS):
+        lock = FileLock(os.path.join(config.OFFICE_POOL_PROFILE_DIR, f"slot_{slot}.lock"))
+        try:
+            lock.acquire(timeout=0)
+        except Timeout:
+            continue
+        return slot, lock
+    raise ConvertToPdfError("LibreOfficeワーカープールの空きスロットがありません")
+
+
+def get_office_pool() -> Optional[OfficeWorkerPool]:
+    """
+    共有ワーカープールを取得（初回呼び出し時に起動）
+
+    Returns:
+        OfficeWorkerPool: プールが無効またはUNOが利用できない場合はNone
+    """
+    global _pool, _pool_unavailable
+
+    if _pool is not None or _pool_unavailable:
+        return _pool
+
+    with _pool_lock:
+        if _pool is not None or _pool_unavailable:
+            return _pool
+
+        if config.OFFICE_POOL_SIZE <= 0:
+            _pool_unavailable = True
+            return None
+        if uno is None:
+            logger.warning("Python-UNOが利用できないため、変換ごとにsofficeを起動します")
+            _pool_unavailable = True
+            return None
+
+        try:
+            slot, slot_lock = _claim_pool_slot()
+        except ConvertToPdfError as e:
+            logger.error(str(e))
+            _pool_unavailable = True
+            return None
+
+        pool = OfficeWorkerPool(
+            config.OFFICE_POOL_SIZE,
+            base_port=config.OFFICE_POOL_BASE_PORT + slot * config.OFFICE_POOL_SIZE,
+            profile_root=os.path.join(config.OFFICE_POOL_PROFILE_DIR, f"slot_{slot}")
+        )
+        pool.slot_lock = slot_lock
+        try:
+            pool.start()
+        except Exception as e:
+            logger.error(f"LibreOfficeワーカープールの起動に失敗しました: {e}")
+            pool.shutdown()
+            _pool_unavailable = True
+            return None
+
+        atexit.register(pool.shutdown)
+        _pool = pool
+        return _pool
+
+
+def get_office_pool_status() -> Optional[List[Dict[str, Any]]]:
+    """起動済みの共有ワーカープールの状態を取得（未起動の場合はNone）"""
+    return _pool.status() if _pool is not None else None
+
+
+def shutdown_office_pool() -> None:
+    """共有ワーカープールを停止"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -1,74 +1,477 @@
 import img2pdf
+import io
 import logging
 import os
+import pikepdf
 import shutil
-import subprocess
-from PIL import Image
+import tempfile
+import uuid
+from typing import Any, Dict, Iterator, List, Union
 
-from .decorators import safe_file_operation
-from .exceptions import ConvertToPdfError
+from PIL import Image, ImageOps
+
+from . import config
+from .conversion_cache import cached_conversion, get_conversion_cache, target_pdf_path
+from .decorators import safe_file_operation, traced_operation
+from .exceptions import ConvertToPdfError, SpreadsheetOptionError, UnsupportedFormatError
 from .file_utils import validate_file_path, create_directory_safely
+from .formats import KIND_IMAGE, KIND_OFFICE, KIND_PDF, FileFormat, resolve_format
+from .image_profiles import ImageProfile, get_image_profile
+from .metrics import time_stage, track_in_flight
+from .office_pool import get_office_pool
+from .pdf_optimizer import optimize_pdf
+from .soffice_process import conversion_timeout, run_soffice
+from .spreadsheet import check_spreadsheet_options, prepare_spreadsheet
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+def _move_to_target_dir(temp_pdf_path: str, output_dir: str, base_name: str) -> str:
+    """変換済みPDFを output/ファイル名_pdf/ファイル名.pdf に移動"""
+    target_dir = os.path.join(output_dir, f"{base_name}_pdf")
+    if not create_directory_safely(target_dir):
+        raise ConvertToPdfError(f"ターゲットディレクトリの作成に失敗しました: {target_dir}")
+
+    final_pdf_path = target_pdf_path(output_dir, base_name)
+
+    # PDFファイルをターゲットの場所に移動
+    with time_stage('file_move'):
+        shutil.move(temp_pdf_path, final_pdf_path)
+
+    return final_pdf_path
+
+
+def _run_office_conversion(source_path: str, output_dir: str, temp_pdf_path: str) -> None:
+    """LibreOfficeで1ファイルを変換（ワーカープールがあれば常駐ワーカーを使う）"""
+    pool = get_office_pool()
+    if pool is not None:
+        # 常駐LibreOfficeワーカーで変換
+        pool.convert(source_path, temp_pdf_path, timeout=conversion_timeout([source_path]))
+    else:
+        with time_stage('soffice_run'):
+            run_soffice([source_path], output_dir)
+
+
 # OfficeファイルをPDFに変換
+@traced_operation('convert_office')
 @safe_file_operation
-def convert_office_file_to_pdf(input_path: str, output_dir: str) -> str:
-    """OfficeファイルをPDFに変換します"""
+@cached_conversion('office')
+@track_in_flight('office')
+def convert_office_file_to_pdf(input_path: str, output_dir: str, optimize: bool = False, sheets: str = None,
+                               print_area: str = None, max_rows: int = None, max_cols: int = None) -> str:
+    """
+    OfficeファイルをPDFに変換します
+
+    Args:
+        input_path: 入力ファイルのパス
+        output_dir: 出力ディレクトリ
+        optimize: 変換後にPDFを最適化するか
+        sheets: 変換するシート（.xlsx のみ。シート名または1始まりの番号のカンマ区切り）
+        print_area: 印刷範囲（.xlsx のみ。"A1:F50" で上書き、"all" で既存の印刷範囲を無視）
+        max_rows: 変換する最大行数（.xlsx のみ）
+        max_cols: 変換する最大列数（.xlsx のみ）
+
+    Returns:
+        str: 出力PDFのパス（output/ファイル名_pdf/ファイル名.pdf）
+
+    Raises:
+        UnsupportedFormatError: 内容がOfficeファイルではない場合（LibreOfficeは起動しない）
+    """
     if not validate_file_path(input_path):
         raise FileNotFoundError(f"入力ファイルが存在しません: {input_path}")
 
+    # LibreOfficeを起動する前に、内容がOfficeファイルでないものを除外する
+    file_format = resolve_format(input_path, kinds=(KIND_OFFICE,))
+
     if not create_directory_safely(output_dir):
         raise ConvertToPdfError(f"出力ディレクトリの作成に失敗しました: {output_dir}")
 
-    cmd = [
-        'soffice',
-        '--headless',
-        '--convert-to', 'pdf',
-        '--outdir', str(output_dir),
-        str(input_path)
-    ]
-
-    try:
-        subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=300,  # 5分タイムアウト
-            check=True
-        )
-        logger.info(f"LibreOfficeの変換が完了しました: {input_path}")
-    except subprocess.TimeoutExpired:
-        raise ConvertToPdfError("LibreOfficeの変換がタイムアウトしました")
-    except subprocess.CalledProcessError as e:
-        raise ConvertToPdfError(f"LibreOffice変換エラー: {e.stderr.decode()}")
-
-    # 変換が成功したか確認
     base_name = os.path.splitext(os.path.basename(input_path))[0]
     temp_pdf_path = os.path.join(output_dir, base_name + ".pdf")
 
+    spreadsheet_options = {
+        name: value for name, value in (
+            ('sheets', sheets), ('print_area', print_area), ('max_rows', max_rows), ('max_cols', max_cols)
+        ) if value
+    }
+    if spreadsheet_options:
+        check_spreadsheet_options(input_path, spreadsheet_options)
+        if file_format.name != 'xlsx':
+            raise SpreadsheetOptionError(
+                f"ファイルの内容が{file_format.description}のため、sheets・print_area・max_rows・max_cols は指定できません"
+            )
+        # 対象外のシートの非表示と印刷範囲を反映したコピーを同じファイル名で変換する
+        with tempfile.TemporaryDirectory(prefix='sheets_', dir=output_dir) as work_dir:
+            source_path = prepare_spreadsheet(
+                input_path, os.path.join(work_dir, os.path.basename(input_path)), **spreadsheet_options
+            )
+            _run_office_conversion(source_path, output_dir, temp_pdf_path)
+    else:
+        _run_office_conversion(input_path, output_dir, temp_pdf_path)
+    logger.info(f"LibreOfficeの変換が完了しました: {input_path}")
+
+    # 変換が成功したか確認
     if not os.path.exists(temp_pdf_path):
         raise ConvertToPdfError("OfficeファイルをPDFに変換できません")
 
     # ターゲットディレクトリ構造を作成: output/ファイル名_pdf/ファイル名.pdf
-    target_dir = os.path.join(output_dir, f"{base_name}_pdf")
-    if not create_directory_safely(target_dir):
-        raise ConvertToPdfError(f"ターゲットディレクトリの作成に失敗しました: {target_dir}")
+    final_pdf_path = _move_to_target_dir(temp_pdf_path, output_dir, base_name)
+    if optimize:
+        optimize_pdf(final_pdf_path)
+    return final_pdf_path
 
-    final_pdf_path = os.path.join(target_dir, f"{base_name}.pdf")
 
-    # PDFファイルをターゲットの場所に移動
-    shutil.move(temp_pdf_path, final_pdf_path)
+def _stage_input(source_path: str, staged_path: str) -> None:
+    """入力ファイルをステージングディレクトリに配置（シンボリックリンク優先）"""
+    try:
+        os.symlink(os.path.abspath(source_path), staged_path)
+    except OSError:
+        shutil.copy2(source_path, staged_path)
 
-    return final_pdf_path
+
+def _unique_base_names(input_paths: List[str]) -> List[str]:
+    """出力先で衝突しないベース名を割り当てる（重複には連番を付与）"""
+    used = set()
+    names = []
+    for path in input_paths:
+        base_name = os.path.splitext(os.path.basename(path))[0]
+        candidate = base_name
+        counter = 2
+        while candidate in used:
+            candidate = f"{base_name}_{counter}"
+            counter += 1
+        used.add(candidate)
+        names.append(candidate)
+    return names
+
+
+# 複数のOfficeファイルをまとめてPDFに変換
+@traced_operation('convert_office_batch')
+@safe_file_operation
+@track_in_flight('office_batch')
+def convert_office_files_to_pdf(input_paths: List[str], output_dir: str) -> List[Dict[str, Any]]:
+    """
+    複数のOfficeファイルをまとめてPDFに変換します
+
+    ワーカープールが無い場合は、最大 OFFICE_BATCH_MAX_FILES 件ずつ1回のsoffice起動で変換する。
+    出力は単一ファイル変換と同じ output/ファイル名_pdf/ファイル名.pdf の構成になる。
+
+    Args:
+        input_paths: 変換するOfficeファイルのパスのリスト
+        output_dir: 出力ディレクトリ
+
+    Returns:
+        List[Dict[str, Any]]: 入力順の変換結果（input_path, success, pdf_path, error）
+    """
+    if not create_directory_safely(output_dir):
+        raise ConvertToPdfError(f"出力ディレクトリの作成に失敗しました: {output_dir}")
+
+    results = [
+        {'input_path': path, 'success': False, 'pdf_path': None, 'error': None}
+        for path in input_paths
+    ]
+    base_names = _unique_base_names(input_paths)
+
+    # 変換前にキャッシュを確認し、ヒットしたファイルは変換対象から外す
+    cache = get_conversion_cache()
+    cache_keys = {}
+    pending = []
+    for index, path in enumerate(input_paths):
+        if not validate_file_path(path):
+            results[index]['error'] = f"入力ファイルが存在しません: {path}"
+            continue
+        # 内容がOfficeファイルでないものはsofficeに渡さない
+        try:
+            resolve_format(path, kinds=(KIND_OFFICE,))
+        except UnsupportedFormatError as e:
+            results[index]['error'] = str(e)
+            continue
+        if cache is not None:
+            try:
+                cache_keys[index] = cache.make_key(path, 'office')
+                cached_path = target_pdf_path(output_dir, base_names[index])
+                if cache.fetch(cache_keys[index], cached_path):
+                    results[index]['pdf_path'] = cached_path
+                    results[index]['success'] = True
+                    continue
+            except Exception as e:
+                logger.warning(f"キャッシュの参照に失敗しました: {e}")
+        pending.append(index)
+
+    pool = get_office_pool()
+    if pool is not None:
+        # 常駐ワーカーには起動コストが無いため1件ずつ渡す
+        with tempfile.TemporaryDirectory(prefix='batch_', dir=output_dir) as work_dir:
+            for index in pending:
+                temp_pdf_path = os.path.join(work_dir, f"{index:06d}.pdf")
+                try:
+                    pool.convert(input_paths[index], temp_pdf_path, timeout=conversion_timeout([input_paths[index]]))
+                    if not os.path.exists(temp_pdf_path):
+                        raise ConvertToPdfError("OfficeファイルをPDFに変換できません")
+                    results[index]['pdf_path'] = _move_to_target_dir(temp_pdf_path, output_dir, base_names[index])
+                    results[index]['success'] = True
+                except Exception as e:
+                    results[index]['error'] = str(e)
+    else:
+        batch_size = max(1, config.OFFICE_BATCH_MAX_FILES)
+        for offset in range(0, len(pending), batch_size):
+            batch = pending[offset:offset + batch_size]
+            _convert_office_batch(input_paths, base_names, batch, output_dir, results)
+
+    if cache is not None:
+        for index in pending:
+            if results[index]['success'] and index in cache_keys:
+                try:
+                    cache.store(cache_keys[index], results[index]['pdf_path'])
+                except Exception as e:
+                    logger.warning(f"キャッシュへの保存に失敗しました: {e}")
+
+    succeeded = sum(1 for result in results if result['success'])
+    logger.info(f"Officeファイルの一括変換が完了しました: 成功 {succeeded}/{len(results)}")
+    return results
+
+
+def _convert_office_batch(input_paths: List[str], base_names: List[str], batch: List[int],
+                          output_dir: str, results: List[Dict[str, Any]]) -> None:
+    """1回のsoffice起動でバッチを変換し、結果を各ファイルに振り分ける"""
+    # 同名ファイルが共有の--outdirで衝突しないよう、連番付きの名前でステージングする
+    with tempfile.TemporaryDirectory(prefix='batch_', dir=output_dir) as work_dir:
+        stage_dir = os.path.join(work_dir, 'in')
+        out_dir = os.path.join(work_dir, 'out')
+        os.makedirs(stage_dir)
+        os.makedirs(out_dir)
+
+        staged = {}
+        for index in batch:
+            extension = os.path.splitext(input_paths[index])[1]
+            staged_name = f"{index:06d}"
+            staged_path = os.path.join(stage_dir, staged_name + extension)
+            try:
+                _stage_input(input_paths[index], staged_path)
+                staged[index] = staged_name
+            except OSError as e:
+                results[index]['error'] = f"入力ファイルの準備に失敗しました: {e}"
+
+        if not staged:
+            return
+
+        staged_paths = [
+            os.path.join(stage_dir, staged[index] + os.path.splitext(input_paths[index])[1])
+            for index in staged
+        ]
+        try:
+            with time_stage('soffice_run'):
+                run_soffice(staged_paths, out_dir)
+        except ConvertToPdfError as e:
+            # 途中まで出力されたファイルは下で個別に回収する
+            logger.error(f"LibreOfficeの一括変換でエラーが発生しました: {e}")
+            batch_error = str(e)
+        else:
+            batch_error = None
+
+        for index, staged_name in staged.items():
+            temp_pdf_path = os.path.join(out_dir, staged_name + ".pdf")
+            if not os.path.exists(temp_pdf_path):
+                results[index]['error'] = batch_error or "OfficeファイルをPDFに変換できません"
+                continue
+            try:
+                results[index]['pdf_path'] = _move_to_target_dir(temp_pdf_path, output_dir, base_names[index])
+                results[index]['success'] = True
+            except Exception as e:
+                results[index]['error'] = str(e)
+
+
+# img2pdfが再エンコードせずにそのまま埋め込めるカラーモード
+_DIRECT_JPEG_MODES = ('RGB', 'L')
+_DIRECT_PNG_MODES = ('RGB', 'L', '1', 'P')
+
+
+def _can_embed_directly(img: Image.Image) -> bool:
+    """画像をデコード・再エンコードせずにPDFへ埋め込めるか判定"""
+    if img.format == 'JPEG':
+        # ベースラインJPEGのDCTストリームはそのまま埋め込める
+        return img.mode in _DIRECT_JPEG_MODES and not img.info.get('progressive') \
+            and not img.info.get('progression')
+    if img.format == 'PNG':
+        # 透過・インターレースの無いPNGはIDATストリームをそのまま埋め込める
+        return img.mode in _DIRECT_PNG_MODES and 'transparency' not in img.info \
+            and not img.info.get('interlace')
+    return False
+
+
+# 非可逆圧縮された画像データを示すTIFFの圧縮方式
+_LOSSY_TIFF_COMPRESSIONS = ('jpeg', 'tiff_jpeg')
+# これ未満のDPIは未設定とみなす（解像度の単位が無いTIFFは (1, 1) になる）
+_MIN_VALID_DPI = 10
+
+# EXIFの向き（Orientation）のタグと、90度・270度の回転を含む（幅と高さが入れ替わる）値
+_EXIF_ORIENTATION = 0x0112
+_EXIF_ORIENTATIONS_SWAPPING_AXES = (5, 6, 7, 8)
+
+
+def _normalize_image(img: Image.Image, profile: ImageProfile = None, original_size: tuple = None) -> bytes:
+    """
+    埋め込めない画像をメモリ上でRGB（またはグレースケール・白黒）に正規化してエンコード
+
+    original_size にはドラフトモードで縮小してデコードする前の画像のサイズを渡す（省略時は img.size）。
+    """
+    lossy = img.format == 'JPEG' or img.info.get('compression') in _LOSSY_TIFF_COMPRESSIONS
+    dpi = img.info.get('dpi')
+    original_size = original_size or img.size
+
+    # 再エンコードするとEXIFの向きの指定が失われるため、画素を回転して向きを反映する
+    orientation = img.getexif().get(_EXIF_ORIENTATION, 1)
+    if orientation != 1:
+        img = ImageOps.exif_transpose(img)
+        if orientation in _EXIF_ORIENTATIONS_SWAPPING_AXES:
+            original_size = (original_size[1], original_size[0])
+            if dpi:
+                dpi = (dpi[1], dpi[0])
+
+    target_size = profile.target_size(img.size) if profile is not None else None
+
+    if img.mode == '1' and target_size is not None:
+        # 白黒画像はそのまま縮小すると最近傍補間になるため、グレースケールにしてから縮小する
+        img = img.convert('L')
+    elif profile is not None and profile.grayscale and img.mode not in ('L', '1'):
+        img = img.convert('L')
+    elif img.mode not in ('RGB', 'L', '1'):
+        img = img.convert('RGB')
+
+    if target_size is not None:
+        img = img.resize(target_size, Image.LANCZOS, reducing_gap=3.0)
+    if dpi and img.size != original_size:
+        # ドラフトモードと縮小を合わせた倍率でDPIも縮小し、ページの物理サイズを変えない
+        scale = img.size[0] / original_size[0]
+        dpi = (dpi[0] * scale, dpi[1] * scale)
+
+    save_options = {}
+    if dpi and min(dpi) >= _MIN_VALID_DPI:
+        save_options['dpi'] = dpi
+
+    buffer = io.BytesIO()
+    if lossy and img.mode != '1':
+        # 元が非可逆形式の場合のみJPEGで再エンコード
+        img.save(buffer, 'JPEG', quality=profile.jpeg_quality if profile is not None else 95, **save_options)
+    else:
+        img.save(buffer, 'PNG', **save_options)
+    return buffer.getvalue()
+
+
+def _draft_for_profile(img: Image.Image, profile: ImageProfile) -> None:
+    """
+    JPEGを縮小したサイズで直接デコードするよう設定（ドラフトモード）
+
+    DCTのスケーリングで1/2〜1/8のサイズにデコードするため、フルサイズの画像はデコードされない。
+    ドラフト後のサイズは縮小後のサイズ以上になり、残りは _normalize_image で縮小する。
+    """
+    if img.format != 'JPEG':
+        return
+    target_size = profile.target_size(img.size)
+    mode = 'L' if profile.grayscale else img.mode
+    if target_size is not None or mode != img.mode:
+        img.draft(mode, target_size or img.size)
+
+
+def _layout_options(profile: ImageProfile = None) -> Dict[str, Any]:
+    """img2pdfに渡すページレイアウトの設定"""
+    if profile is not None and profile.dpi:
+        # ページサイズを画像のピクセル数とプロファイルのDPIから決める
+        return {'layout_fun': img2pdf.get_fixed_dpi_layout_fun((profile.dpi, profile.dpi))}
+    return {}
+
+
+def image_to_pdf_bytes(image: Union[str, bytes], profile: ImageProfile = None) -> bytes:
+    """
+    画像をPDFのバイト列に変換
+
+    ベースラインJPEGや透過の無いPNGはデコードせずにそのまま埋め込み、
+    それ以外の画像は一時ファイルを使わずにメモリ上で正規化する。
+    複数フレームの画像は先頭フレームのみ変換する（全フレームは iter_image_frame_pdfs を使う）
+
+    Args:
+        image: 画像ファイルのパス、または画像のバイト列
+        profile: 縮小・再圧縮のプロファイル（Noneの場合は元の解像度・画質のまま）
+
+    Returns:
+        bytes: PDFのバイト列
+    """
+    data = image if isinstance(image, bytes) else None
+    source = io.BytesIO(data) if data is not None else image
+    options = _layout_options(profile)
+
+    with time_stage('image_encode'), Image.open(source) as img:
+        if profile is not None and profile.requires_reencode(img):
+            original_size = img.size
+            _draft_for_profile(img, profile)
+            return img2pdf.convert(_normalize_image(img, profile, original_size), **options)
+        if _can_embed_directly(img):
+            try:
+                return img2pdf.convert(data if data is not None else image, **options)
+            except Exception as e:
+                logger.debug(f"画像をそのまま埋め込めないため正規化します: {e}")
+        return img2pdf.convert(_normalize_image(img, profile), **options)
+
+
+def count_image_frames(path: str) -> int:
+    """画像のフレーム数（マルチページTIFF・アニメーションGIF/WebPのページ数）"""
+    with Image.open(path) as img:
+        return getattr(img, 'n_frames', 1)
+
+
+def iter_image_frame_pdfs(path: str, profile: ImageProfile = None) -> Iterator[bytes]:
+    """
+    複数フレームの画像をフレームごとに1ページのPDFのバイト列に変換
+
+    フレームは seek で1枚ずつデコードし、前のフレームは次のフレームの読み込みで破棄されるため、
+    フレーム数にかかわらずメモリ使用量はフレーム1枚分に収まる
+
+    Args:
+        path: 画像ファイルのパス
+        profile: 縮小・再圧縮のプロファイル
+
+    Yields:
+        bytes: 1フレーム分（1ページ）のPDFのバイト列
+    """
+    options = _layout_options(profile)
+    with Image.open(path) as img:
+        for index in range(getattr(img, 'n_frames', 1)):
+            with time_stage('image_encode'):
+                img.seek(index)
+                pdf_bytes = img2pdf.convert(_normalize_image(img, profile), **options)
+            yield pdf_bytes
+
+
+def _write_image_pages(path: str, work_dir: str, prefix: str, profile: ImageProfile = None) -> List[str]:
+    """
+    画像を1ページずつのPDFとして作業ディレクトリに書き出す
+
+    Returns:
+        List[str]: ページ順のPDFファイルのパス（単一フレームの画像は1件）
+    """
+    if count_image_frames(path) == 1:
+        page_path = os.path.join(work_dir, f"{prefix}_000000.pdf")
+        with open(page_path, "wb") as f:
+            f.write(image_to_pdf_bytes(path, profile))
+        return [page_path]
+
+    page_paths = []
+    for index, pdf_bytes in enumerate(iter_image_frame_pdfs(path, profile)):
+        page_path = os.path.join(work_dir, f"{prefix}_{index:06d}.pdf")
+        with open(page_path, "wb") as f:
+            f.write(pdf_bytes)
+        page_paths.append(page_path)
+    return page_paths
 
 
 # 画像をPDFに変換
+@traced_operation('convert_image')
 @safe_file_operation
-def convert_image_to_pdf(input_path: str, output_folder: str) -> str:
-    """画像をPDFに変換します"""
+@cached_conversion('image')
+@track_in_flight('image')
+def convert_image_to_pdf(input_path: str, output_folder: str, profile: str = None, optimize: bool = False) -> str:
+    """画像をPDFに変換します（profile: 縮小・再圧縮のプロファイル名、optimize: 変換後にPDFを最適化するか）"""
+    image_profile = get_image_profile(profile)
     if not validate_file_path(input_path):
         raise FileNotFoundError(f"入力画像ファイルが存在しません: {input_path}")
 
@@ -86,24 +489,198 @@ def convert_image_to_pdf(input_path: str, output_folder: str) -> str:
     output_path = os.path.join(target_dir, f"{pic_name}.pdf")
 
     try:
-        # 画像の有効性を確認
-        with Image.open(input_path) as img:
-            # RGBモードに変換（必要な場合）
-            if img.mode not in ('RGB', 'L'):
-                img = img.convert('RGB')
+        frame_count = count_image_frames(input_path)
+        if frame_count == 1:
+            pdf_bytes = image_to_pdf_bytes(input_path, image_profile)
+    except Exception as e:
+        raise ConvertToPdfError(f"画像からPDFへの変換エラー: {e}")
 
-            # 一時ファイルに保存
-            temp_path = os.path.join(output_folder, f"temp_{pic_name}.jpg")
-            img.save(temp_path, 'JPEG', quality=95)
+    if frame_count == 1:
+        with open(output_path, "wb") as f:
+            f.write(pdf_bytes)
+        if optimize:
+            optimize_pdf(output_path)
+        return output_path
 
-            # PDFに変換
-            with open(output_path, "wb") as f:
-                f.write(img2pdf.convert([temp_path]))
+    # マルチページTIFFなどはフレームごとに1ページのPDFを書き出してから結合する
+    with tempfile.TemporaryDirectory(prefix='frames_', dir=output_folder) as work_dir:
+        try:
+            page_paths = _write_image_pages(input_path, work_dir, 'frame', image_profile)
+        except Exception as e:
+            raise ConvertToPdfError(f"画像からPDFへの変換エラー: {e}")
+        try:
+            temp_output_path = os.path.join(work_dir, 'merged.pdf')
+            with time_stage('pdf_merge'):
+                _merge_pdfs(page_paths, temp_output_path, work_dir)
+        except Exception as e:
+            raise ConvertToPdfError(f"PDFの結合エラー: {e}")
+        shutil.move(temp_output_path, output_path)
 
-            # 一時ファイルを削除
-            os.remove(temp_path)
+    logger.info(f"{frame_count}フレームの画像をPDFに変換しました: {output_path}")
+    if optimize:
+        optimize_pdf(output_path)
+    return output_path
+
+
+# 一度に開くPDFの最大数（ファイルディスクリプタの枯渇を防ぐ）
+_MERGE_GROUP_SIZE = 200
+
+
+def _merge_pdfs(pdf_paths: List[str], output_path: str, work_dir: str) -> None:
+    """
+    PDFファイルを順番に結合
+
+    ページの内容は書き込み時に元ファイルから順次読み出されるため、
+    全ページをメモリに展開せずに結合できる
+    """
+    if len(pdf_paths) > _MERGE_GROUP_SIZE:
+        # 開くファイル数を抑えるため、グループごとに中間ファイルへ結合してから再帰的に結合
+        group_paths = []
+        for offset in range(0, len(pdf_paths), _MERGE_GROUP_SIZE):
+            group_path = os.path.join(work_dir, f"group_{uuid.uuid4().hex}.pdf")
+            _merge_pdfs(pdf_paths[offset:offset + _MERGE_GROUP_SIZE], group_path, work_dir)
+            group_paths.append(group_path)
+        _merge_pdfs(group_paths, output_path, work_dir)
+        return
+
+    sources = []
+    try:
+        with pikepdf.new() as merged:
+            for path in pdf_paths:
+                source = pikepdf.open(path)
+                sources.append(source)
+                merged.pages.extend(source.pages)
+            merged.save(output_path)
+    finally:
+        for source in sources:
+            source.close()
 
-    except Exception as e:
-        raise ConvertToPdfError(f"画像からPDFへの変換エラー: {e}")
 
+# 複数の画像を1つのPDFに変換
+@traced_operation('convert_images')
+@safe_file_operation
+@track_in_flight('images')
+def convert_images_to_single_pdf(input_paths: List[str], output_folder: str, output_name: str,
+                                 profile: str = None, optimize: bool = False) -> str:
+    """
+    複数の画像を指定順に1つのPDFに変換します
+
+    画像（複数フレームの画像はフレーム）は1枚ずつ1ページのPDFに変換して作業ディレクトリに書き出し、
+    最後に結合するため、ページ数にかかわらずメモリ使用量は画像1枚分に収まる
+
+    Args:
+        input_paths: 画像ファイルのパスのリスト（この順番でページになる）
+        output_folder: 出力フォルダ
+        output_name: 出力PDFのファイル名（拡張子なし）
+        profile: 縮小・再圧縮のプロファイル名
+        optimize: 結合後にPDFを最適化するか
+
+    Returns:
+        str: 出力PDFのパス（output/出力名_pdf/出力名.pdf）
+    """
+    image_profile = get_image_profile(profile)
+    if not input_paths:
+        raise ConvertToPdfError("変換する画像が指定されていません")
+
+    for path in input_paths:
+        if not validate_file_path(path):
+            raise FileNotFoundError(f"入力画像ファイルが存在しません: {path}")
+        # デコードを始める前に、内容が画像でないファイルを除外する
+        resolve_format(path, kinds=(KIND_IMAGE,))
+
+    if not create_directory_safely(output_folder):
+        raise ConvertToPdfError(f"出力フォルダの作成に失敗しました: {output_folder}")
+
+    output_path = target_pdf_path(output_folder, output_name)
+    if not create_directory_safely(os.path.dirname(output_path)):
+        raise ConvertToPdfError(f"ターゲットディレクトリの作成に失敗しました: {os.path.dirname(output_path)}")
+
+    with tempfile.TemporaryDirectory(prefix='images_', dir=output_folder) as work_dir:
+        page_paths = []
+        for index, path in enumerate(input_paths):
+            try:
+                page_paths.extend(_write_image_pages(path, work_dir, f"page_{index:06d}", image_profile))
+            except Exception as e:
+                raise ConvertToPdfError(f"画像からPDFへの変換エラー ({os.path.basename(path)}): {e}")
+
+        try:
+            temp_output_path = os.path.join(work_dir, 'merged.pdf')
+            with time_stage('pdf_merge'):
+                _merge_pdfs(page_paths, temp_output_path, work_dir)
+        except Exception as e:
+            raise ConvertToPdfError(f"PDFの結合エラー: {e}")
+        shutil.move(temp_output_path, output_path)
+
+    logger.info(f"{len(input_paths)}枚の画像（{len(page_paths)}ページ）を1つのPDFに変換しました: {output_path}")
+    if optimize:
+        optimize_pdf(output_path)
     return output_path
+
+
+@traced_operation('passthrough_pdf')
+@safe_file_operation
+def passthrough_pdf(input_path: str, output_dir: str, optimize: bool = False) -> str:
+    """PDFを変換せずに output/ファイル名_pdf/ファイル名.pdf に配置します（optimize: 配置後にPDFを最適化するか）"""
+    if not validate_file_path(input_path):
+        raise FileNotFoundError(f"入力ファイルが存在しません: {input_path}")
+
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    target_dir = os.path.join(output_dir, f"{base_name}_pdf")
+    if not create_directory_safely(target_dir):
+        raise ConvertToPdfError(f"ターゲットディレクトリの作成に失敗しました: {target_dir}")
+
+    output_path = target_pdf_path(output_dir, base_name)
+    with time_stage('file_move'):
+        # 同じファイルシステム上ならハードリンクでコピーを省く（最適化は別ファイルに書き出すため元は変わらない）
+        try:
+            os.link(input_path, output_path)
+        except OSError:
+            shutil.copyfile(input_path, output_path)
+    logger.info(f"PDFのため変換せずに配置しました: {output_path}")
+    if optimize:
+        optimize_pdf(output_path)
+    return output_path
+
+
+# 変換の種類ごとの変換関数と、その変換関数に渡すオプション
+CONVERTERS = {
+    KIND_OFFICE: (convert_office_file_to_pdf, ('optimize', 'sheets', 'print_area', 'max_rows', 'max_cols')),
+    KIND_IMAGE: (convert_image_to_pdf, ('optimize', 'profile')),
+    KIND_PDF: (passthrough_pdf, ('optimize',)),
+}
+
+
+def convert_file_to_pdf(input_path: str, output_dir: str, input_digest: str = None, filename: str = None,
+                        kinds: tuple = None, file_format: FileFormat = None, **options) -> str:
+    """
+    ファイルの内容から形式を判定し、対応する変換関数でPDFに変換します
+
+    PDFは変換せずにそのまま配置し、画像は（拡張子がOfficeファイルでも）画像の変換で処理する。
+    判定した形式に適用されないオプション（Officeファイルの profile など）は無視する。
+
+    Args:
+        input_path: 入力ファイルのパス
+        output_dir: 出力ディレクトリ
+        input_digest: 計算済みの入力ファイルのSHA-256（変換結果キャッシュのキーに使う）
+        filename: 元のファイル名（エラーメッセージ用）
+        kinds: 受け付ける変換の種類（省略時はすべて）
+        file_format: 判定済みの形式（省略時はファイルの内容から判定）
+        **options: 変換オプション（optimize, profile, sheets, print_area, max_rows, max_cols）
+
+    Returns:
+        str: 出力PDFのパス（output/ファイル名_pdf/ファイル名.pdf）
+
+    Raises:
+        UnsupportedFormatError: 内容が対応していない形式、または受け付けない種類の場合
+    """
+    if file_format is None:
+        file_format = resolve_format(input_path, filename, kinds)
+    converter, option_names = CONVERTERS[file_format.kind]
+
+    ignored = [name for name, value in options.items() if value and name not in option_names]
+    if ignored:
+        logger.info(f"{file_format.description}には適用されないオプションを無視します: {', '.join(ignored)}")
+    converter_options = {name: value for name, value in options.items() if name in option_names}
+    if file_format.kind != KIND_PDF:
+        converter_options['input_digest'] = input_digest
+    return converter(input_path, output_dir, **converter_options)
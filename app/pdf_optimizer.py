@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+変換後のPDF最適化
+LibreOffice・img2pdfが出力したPDFを pikepdf（qpdf）で書き直し、
+Web表示向けのリニアライズ、オブジェクトストリームによる圧縮、ストリームの再圧縮、
+重複した埋め込みリソース（画像・フォントなど）の統合を行う
+"""
+
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict
+
+import pikepdf
+
+from . import config
+from .exceptions import ConvertToPdfError
+from .metrics import PDF_OPTIMIZE_BYTES_AFTER_TOTAL, PDF_OPTIMIZE_BYTES_BEFORE_TOTAL, time_stage
+
+logger = logging.getLogger(__name__)
+
+# 重複を統合しても参照の差し替えが連鎖する（SMask→画像など）ため、変化が無くなるまで繰り返す上限
+_DEDUP_MAX_PASSES = 3
+
+
+def _stream_key(stream: pikepdf.Stream) -> str:
+    """圧縮済みのデータとストリーム辞書（/Length を除く）から重複判定用のキーを作成"""
+    stream_dict = pikepdf.Dictionary({
+        key: value for key, value in stream.stream_dict.items() if key != '/Length'
+    })
+    digest = hashlib.sha256()
+    # 間接参照は "n g R" のまま比較する（参照先が統合済みなら同じ番号になる）
+    digest.update(stream_dict.unparse())
+    digest.update(b'\0')
+    digest.update(stream.read_raw_bytes())
+    return digest.hexdigest()
+
+
+def _replace_references(obj: pikepdf.Object, replacements: Dict[tuple, pikepdf.Object]) -> None:
+    """直接オブジェクトの辞書・配列をたどり、重複オブジェクトへの参照を統合先に差し替える"""
+    if isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream)):
+        keys = list(obj.keys())
+    elif isinstance(obj, pikepdf.Array):
+        keys = range(len(obj))
+    else:
+        return
+
+    for key in keys:
+        value = obj[key]
+        # 数値などのスカラーはPythonの値に変換されるため対象外
+        if not isinstance(value, pikepdf.Object):
+            continue
+        if value.is_indirect:
+            if value.objgen in replacements:
+                obj[key] = replacements[value.objgen]
+        else:
+            _replace_references(value, replacements)
+
+
+def _deduplicate_streams(pdf: pikepdf.Pdf) -> int:
+    """
+    内容が同一のストリームを1つに統合
+
+    参照されなくなった重複オブジェクトは保存時まで pdf.objects に残るため、
+    統合済みのオブジェクトは以降のパスで対象から外す
+
+    Returns:
+        int: 統合したストリームの数
+    """
+    merged: Dict[tuple, pikepdf.Object] = {}
+    for _ in range(_DEDUP_MAX_PASSES):
+        canonical: Dict[str, pikepdf.Object] = {}
+        replacements: Dict[tuple, pikepdf.Object] = {}
+        for obj in pdf.objects:
+            if not isinstance(obj, pikepdf.Stream) or obj.objgen in merged:
+                continue
+            key = _stream_key(obj)
+            if key in canonical:
+                replacements[obj.objgen] = canonical[key]
+            else:
+                canonical[key] = obj
+        if not replacements:
+            break
+
+        for obj in pdf.objects:
+            if obj.objgen in merged or obj.objgen in replacements:
+                continue
+            if isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream, pikepdf.Array)):
+                _replace_references(obj, replacements)
+        merged.update(replacements)
+    return len(merged)
+
+
+def optimize_pdf(pdf_path: str) -> Dict[str, Any]:
+    """
+    PDFを最適化して同じパスに置き換える
+
+    一時ファイルに書き出してから置き換えるため、失敗しても元のPDFは壊れない
+
+    Args:
+        pdf_path: 最適化するPDFのパス
+
+    Returns:
+        Dict: 最適化前後のバイト数（before_bytes, after_bytes）、統合したストリーム数、所要時間（ミリ秒）
+
+    Raises:
+        ConvertToPdfError: PDFの読み込み・書き込みに失敗した場合
+    """
+    before_bytes = os.path.getsize(pdf_path)
+    temp_path = os.path.join(os.path.dirname(pdf_path), f".optimize_{uuid.uuid4().hex}.pdf")
+    started = time.perf_counter()
+    try:
+        with time_stage('pdf_optimize'):
+            pikepdf.settings.set_flate_compression_level(config.PDF_OPTIMIZE_FLATE_LEVEL)
+            with pikepdf.open(pdf_path) as pdf:
+                deduplicated = _deduplicate_streams(pdf)
+                pdf.save(
+                    temp_path,
+                    linearize=True,
+                    object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                    compress_streams=True,
+                    recompress_flate=True,
+                    stream_decode_level=pikepdf.StreamDecodeLevel.generalized
+                )
+        os.replace(temp_path, pdf_path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise ConvertToPdfError(f"PDFの最適化エラー: {e}")
+
+    report = {
+        'before_bytes': before_bytes,
+        'after_bytes': os.path.getsize(pdf_path),
+        'deduplicated_streams': deduplicated,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    PDF_OPTIMIZE_BYTES_BEFORE_TOTAL.inc(report['before_bytes'])
+    PDF_OPTIMIZE_BYTES_AFTER_TOTAL.inc(report['after_bytes'])
+    logger.info(
+        f"PDFを最適化しました: {pdf_path} ({report['before_bytes']} -> {report['after_bytes']} バイト, "
+        f"重複ストリーム {deduplicated} 件を統合, {report['elapsed_ms']} ms)"
+    )
+    return report
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+PDFのページ分割
+変換済みPDFをNページごと、または指定したページ範囲ごとのPDFに分割する
+（後段の取り込み処理をチャンク単位で並列化するため）
+"""
+
+import json
+import logging
+import os
+import re
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import pikepdf
+
+from .exceptions import PageRangeError
+from .metrics import time_stage
+
+logger = logging.getLogger(__name__)
+
+_RANGE_PATTERN = re.compile(r'^(\d+)(?:\s*(-)\s*(\d*))?$')
+
+
+def parse_page_ranges(spec: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    ページ範囲の指定を解析
+
+    "1-10,11-20,21-" のようにカンマ区切りで指定する（ページ番号は1始まり、両端を含む）。
+    "5" は5ページ目のみ、"21-" は21ページ目から最後まで。
+
+    Returns:
+        List[Tuple[int, Optional[int]]]: (開始ページ, 終了ページ（最後までの場合はNone）) のリスト
+
+    Raises:
+        PageRangeError: 指定の形式が不正な場合
+    """
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        match = _RANGE_PATTERN.match(part)
+        if match is None:
+            raise PageRangeError(f"ページ範囲の形式が不正です: {part or spec}（例: 1-10,11-20,21-）")
+        first = int(match.group(1))
+        if match.group(2) is None:
+            last = first
+        else:
+            last = int(match.group(3)) if match.group(3) else None
+        if first < 1 or (last is not None and last < first):
+            raise PageRangeError(f"ページ範囲が不正です: {part}")
+        ranges.append((first, last))
+    return ranges
+
+
+def chunk_page_ranges(page_count: int, chunk_pages: int) -> List[Tuple[int, int]]:
+    """page_count ページを chunk_pages ページごとの範囲に分ける"""
+    if chunk_pages < 1:
+        raise PageRangeError("分割するページ数は1以上を指定してください")
+    return [
+        (first, min(first + chunk_pages - 1, page_count))
+        for first in range(1, page_count + 1, chunk_pages)
+    ]
+
+
+def _resolve_page_ranges(ranges: List[Tuple[int, Optional[int]]], page_count: int) -> List[Tuple[int, int]]:
+    """終了ページの省略を補い、ページ数を超える範囲を検出"""
+    resolved = []
+    for first, last in ranges:
+        last = page_count if last is None else last
+        if first > page_count or last > page_count:
+            raise PageRangeError(f"ページ範囲 {first}-{last} がページ数（{page_count}）を超えています")
+        resolved.append((first, last))
+    return resolved
+
+
+def split_pdf(pdf_path: str, output_dir: str, chunk_pages: int = None, page_ranges: str = None,
+              base_name: str = None) -> List[Dict[str, Any]]:
+    """
+    PDFをページ範囲ごとのPDFに分割
+
+    元のPDFは1回だけ開き、すべてのチャンクで解析済みのオブジェクトを共有する。
+    各チャンクには、そのページが参照するフォント・画像などのオブジェクトだけがコピーされる。
+
+    Args:
+        pdf_path: 分割するPDFのパス
+        output_dir: チャンクの出力先ディレクトリ
+        chunk_pages: チャンクあたりのページ数
+        page_ranges: ページ範囲の指定（"1-10,11-20,21-"。chunk_pages より優先）
+        base_name: チャンクのファイル名の接頭辞（省略時は元のPDFのファイル名）
+
+    Returns:
+        List[Dict]: チャンクごとの情報（file, path, first_page, last_page, pages, bytes）
+
+    Raises:
+        PageRangeError: 分割の指定が不正な場合
+    """
+    if not chunk_pages and not page_ranges:
+        raise PageRangeError("分割するページ数またはページ範囲を指定してください")
+    requested_ranges = parse_page_ranges(page_ranges) if page_ranges else None
+
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = base_name or os.path.splitext(os.path.basename(pdf_path))[0]
+    chunks = []
+    with time_stage('pdf_split'), pikepdf.open(pdf_path) as source:
+        page_count = len(source.pages)
+        if requested_ranges is not None:
+            ranges = _resolve_page_ranges(requested_ranges, page_count)
+        else:
+            ranges = chunk_page_ranges(page_count, chunk_pages)
+
+        width = max(len(str(page_count)), 3)
+        for first, last in ranges:
+            file_name = f"{base_name}_p{first:0{width}d}-{last:0{width}d}.pdf"
+            chunk_path = os.path.join(output_dir, file_name)
+            with pikepdf.new() as chunk:
+                chunk.pages.extend(source.pages[first - 1:last])
+                chunk.save(chunk_path)
+            chunks.append({
+                'file': file_name,
+                'path': chunk_path,
+                'first_page': first,
+                'last_page': last,
+                'pages': last - first + 1,
+                'bytes': os.path.getsize(chunk_path),
+            })
+
+    logger.info(f"PDFを{len(chunks)}個のチャンクに分割しました: {pdf_path}（{page_count}ページ）")
+    return chunks
+
+
+def write_split_archive(archive, chunks: List[Dict[str, Any]], source_name: str) -> None:
+    """チャンクのPDFと一覧（manifest.json）をZIPに書き込む"""
+    manifest = {
+        'source': source_name,
+        'chunks': [{key: value for key, value in chunk.items() if key != 'path'} for chunk in chunks],
+    }
+    # PDFは圧縮済みのストリームが大半のため、再圧縮せずに格納する
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf:
+        for chunk in chunks:
+            zf.write(chunk['path'], arcname=chunk['file'])
+        zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2),
+                    compress_type=zipfile.ZIP_DEFLATED)
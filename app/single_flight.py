@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+同一変換のシングルフライト
+入力ファイルの内容ハッシュと変換オプションが同じ変換が同時に要求された場合、最初の1件だけが変換を行い、
+残りはその完了を待って結果を共有する（同一ホスト上の別ワーカープロセスとはファイルロックで調整する）
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from filelock import FileLock, Timeout
+
+from . import config
+from .metrics import CONVERSIONS_COALESCED_TOTAL, time_stage
+
+logger = logging.getLogger(__name__)
+
+# 結果を共有した範囲（メトリクスのラベル）
+SCOPE_PROCESS = 'process'
+SCOPE_HOST = 'host'
+
+
+class _Flight:
+    """実行中の変換（同じプロセスで待っている要求に結果を渡す）"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """キーごとに実行中の変換を1つにまとめる"""
+
+    def __init__(self, lock_dir: str, wait_timeout: float):
+        """
+        Args:
+            lock_dir: プロセス間で調整するロックファイルの保存先
+            wait_timeout: 先行する変換の完了を待つ上限（秒、超えた場合は自分で変換する）
+        """
+        self.lock_dir = lock_dir
+        self.wait_timeout = wait_timeout
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, kind: str, target_path: str, convert: Callable[[], str],
+            fetch: Callable[[], bool] = None) -> str:
+        """
+        同じキーの変換が実行中であれば完了を待って結果を共有し、無ければ convert を実行
+
+        Args:
+            key: 変換結果のキー（入力ファイルのSHA-256と変換オプションから作成）
+            kind: 変換の種類（メトリクスのラベル）
+            target_path: 結果を共有する場合のPDFの配置先
+            convert: 変換を行い、PDFのパスを返す関数（結果をキャッシュに保存する場合は保存まで行う）
+            fetch: キャッシュ済みの結果を target_path に配置する関数（別プロセスとの結果の共有に使う。
+                   Noneの場合はプロセス内でのみまとめる）
+
+        Returns:
+            str: 変換済みPDFのパス
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            return self._follow(flight, kind, target_path, convert)
+
+        try:
+            flight.result = self._lead(key, kind, target_path, convert, fetch)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _follow(self, flight: _Flight, kind: str, target_path: str, convert: Callable[[], str]) -> str:
+        """同じプロセスで実行中の変換の完了を待ち、結果のPDFを target_path にコピー"""
+        CONVERSIONS_COALESCED_TOTAL.inc(kind=kind, scope=SCOPE_PROCESS)
+        with time_stage('coalesce_wait'):
+            finished = flight.done.wait(self.wait_timeout)
+        if not finished:
+            logger.warning(f"実行中の同じ変換が{self.wait_timeout:.0f}秒以内に完了しないため、個別に変換します")
+            return convert()
+        if flight.error is not None:
+            # 同じ入力・同じオプションの変換は同じ理由で失敗するため、先行した変換のエラーを返す
+            raise flight.error
+        if os.path.abspath(flight.result) == os.path.abspath(target_path):
+            return target_path
+
+        try:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            temp_path = f"{target_path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(flight.result, temp_path)
+            os.replace(temp_path, target_path)
+        except OSError as e:
+            # 先行したリクエストの作業ディレクトリが既に削除された場合など
+            logger.warning(f"実行中の変換の結果を共有できないため、個別に変換します: {e}")
+            return convert()
+        logger.info(f"実行中の同じ変換の結果を共有しました: {os.path.basename(target_path)}")
+        return target_path
+
+    def _lead(self, key: str, kind: str, target_path: str, convert: Callable[[], str],
+              fetch: Callable[[], bool] = None) -> str:
+        """別プロセスで実行中の同じ変換があれば完了を待ってキャッシュから取得し、無ければ変換"""
+        if fetch is None or not self.lock_dir:
+            return convert()
+
+        lock_path = os.path.join(self.lock_dir, f"{key}.lock")
+        try:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            lock = FileLock(lock_path)
+            waited = False
+            try:
+                lock.acquire(timeout=0)
+            except Timeout:
+                waited = True
+                CONVERSIONS_COALESCED_TOTAL.inc(kind=kind, scope=SCOPE_HOST)
+                with time_stage('coalesce_wait'):
+                    lock.acquire(timeout=self.wait_timeout)
+            # 最後に使った時刻を記録する（sweep_lock_files は長く使われていないロックファイルだけを削除する）
+            _touch(lock_path)
+        except Timeout:
+            logger.warning(f"別のワーカープロセスの同じ変換が{self.wait_timeout:.0f}秒以内に完了しないため、個別に変換します")
+            return convert()
+        except OSError as e:
+            logger.warning(f"変換のロックを取得できないため、ロックせずに変換します: {e}")
+            return convert()
+
+        try:
+            if waited:
+                # 先行したプロセスはキャッシュに保存してからロックを解放する
+                try:
+                    cached = fetch()
+                except Exception as e:
+                    logger.warning(f"キャッシュの参照に失敗しました: {e}")
+                    cached = False
+                if cached:
+                    logger.info("別のワーカープロセスで完了した同じ変換の結果をキャッシュから取得しました")
+                    return target_path
+            return convert()
+        finally:
+            # 使用中のロックファイルを削除すると、削除前に開いたプロセスと新しく作成したプロセスが
+            # 別々のファイルをロックして同時に変換してしまうため、ここでは削除しない
+            lock.release()
+
+    def sweep_lock_files(self, max_age: float) -> int:
+        """
+        最後に使われてから max_age 秒を過ぎたロックファイルを削除
+
+        ロックファイルは空のファイルでキーごとに作られるため、ストレージジャニターから定期的に呼び出す。
+        ロックを取得できたもの（どのプロセスも変換中でないもの）だけを、ロックを保持したまま削除する。
+        （削除の直前に開いて解放後にロックしたプロセスがあると、そのキーの変換が1回だけ重複することがあるが、
+        長く使われていないキーに限られる）
+
+        Returns:
+            int: 削除したロックファイルの数
+        """
+        if not self.lock_dir or not os.path.isdir(self.lock_dir):
+            return 0
+
+        removed = 0
+        now = time.time()
+        with os.scandir(self.lock_dir) as it:
+            entries = [entry.path for entry in it if entry.name.endswith('.lock')]
+        for path in entries:
+            if not _is_stale(path, now, max_age):
+                continue
+            lock = FileLock(path)
+            try:
+                lock.acquire(timeout=0)
+            except Timeout:
+                continue
+            try:
+                # ロックの取得でも更新時刻が変わるため、取得後は確認し直さない
+                # （確認から取得までの間に使ったプロセスは、取得できた時点で変換を終えている）
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            finally:
+                lock.release()
+        return removed
+
+
+def _touch(path: str) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _is_stale(path: str, now: float, max_age: float) -> bool:
+    try:
+        return now - os.stat(path).st_mtime > max_age
+    except OSError:
+        return False
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """
+    共有のシングルフライトを取得
+
+    Returns:
+        SingleFlight: ANY2PDF_SINGLE_FLIGHT で無効化されている場合はNone
+    """
+    global _single_flight
+
+    if not config.SINGLE_FLIGHT:
+        return None
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight(
+                    os.path.join(config.CACHE_DIR, 'locks'), config.SINGLE_FLIGHT_WAIT_TIMEOUT
+                )
+    return _single_flight
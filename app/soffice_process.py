@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+LibreOfficeプロセスの実行管理
+sofficeを専用のプロセスグループで起動してCPU時間・アドレス空間の上限を設定し、
+タイムアウトや上限超過の際は子プロセス（soffice.bin）を含むグループ全体を終了する
+"""
+
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from . import config
+from .exceptions import ConvertToPdfError
+from .metrics import SOFFICE_FAILURES_TOTAL, SOFFICE_KILLS_TOTAL, SOFFICE_TIMEOUTS_TOTAL
+
+try:
+    import resource
+except ImportError:  # Windowsなど resource モジュールが無い環境
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# 強制終了の理由（メトリクスのラベル）
+KILL_REASON_TIMEOUT = 'timeout'
+KILL_REASON_CPU_LIMIT = 'cpu_limit'
+KILL_REASON_SIGNAL = 'signal'
+
+# 形式ごとのタイムアウトの重み（表計算・プレゼンテーションは同じサイズでも変換に時間がかかる）
+_TIMEOUT_WEIGHTS = {
+    'xlsx': 2.0,
+    'xls': 2.0,
+    'pptx': 1.5,
+    'ppt': 1.5,
+}
+
+# CPU時間の上限に達した後、SIGXCPUで終了しない場合にSIGKILLされるまでの猶予（秒）
+_CPU_LIMIT_GRACE = 5
+
+
+def conversion_timeout(input_paths: Iterable[str]) -> float:
+    """
+    入力ファイルのサイズと形式から変換のタイムアウト（秒）を算出
+
+    ファイルごとに 基本時間 + サイズ(MB) × 1MBあたりの時間 × 形式の重み を求め、
+    ANY2PDF_OFFICE_CONVERT_TIMEOUT を上限として合計する。
+    """
+    total = 0.0
+    for path in input_paths:
+        try:
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+        except OSError:
+            size_mb = 0.0
+        weight = _TIMEOUT_WEIGHTS.get(os.path.splitext(path)[1].lstrip('.').lower(), 1.0)
+        timeout = config.OFFICE_TIMEOUT_BASE + size_mb * config.OFFICE_TIMEOUT_PER_MB * weight
+        total += min(timeout, config.OFFICE_CONVERT_TIMEOUT)
+    return total
+
+
+def apply_resource_limits(pid: int, cpu_seconds: Optional[float] = None) -> None:
+    """
+    起動したプロセスにCPU時間・アドレス空間の上限を設定
+
+    preexec_fn はスレッドを使うサーバーでは安全でないため、起動直後に prlimit で設定する。
+    上限は以降に起動される子プロセス（soffice.bin）に引き継がれる。
+
+    Args:
+        pid: 対象のプロセスID
+        cpu_seconds: CPU時間の上限（秒、Noneの場合は設定しない）
+    """
+    if resource is None or not hasattr(resource, 'prlimit'):
+        return
+    try:
+        if cpu_seconds and config.SOFFICE_CPU_LIMIT_FACTOR > 0:
+            limit = max(1, int(cpu_seconds * config.SOFFICE_CPU_LIMIT_FACTOR))
+            resource.prlimit(pid, resource.RLIMIT_CPU, (limit, limit + _CPU_LIMIT_GRACE))
+        if config.SOFFICE_MEMORY_LIMIT_MB > 0:
+            limit = config.SOFFICE_MEMORY_LIMIT_MB * 1024 * 1024
+            resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+    except (OSError, ValueError) as e:
+        logger.warning(f"LibreOfficeのリソース上限を設定できません (pid={pid}): {e}")
+
+
+def kill_process_group(process: subprocess.Popen) -> bool:
+    """
+    プロセスグループ全体をSIGKILLで終了
+
+    Returns:
+        bool: 終了させたプロセスがあった場合はTrue
+    """
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return True
+        except (ProcessLookupError, PermissionError):
+            return False
+    if process.poll() is None:
+        process.kill()
+        return True
+    return False
+
+
+def record_kill(reason: str, files: List[str], detail: str = '') -> None:
+    """強制終了をメトリクスに記録し、対象のファイルとともにログに出力"""
+    SOFFICE_KILLS_TOTAL.inc(reason=reason)
+    names = ', '.join(os.path.basename(path) for path in files)
+    logger.error(f"LibreOfficeのプロセスグループを強制終了しました (reason={reason}{detail}): {names}")
+
+
+def _signal_name(returncode: int) -> str:
+    try:
+        return signal.Signals(-returncode).name
+    except ValueError:
+        return str(-returncode)
+
+
+def run_soffice(input_paths: List[str], output_dir: str, timeout: float = None) -> None:
+    """
+    sofficeを1回起動して入力ファイルをまとめてPDFに変換
+
+    Args:
+        input_paths: 入力ファイルのパス
+        output_dir: 出力ディレクトリ
+        timeout: タイムアウト（秒、省略時は入力から算出）
+
+    Raises:
+        ConvertToPdfError: 変換に失敗した場合、またはタイムアウト・上限超過で強制終了した場合
+    """
+    timeout = timeout or conversion_timeout(input_paths)
+    # 同じユーザープロファイルを使うsofficeが実行中だと、変換を実行中のプロセスに渡して
+    # PDFを出力せずに終了するため、呼び出しごとに専用のプロファイルを使う
+    profile_dir = tempfile.mkdtemp(prefix='any2pdf_soffice_profile_')
+    cmd = [
+        config.SOFFICE_BINARY,
+        '--headless',
+        f'-env:UserInstallation={Path(profile_dir).resolve().as_uri()}',
+        '--convert-to', 'pdf',
+        '--outdir', str(output_dir),
+        *[str(path) for path in input_paths]
+    ]
+
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+    except OSError:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        raise
+    apply_resource_limits(process.pid, cpu_seconds=timeout)
+    try:
+        _, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_group(process)
+        process.communicate()
+        SOFFICE_TIMEOUTS_TOTAL.inc()
+        record_kill(KILL_REASON_TIMEOUT, input_paths, f", timeout={timeout:.0f}s")
+        raise ConvertToPdfError("LibreOfficeの変換がタイムアウトしました")
+    finally:
+        # sofficeが終了しても、グループ内に残ったプロセスがあれば回収する
+        kill_process_group(process)
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+    if process.returncode < 0:
+        # CPU時間の上限はSIGXCPU、アドレス空間の上限は確保の失敗によるクラッシュとして現れる
+        signal_name = _signal_name(process.returncode)
+        reason = KILL_REASON_CPU_LIMIT if signal_name == 'SIGXCPU' else KILL_REASON_SIGNAL
+        SOFFICE_FAILURES_TOTAL.inc()
+        record_kill(reason, input_paths, f", signal={signal_name}")
+        raise ConvertToPdfError(f"LibreOfficeがリソースの上限超過またはシグナルで終了しました ({signal_name})")
+    if process.returncode != 0:
+        SOFFICE_FAILURES_TOTAL.inc()
+        raise ConvertToPdfError(f"LibreOffice変換エラー: {stderr.decode(errors='replace')}")
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+スプレッドシートの変換範囲の指定
+.xlsx のブック定義（xl/workbook.xml）を書き換え、変換するシート・印刷範囲・行数と列数の上限を
+LibreOfficeに渡す前に反映する
+
+対象外のシートは削除せずに非表示にする。数式が他のシートを参照していても値が崩れず、
+非表示のシートはLibreOfficeのPDF出力でレイアウトされない。
+"""
+
+import os
+import re
+import shutil
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+from .exceptions import SpreadsheetOptionError
+
+# 変換範囲の指定に対応する形式（.xls はバイナリ形式のため書き換えられない）
+SPREADSHEET_OPTION_EXTENSIONS = {'xlsx'}
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_WORKBOOK_PART = 'xl/workbook.xml'
+_WORKBOOK_RELS_PART = 'xl/_rels/workbook.xml.rels'
+_PRINT_AREA_NAME = '_xlnm.Print_Area'
+
+# Excelの上限（行数・列数）
+_MAX_SHEET_ROWS = 1048576
+_MAX_SHEET_COLS = 16384
+
+# definedNames より後に来る workbook の子要素（スキーマの順序を保って挿入するため）
+_ELEMENTS_AFTER_DEFINED_NAMES = (
+    'calcPr', 'oleSize', 'customWorkbookViews', 'pivotCaches', 'smartTagPr', 'smartTagTypes',
+    'webPublishing', 'fileRecoveryPr', 'webPublishObjects', 'extLst',
+)
+
+_CELL_PATTERN = re.compile(r'^\$?([A-Za-z]{1,3})\$?(\d+)$')
+_COLUMNS_PATTERN = re.compile(r'^\$?([A-Za-z]{1,3}):\$?([A-Za-z]{1,3})$')
+_ROWS_PATTERN = re.compile(r'^\$?(\d+):\$?(\d+)$')
+
+# 印刷範囲に指定すると既存の印刷範囲を無視してシート全体を変換する値
+PRINT_AREA_ALL = 'all'
+
+Area = Tuple[int, int, int, int]
+
+
+def _tag(name: str) -> str:
+    return f"{{{_MAIN_NS}}}{name}"
+
+
+def _column_index(letters: str) -> int:
+    """列名（A, Z, AA…）を1始まりの列番号に変換"""
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index
+
+
+def _column_letters(index: int) -> str:
+    """1始まりの列番号を列名に変換"""
+    letters = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _parse_area(ref: str) -> Optional[Area]:
+    """
+    セル範囲（A1:F50、A:F、1:50、A1）を (開始列, 開始行, 終了列, 終了行) に変換
+
+    解釈できない場合はNone
+    """
+    ref = ref.strip()
+    match = _COLUMNS_PATTERN.match(ref)
+    if match:
+        return _column_index(match.group(1)), 1, _column_index(match.group(2)), _MAX_SHEET_ROWS
+    match = _ROWS_PATTERN.match(ref)
+    if match:
+        return 1, int(match.group(1)), _MAX_SHEET_COLS, int(match.group(2))
+
+    start, separator, end = ref.partition(':')
+    start_match = _CELL_PATTERN.match(start)
+    end_match = _CELL_PATTERN.match(end if separator else start)
+    if start_match is None or end_match is None:
+        return None
+    first_col, first_row = _column_index(start_match.group(1)), int(start_match.group(2))
+    last_col, last_row = _column_index(end_match.group(1)), int(end_match.group(2))
+    if first_row < 1 or last_row < first_row or last_col < first_col or last_col > _MAX_SHEET_COLS:
+        return None
+    return first_col, first_row, last_col, last_row
+
+
+def _format_area(sheet_name: str, area: Area) -> str:
+    """印刷範囲の definedName の値（'シート名'!$A$1:$F$50）を作成"""
+    first_col, first_row, last_col, last_row = area
+    quoted = "'" + sheet_name.replace("'", "''") + "'"
+    return (f"{quoted}!${_column_letters(first_col)}${first_row}"
+            f":${_column_letters(last_col)}${last_row}")
+
+
+def _clip_area(area: Area, max_rows: Optional[int], max_cols: Optional[int]) -> Optional[Area]:
+    """範囲を先頭から max_rows 行・max_cols 列までに制限（範囲外になる場合はNone）"""
+    first_col, first_row, last_col, last_row = area
+    if max_rows:
+        last_row = min(last_row, max_rows)
+    if max_cols:
+        last_col = min(last_col, max_cols)
+    if last_row < first_row or last_col < first_col:
+        return None
+    return first_col, first_row, last_col, last_row
+
+
+def _parse_positive_int(name: str, value: Optional[str]) -> Optional[int]:
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise SpreadsheetOptionError(f"{name} には1以上の整数を指定してください")
+    return number
+
+
+def parse_spreadsheet_options(sheets: Optional[str] = None, print_area: Optional[str] = None,
+                              max_rows: Optional[str] = None, max_cols: Optional[str] = None) -> Dict[str, Any]:
+    """
+    リクエストの値からスプレッドシートの変換範囲の指定を作成
+
+    Args:
+        sheets: 変換するシート（シート名または1始まりの番号のカンマ区切り）
+        print_area: 印刷範囲（"A1:F50" で上書き、"all" で既存の印刷範囲を無視。未指定の場合は既存の印刷範囲に従う）
+        max_rows: 変換する最大行数
+        max_cols: 変換する最大列数
+
+    Returns:
+        dict: convert_office_file_to_pdf に渡すオプション（指定が無いものは含まない）
+
+    Raises:
+        SpreadsheetOptionError: 指定が不正な場合
+    """
+    options: Dict[str, Any] = {}
+    sheets = (sheets or '').strip()
+    if sheets:
+        names = [name.strip() for name in sheets.split(',') if name.strip()]
+        if not names:
+            raise SpreadsheetOptionError("sheets にはシート名またはシート番号を指定してください")
+        options['sheets'] = ','.join(names)
+
+    print_area = (print_area or '').strip()
+    if print_area:
+        if print_area.lower() == PRINT_AREA_ALL:
+            options['print_area'] = PRINT_AREA_ALL
+        else:
+            refs = [ref.strip() for ref in print_area.split(',')]
+            if any(_parse_area(ref) is None for ref in refs):
+                raise SpreadsheetOptionError(f"print_area の形式が不正です: {print_area}（例: A1:F50）")
+            options['print_area'] = ','.join(ref.upper().replace('$', '') for ref in refs)
+
+    for name, value in (('max_rows', max_rows), ('max_cols', max_cols)):
+        number = _parse_positive_int(name, value)
+        if number is not None:
+            options[name] = number
+    return options
+
+
+def check_spreadsheet_options(filename: str, options: Dict[str, Any]) -> None:
+    """
+    ファイル形式が変換範囲の指定に対応しているか確認
+
+    Raises:
+        SpreadsheetOptionError: 指定があり、ファイルが .xlsx 以外の場合
+    """
+    if not options:
+        return
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension == 'xls':
+        raise SpreadsheetOptionError(
+            "sheets・print_area・max_rows・max_cols は .xls には指定できません（.xlsx に変換してから指定してください）"
+        )
+    if extension not in SPREADSHEET_OPTION_EXTENSIONS:
+        raise SpreadsheetOptionError("sheets・print_area・max_rows・max_cols はExcelファイル（.xlsx）にのみ指定できます")
+
+
+def _select_sheets(sheet_elements: List[etree._Element], sheets: Optional[str]) -> List[int]:
+    """変換するシートの位置（0始まり）を決める（シート名の一致を優先し、次に1始まりの番号として解釈）"""
+    names = [element.get('name') for element in sheet_elements]
+    if not sheets:
+        return [index for index, element in enumerate(sheet_elements)
+                if element.get('state') not in ('hidden', 'veryHidden')]
+
+    selected = []
+    for token in sheets.split(','):
+        if token in names:
+            index = names.index(token)
+        elif token.isdigit() and 1 <= int(token) <= len(names):
+            index = int(token) - 1
+        else:
+            raise SpreadsheetOptionError(f"シートが見つかりません: {token}（シート: {', '.join(names)}）")
+        if index not in selected:
+            selected.append(index)
+    return selected
+
+
+def _sheet_part_paths(package: zipfile.ZipFile) -> Dict[str, str]:
+    """リレーションシップIDからワークシートのパーツ名（xl/worksheets/sheet1.xml）を求める"""
+    root = etree.fromstring(package.read(_WORKBOOK_RELS_PART))
+    paths = {}
+    for rel in root.iter(f"{{{_PACKAGE_REL_NS}}}Relationship"):
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            paths[rel.get('Id')] = target.lstrip('/')
+        else:
+            paths[rel.get('Id')] = os.path.normpath(os.path.join('xl', target)).replace(os.sep, '/')
+    return paths
+
+
+def _used_area(package: zipfile.ZipFile, part_path: Optional[str]) -> Area:
+    """
+    ワークシートの使用範囲（<dimension ref="A1:Z500"/>）を取得
+
+    dimension はシートデータより前にあるため、大きなシートでも先頭だけを読み込む
+    """
+    if part_path is None or part_path not in package.namelist():
+        return 1, 1, _MAX_SHEET_COLS, _MAX_SHEET_ROWS
+    with package.open(part_path) as part:
+        for _, element in etree.iterparse(part, events=('start',)):
+            if element.tag == _tag('dimension'):
+                area = _parse_area(element.get('ref', ''))
+                if area is not None:
+                    return area
+                break
+            if element.tag == _tag('sheetData'):
+                break
+    return 1, 1, _MAX_SHEET_COLS, _MAX_SHEET_ROWS
+
+
+def _defined_names(workbook: etree._Element) -> etree._Element:
+    """definedNames 要素を取得（無ければスキーマの順序に従って作成）"""
+    defined_names = workbook.find(_tag('definedNames'))
+    if defined_names is not None:
+        return defined_names
+    defined_names = etree.Element(_tag('definedNames'))
+    for name in _ELEMENTS_AFTER_DEFINED_NAMES:
+        following = workbook.find(_tag(name))
+        if following is not None:
+            following.addprevious(defined_names)
+            return defined_names
+    workbook.append(defined_names)
+    return defined_names
+
+
+def _rewrite_workbook(package: zipfile.ZipFile, sheets: Optional[str], print_area: Optional[str],
+                      max_rows: Optional[int], max_cols: Optional[int]) -> bytes:
+    """指定を反映した xl/workbook.xml を作成"""
+    workbook = etree.fromstring(package.read(_WORKBOOK_PART))
+    sheets_element = workbook.find(_tag('sheets'))
+    sheet_elements = list(sheets_element) if sheets_element is not None else []
+    if not sheet_elements:
+        raise SpreadsheetOptionError("ブックにシートがありません")
+
+    selected = _select_sheets(sheet_elements, sheets)
+    if not selected:
+        raise SpreadsheetOptionError("変換する表示中のシートがありません")
+
+    # 対象外のシートを非表示にし、指定されたシートは非表示でも表示にする
+    for index, element in enumerate(sheet_elements):
+        if index in selected:
+            element.attrib.pop('state', None)
+        elif element.get('state') != 'veryHidden':
+            element.set('state', 'hidden')
+
+    # 非表示のシートがアクティブなままにならないよう、ブック内で最初の対象シートをアクティブにする
+    book_views = workbook.find(_tag('bookViews'))
+    if book_views is not None:
+        for view in book_views.findall(_tag('workbookView')):
+            view.set('activeTab', str(min(selected)))
+            view.set('firstSheet', str(min(selected)))
+
+    if print_area is None and not max_rows and not max_cols:
+        return etree.tostring(workbook, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+    defined_names = _defined_names(workbook)
+    existing = {}
+    for name in defined_names.findall(_tag('definedName')):
+        if name.get('name') == _PRINT_AREA_NAME and name.get('localSheetId') is not None:
+            existing[int(name.get('localSheetId'))] = name
+
+    part_paths = _sheet_part_paths(package) if (max_rows or max_cols) else {}
+    for index in selected:
+        sheet_name = sheet_elements[index].get('name')
+        current = existing.get(index)
+
+        if print_area == PRINT_AREA_ALL:
+            areas = None
+        elif print_area is not None:
+            areas = [_parse_area(ref) for ref in print_area.split(',')]
+        elif current is not None:
+            # 既存の印刷範囲（'シート名'!$A$1:$F$50 のカンマ区切り）に従う
+            areas = [_parse_area(ref.rpartition('!')[2]) for ref in (current.text or '').split(',')]
+            if any(area is None for area in areas):
+                areas = None
+        else:
+            areas = None
+
+        if areas is None and (max_rows or max_cols):
+            relation_id = sheet_elements[index].get(f"{{{_REL_NS}}}id")
+            areas = [_used_area(package, part_paths.get(relation_id))]
+
+        if areas is not None:
+            areas = [clipped for clipped in (_clip_area(area, max_rows, max_cols) for area in areas) if clipped]
+            if not areas:
+                raise SpreadsheetOptionError(f"シート {sheet_name} の印刷範囲が max_rows・max_cols の範囲外です")
+
+        if current is not None:
+            defined_names.remove(current)
+        if areas:
+            name = etree.SubElement(defined_names, _tag('definedName'))
+            name.set('name', _PRINT_AREA_NAME)
+            name.set('localSheetId', str(index))
+            name.text = ','.join(_format_area(sheet_name, area) for area in areas)
+
+    if len(defined_names) == 0:
+        workbook.remove(defined_names)
+    return etree.tostring(workbook, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def prepare_spreadsheet(input_path: str, output_path: str, sheets: Optional[str] = None,
+                        print_area: Optional[str] = None, max_rows: Optional[int] = None,
+                        max_cols: Optional[int] = None) -> str:
+    """
+    変換範囲の指定を反映した .xlsx のコピーを作成
+
+    ブック定義以外のパーツ（シートのデータ・画像など）は展開せずにそのままコピーする
+
+    Args:
+        input_path: 元の .xlsx のパス
+        output_path: 書き換えたコピーの保存先
+        sheets: 変換するシート（シート名または1始まりの番号のカンマ区切り）
+        print_area: 印刷範囲（"A1:F50"・"all"・None）
+        max_rows: 変換する最大行数
+        max_cols: 変換する最大列数
+
+    Returns:
+        str: 書き換えたコピーのパス
+
+    Raises:
+        SpreadsheetOptionError: 指定が不正な場合、またはファイルを読み込めない場合
+    """
+    try:
+        with zipfile.ZipFile(input_path) as source:
+            workbook_xml = _rewrite_workbook(source, sheets, print_area, max_rows, max_cols)
+            with zipfile.ZipFile(output_path, 'w') as target:
+                for info in source.infolist():
+                    if info.filename == _WORKBOOK_PART:
+                        target.writestr(info, workbook_xml, compress_type=zipfile.ZIP_DEFLATED)
+                        continue
+                    with source.open(info) as src, target.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst)
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as e:
+        raise SpreadsheetOptionError(f"Excelファイルを読み込めません: {e}")
+    return output_path
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+ディスクライフサイクル管理
+リクエストごとの作業ディレクトリと、uploads/・output/ の容量・件数・保持期間を管理するジャニター
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from filelock import FileLock, Timeout
+from werkzeug.wsgi import ClosingIterator
+
+from . import config
+from .metrics import time_stage
+from .single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+# 処理中の作業ディレクトリに置くロックファイル
+# （ロックを保持している間はジャニターの削除対象から除外する。ワーカープロセスごとに起動する
+# ジャニターから確認できるようファイルロックを使い、プロセスが異常終了した場合はロックが自動的に外れる）
+ACTIVE_MARKER = '.active.lock'
+
+
+def call_on_response_close(response, callback):
+    """レスポンスの送信完了時（ボディを閉じたとき）に callback を呼ぶよう登録"""
+    if response.direct_passthrough:
+        # send_file のレスポンスはサーバーに直接渡され response.close() が呼ばれないため、
+        # ボディのイテレータを閉じたときに呼ぶ
+        response.response = ClosingIterator(response.response, callback)
+    else:
+        response.call_on_close(callback)
+    return response
+
+
+class RequestWorkspace:
+    """
+    リクエスト専用の作業ディレクトリ
+
+    uploads/<id>/ と output/<id>/ を確保し、同名ファイルを別のリクエストと共有しない
+    """
+
+    def __init__(self, upload_root: str, output_root: str):
+        self.id = uuid.uuid4().hex
+        self.upload_dir = os.path.join(upload_root, self.id)
+        self.output_dir = os.path.join(output_root, self.id)
+        self._deferred = False
+        self._cleaned = False
+        with time_stage('directory_create'):
+            os.makedirs(self.upload_dir, exist_ok=True)
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._markers = [_mark_active(self.upload_dir), _mark_active(self.output_dir)]
+
+    def _unmark(self) -> None:
+        """処理中のロックを解放（以降はジャニターの削除対象になる）"""
+        for marker in self._markers:
+            if marker is not None:
+                marker.release()
+        self._markers = []
+
+    def cleanup(self) -> None:
+        """作業ディレクトリを削除"""
+        if self._cleaned:
+            return
+        self._cleaned = True
+        self._unmark()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def defer(self) -> None:
+        """削除を呼び出し側に任せる（release() では削除しない）"""
+        self._deferred = True
+
+    def attach(self, response):
+        """レスポンスの送信完了後に作業ディレクトリを削除するよう登録"""
+        self.defer()
+        return call_on_response_close(response, self.cleanup)
+
+    def keep(self) -> None:
+        """結果を残す（削除はジョブの有効期限またはジャニターに任せる）"""
+        self._deferred = True
+        self._unmark()
+
+    def release(self) -> None:
+        """attach() / keep() されていなければ作業ディレクトリを削除"""
+        if not self._deferred:
+            self.cleanup()
+
+
+def _mark_active(directory: str) -> Optional[FileLock]:
+    """作業ディレクトリにロックファイルを作成して、処理中の間ロックを保持する"""
+    # 要求を受け付けたスレッドとレスポンスの送信完了後に削除するスレッドが異なるため、スレッドごとに管理しない
+    marker = FileLock(os.path.join(directory, ACTIVE_MARKER), thread_local=False)
+    try:
+        marker.acquire(timeout=0)
+    except (Timeout, OSError) as e:
+        # ロックできないファイルシステムの場合も、作成直後の項目は STORAGE_MIN_AGE の間は削除されない
+        logger.warning(f"作業ディレクトリのロックを取得できません: {directory}: {e}")
+        return None
+    return marker
+
+
+def is_active(path: str) -> bool:
+    """作業ディレクトリがいずれかのプロセスで処理中か（ロックファイルのロックが保持されているか）"""
+    marker_path = os.path.join(path, ACTIVE_MARKER)
+    if not os.path.isfile(marker_path):
+        return False
+    marker = FileLock(marker_path, thread_local=False)
+    try:
+        marker.acquire(timeout=0)
+    except Timeout:
+        return True
+    except OSError:
+        # 確認できない場合は削除しない
+        return True
+    marker.release()
+    return False
+
+
+def create_workspace(upload_root: str = None, output_root: str = None) -> RequestWorkspace:
+    """リクエスト専用の作業ディレクトリを作成"""
+    return RequestWorkspace(upload_root or config.UPLOAD_FOLDER, output_root or config.OUTPUT_FOLDER)
+
+
+def _entry_size(path: str) -> int:
+    """ファイルまたはディレクトリの合計サイズ"""
+    if not os.path.isdir(path) or os.path.islink(path):
+        try:
+            return os.lstat(path).st_size
+        except OSError:
+            return 0
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _remove_entry(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class StorageJanitor:
+    """
+    uploads/ と output/ を定期的に掃除するバックグラウンドスレッド
+
+    各フォルダの直下の項目を単位として、保持期間を過ぎたものを削除し、
+    さらに容量・件数の上限を超えている場合は古いものから削除する。
+    処理中の作業ディレクトリ（ACTIVE_MARKER のロックが保持されているもの）は削除しない
+    """
+
+    def __init__(self, roots: List[str], ttl: float, max_bytes: int, max_items: int,
+                 min_age: float, interval: float):
+        self.roots = roots
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.min_age = min_age
+        self.interval = interval
+        self.total_reclaimed_bytes = 0
+        self.total_removed_items = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name='storage-janitor', daemon=True)
+        self._thread.start()
+        logger.info(f"ストレージジャニターを開始しました: {', '.join(self.roots)}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _loop(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"ストレージの掃除に失敗しました: {e}")
+
+    def run_once(self) -> Dict[str, Any]:
+        """
+        全フォルダを1回掃除
+
+        Returns:
+            Dict[str, Any]: フォルダごとの削除件数・解放バイト数
+        """
+        report = {'started_at': time.time(), 'roots': {}}
+        for root in self.roots:
+            report['roots'][root] = self._sweep(root)
+        report['reclaimed_bytes'] = sum(r['reclaimed_bytes'] for r in report['roots'].values())
+        report['removed_items'] = sum(r['removed_items'] for r in report['roots'].values())
+
+        # 同じ変換をまとめるためのロックファイル（キャッシュのフォルダ内）も、長く使われていないものを削除する
+        single_flight = get_single_flight()
+        if single_flight is not None:
+            try:
+                report['removed_lock_files'] = single_flight.sweep_lock_files(
+                    max(self.ttl, config.SINGLE_FLIGHT_WAIT_TIMEOUT)
+                )
+            except OSError as e:
+                logger.warning(f"ロックファイルの掃除に失敗しました: {e}")
+
+        self.total_reclaimed_bytes += report['reclaimed_bytes']
+        self.total_removed_items += report['removed_items']
+        self.last_run = report
+        if report['removed_items']:
+            logger.info(
+                f"ストレージを掃除しました: {report['removed_items']}件削除、"
+                f"{report['reclaimed_bytes'] / 1024 / 1024:.1f}MB解放"
+            )
+        return report
+
+    def _sweep(self, root: str) -> Dict[str, int]:
+        """1つのフォルダを掃除"""
+        result = {'removed_items': 0, 'reclaimed_bytes': 0, 'remaining_items': 0, 'remaining_bytes': 0}
+        if not os.path.isdir(root):
+            return result
+
+        now = time.time()
+        entries = []
+        with os.scandir(root) as it:
+            for entry in it:
+                path = os.path.abspath(entry.path)
+                try:
+                    mtime = entry.stat(follow_symlinks=False).st_mtime
+                except OSError:
+                    continue
+                entries.append((mtime, path, _entry_size(path)))
+
+        # 古い順に並べる
+        entries.sort()
+        total_bytes = sum(size for _, _, size in entries)
+        total_items = len(entries)
+
+        for mtime, path, size in entries:
+            age = now - mtime
+            if age < self.min_age:
+                continue
+            expired = self.ttl > 0 and age > self.ttl
+            over_quota = (self.max_bytes > 0 and total_bytes > self.max_bytes) or \
+                         (self.max_items > 0 and total_items > self.max_items)
+            if not expired and not over_quota:
+                continue
+            # 処理中の作業ディレクトリ（別のワーカープロセスのものを含む）は削除しない
+            if is_active(path):
+                continue
+            _remove_entry(path)
+            total_bytes -= size
+            total_items -= 1
+            result['removed_items'] += 1
+            result['reclaimed_bytes'] += size
+
+        result['remaining_items'] = total_items
+        result['remaining_bytes'] = total_bytes
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """ジャニターの状態を取得"""
+        return {
+            'roots': self.roots,
+            'ttl': self.ttl,
+            'max_bytes': self.max_bytes,
+            'max_items': self.max_items,
+            'total_reclaimed_bytes': self.total_reclaimed_bytes,
+            'total_removed_items': self.total_removed_items,
+            'last_run': self.last_run,
+        }
+
+
+_janitor: Optional[StorageJanitor] = None
+_janitor_lock = threading.Lock()
+
+
+def start_storage_janitor(roots: List[str] = None) -> StorageJanitor:
+    """共有ジャニターを開始（起動済みの場合はそれを返す）"""
+    global _janitor
+    with _janitor_lock:
+        if _janitor is None:
+            _janitor = StorageJanitor(
+                roots or [config.UPLOAD_FOLDER, config.OUTPUT_FOLDER],
+                ttl=config.STORAGE_TTL,
+                max_bytes=config.STORAGE_MAX_BYTES,
+                max_items=config.STORAGE_MAX_ITEMS,
+                min_age=config.STORAGE_MIN_AGE,
+                interval=config.STORAGE_JANITOR_INTERVAL
+            )
+            _janitor.start()
+    return _janitor
+
+
+def get_storage_janitor_status() -> Optional[Dict[str, Any]]:
+    """起動済みのジャニターの状態を取得（未起動の場合はNone）"""
+    return _janitor.status() if _janitor is not None else None
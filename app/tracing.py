@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+トレース
+リクエストごとのトレースIDで変換の処理段階（スパン）を関連付け、
+OpenTelemetry互換のフィールド名を持つJSON Linesとしてエクスポーターに書き出す
+"""
+
+import contextvars
+import importlib
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, TextIO, Tuple
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+SPAN_KIND_SERVER = 'SPAN_KIND_SERVER'
+SPAN_KIND_INTERNAL = 'SPAN_KIND_INTERNAL'
+
+STATUS_CODE_UNSET = 'STATUS_CODE_UNSET'
+STATUS_CODE_OK = 'STATUS_CODE_OK'
+STATUS_CODE_ERROR = 'STATUS_CODE_ERROR'
+
+# トレースIDを受け取る・返すHTTPヘッダー
+TRACEPARENT_HEADER = 'traceparent'
+REQUEST_ID_HEADER = 'X-Request-ID'
+TRACE_ID_HEADER = 'X-Trace-ID'
+
+# W3C Trace Context の traceparent（version-traceid-parentid-flags）
+_TRACEPARENT_PATTERN = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+_TRACE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('any2pdf_current_span', default=None)
+
+
+class Span:
+    """計測中の処理段階"""
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str] = None,
+                 kind: str = SPAN_KIND_INTERNAL, attributes: Dict[str, Any] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status_code = STATUS_CODE_UNSET
+        self.status_message = ''
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        """例外をスパンの状態に記録"""
+        self.status_code = STATUS_CODE_ERROR
+        self.status_message = str(error)
+        self.attributes['exception.type'] = type(error).__name__
+
+    def end(self) -> None:
+        """スパンを終了してエクスポーターに書き出す（2回目以降の呼び出しは無視）"""
+        if self.end_time_unix_nano is not None:
+            return
+        self.end_time_unix_nano = time.time_ns()
+        if self.status_code == STATUS_CODE_UNSET:
+            self.status_code = STATUS_CODE_OK
+        exporter = get_span_exporter()
+        if exporter is None:
+            return
+        try:
+            exporter.export(self.to_dict())
+        except Exception as e:
+            logger.warning(f"スパンの書き出しに失敗しました: {e}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """OpenTelemetry（OTLP/JSON）のフィールド名で辞書に変換"""
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id or '',
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': self.start_time_unix_nano,
+            'endTimeUnixNano': self.end_time_unix_nano,
+            'durationMs': round((self.end_time_unix_nano - self.start_time_unix_nano) / 1e6, 3),
+            'attributes': self.attributes,
+            'status': {'code': self.status_code, 'message': self.status_message},
+            'resource': {'service.name': config.TRACE_SERVICE_NAME, 'process.pid': os.getpid()},
+        }
+
+
+class SpanExporter:
+    """スパンのエクスポーター（export() を実装して set_span_exporter() で差し替える）"""
+
+    def export(self, span: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """スパンを1行1件のJSONとして書き出すエクスポーター"""
+
+    def __init__(self, stream: TextIO = None, path: str = None):
+        """
+        Args:
+            stream: 書き出し先のストリーム
+            path: 書き出し先のファイル（追記する。stream より優先）
+        """
+        self._owns_stream = path is not None
+        self._stream = open(path, 'a', encoding='utf-8') if path is not None else (stream or sys.stdout)
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]) -> None:
+        line = json.dumps(span, ensure_ascii=False, default=str)
+        with self._lock:
+            self._stream.write(line + '\n')
+            self._stream.flush()
+
+    def shutdown(self) -> None:
+        if self._owns_stream:
+            self._stream.close()
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_configured = False
+_exporter_lock = threading.Lock()
+
+
+def _create_exporter_from_config() -> Optional[SpanExporter]:
+    """
+    ANY2PDF_TRACE_EXPORTER からエクスポーターを作成
+
+    "stdout"・"file"（ANY2PDF_TRACE_FILE に追記）、または "パッケージ.モジュール:ファクトリ" を指定できる。
+    未設定の場合はトレースを無効にする。
+    """
+    spec = config.TRACE_EXPORTER
+    if not spec:
+        return None
+    if spec == 'stdout':
+        return JsonLinesSpanExporter(stream=sys.stdout)
+    if spec == 'file':
+        return JsonLinesSpanExporter(path=config.TRACE_FILE)
+    module_name, _, attr = spec.partition(':')
+    try:
+        factory = getattr(importlib.import_module(module_name), attr)
+        return factory()
+    except Exception as e:
+        logger.error(f"トレースのエクスポーターを作成できません ({spec}): {e}")
+        return None
+
+
+def get_span_exporter() -> Optional[SpanExporter]:
+    """現在のエクスポーターを取得（未設定の場合は設定から作成。トレースが無効の場合はNone）"""
+    global _exporter, _exporter_configured
+    if not _exporter_configured:
+        with _exporter_lock:
+            if not _exporter_configured:
+                _exporter = _create_exporter_from_config()
+                _exporter_configured = True
+    return _exporter
+
+
+def set_span_exporter(exporter: Optional[SpanExporter]) -> None:
+    """エクスポーターを差し替える（Noneでトレースを無効化）"""
+    global _exporter, _exporter_configured
+    with _exporter_lock:
+        if _exporter is not None and _exporter is not exporter:
+            _exporter.shutdown()
+        _exporter = exporter
+        _exporter_configured = True
+
+
+def tracing_enabled() -> bool:
+    """トレースが有効か（エクスポーターが設定されているか）"""
+    return get_span_exporter() is not None
+
+
+def trace_context_from_headers(headers: Mapping[str, str]) -> Tuple[str, Optional[str]]:
+    """
+    リクエストヘッダーからトレースIDと親スパンIDを取得
+
+    traceparent（W3C Trace Context）を優先し、無ければ32桁の16進数の X-Request-ID をトレースIDとして使う。
+    いずれも無い場合は新しいトレースIDを生成する。
+
+    Returns:
+        Tuple[str, Optional[str]]: (トレースID, 親スパンID)
+    """
+    match = _TRACEPARENT_PATTERN.match((headers.get(TRACEPARENT_HEADER) or '').strip().lower())
+    if match and match.group(1) != '0' * 32:
+        return match.group(1), match.group(2)
+    request_id = (headers.get(REQUEST_ID_HEADER) or '').strip().lower().replace('-', '')
+    if _TRACE_ID_PATTERN.match(request_id):
+        return request_id, None
+    return secrets.token_hex(16), None
+
+
+def current_span() -> Optional[Span]:
+    """現在のスパンを取得（トレース中でない場合はNone）"""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """現在のトレースIDを取得（トレース中でない場合はNone）"""
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+def start_span(name: str, trace_id: str = None, parent_span_id: str = None, kind: str = SPAN_KIND_INTERNAL,
+               **attributes) -> Optional[Span]:
+    """
+    スパンを開始（終了は呼び出し側で end() する）
+
+    trace_id を省略した場合は現在のスパンの子として開始し、トレース中でなければNoneを返す。
+    トレースが無効の場合も子スパンはNoneを返す（trace_id を指定したリクエストのスパンは、
+    ログにトレースIDを付けるため書き出さずに作成する）。
+    """
+    if trace_id is None:
+        if not tracing_enabled():
+            return None
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        trace_id, parent_span_id = parent.trace_id, parent.span_id
+    return Span(name, trace_id, parent_span_id, kind, attributes)
+
+
+def activate(span: Optional[Span]) -> contextvars.Token:
+    """スパンを現在のスパンにする（戻り値のトークンを deactivate() に渡して元に戻す）"""
+    return _current_span.set(span)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    """activate() する前の現在のスパンに戻す"""
+    _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    現在のトレースの子スパンとしてブロックの処理時間を記録
+
+    トレース中でない場合（CLIやGradioからの変換など）は何も記録しない。
+    """
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def bind_context(func: Callable) -> Callable:
+    """
+    現在のコンテキスト（トレース中のスパン）を引き継いで func を実行する関数を返す
+
+    スレッドプールに渡す処理で、呼び出し元のトレースにスパンを関連付けるために使う。
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+ストリーミングアップロード
+multipartのファイル部分を一定サイズのチャンクで直接ディスクに書き込み、
+書き込みと同時にハッシュを計算して、形式ごとのサイズ上限を超えた時点で中断する
+"""
+
+import hashlib
+import os
+import uuid
+from typing import Dict, Optional
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+def format_bytes(size: int) -> str:
+    """バイト数を読みやすい単位の文字列に変換（例: 52428800 -> 50MB）"""
+    units = ('B', 'KB', 'MB', 'GB', 'TB')
+    value = float(size)
+    index = 0
+    while value >= 1024 and index < len(units) - 1:
+        value /= 1024
+        index += 1
+    return f"{value:.0f}{units[index]}" if value.is_integer() else f"{value:.1f}{units[index]}"
+
+
+class UploadTooLargeError(RequestEntityTooLarge):
+    """アップロードファイルが形式ごとのサイズ上限を超えた場合の例外"""
+
+    def __init__(self, filename: str, limit: int):
+        super().__init__(description=f"{filename}: {format_bytes(limit)}")
+        self.filename = filename
+        self.limit = limit
+
+
+class HashingUploadStream:
+    """
+    アップロード先に直接書き込むファイルストリーム
+
+    書き込まれたデータのSHA-256を逐次計算し、上限を超えた時点で書き込みを中断する。
+    claim() で取り出されなかったファイルは close() 時に削除される。
+    """
+
+    def __init__(self, directory: str, filename: str, limit: Optional[int]):
+        os.makedirs(directory, exist_ok=True)
+        self.filename = filename or ''
+        self.limit = limit
+        self.path = os.path.join(directory, f".upload_{uuid.uuid4().hex}.part")
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = open(self.path, 'w+b')
+        self._claimed = False
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            self.close()
+            raise UploadTooLargeError(self.filename, self.limit)
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        """書き込まれたデータのSHA-256"""
+        return self._digest.hexdigest()
+
+    def claim(self, destination: str) -> str:
+        """書き込み済みのファイルを destination に移動して所有権を移す"""
+        self._file.close()
+        os.replace(self.path, destination)
+        self._claimed = True
+        self.path = destination
+        return destination
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if not self._claimed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def __getattr__(self, name):
+        # read / readline / seek / tell などは実ファイルに委譲
+        return getattr(self._file, name)
+
+
+def upload_limit_for(filename: Optional[str], limits: Dict[str, int]) -> Optional[int]:
+    """
+    ファイル名の拡張子に対応するサイズ上限を取得
+
+    Args:
+        filename: アップロードされたファイル名
+        limits: 拡張子（小文字、ドットなし）とサイズ上限の辞書
+
+    Returns:
+        int: サイズ上限（未知の拡張子には最も小さい上限を適用）
+    """
+    if not limits:
+        return None
+    extension = filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+    return limits.get(extension, min(limits.values()))
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+監視フォルダの取り込み
+入力フォルダに置かれたファイルを検知し、書き込みが終わったものから順にPDFへ変換する
+
+変更の検知はLinuxではinotify（ctypes経由）、それ以外の環境やinotifyが使えない場合は定期的な走査で行う。
+いずれの場合も、サイズと更新時刻が一定時間変化しなくなるまで変換を待つ。
+変換結果は一括変換CLIと同じマニフェストに記録するため、再起動しても処理済みのファイルは変換し直さない。
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from . import config
+from .bulk import (
+    STATUS_SKIPPED, BulkConverter, ConversionManifest, is_source_file, plan_output_path, scan_tree
+)
+
+logger = logging.getLogger(__name__)
+
+# inotifyのイベント（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct('iIII')
+_READ_BUFFER_SIZE = 64 * 1024
+
+# 監視ループの1回の待ち時間（秒）
+_TICK_SECONDS = 0.5
+
+
+class InotifyWatcher:
+    """inotifyによるディレクトリツリーの変更監視"""
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotifyはLinuxでのみ利用できます")
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotifyを初期化できません: {os.strerror(error)}")
+        self._directories: Dict[int, str] = {}
+        self._excluded: set = set()
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"ディレクトリを監視できません: {path}: {os.strerror(error)}")
+        self._directories[wd] = path
+
+    def add_tree(self, root: str, exclude: List[str] = None) -> List[str]:
+        """
+        ディレクトリ以下をすべて監視対象に加える
+
+        Returns:
+            List[str]: 監視を始めた時点で既にあるファイルのパス（監視開始前に作られたファイルの取りこぼし防止）
+        """
+        self._excluded.update(os.path.abspath(path) for path in exclude or [])
+        files = []
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names[:] = [
+                name for name in dir_names if os.path.abspath(os.path.join(dir_path, name)) not in self._excluded
+            ]
+            self._add_watch(dir_path)
+            files.extend(os.path.join(dir_path, name) for name in file_names)
+        return files
+
+    def read(self, timeout: float) -> Tuple[List[str], bool]:
+        """
+        変更のあったファイルを取得（イベントが無ければ timeout 秒まで待つ）
+
+        Returns:
+            tuple: (変更のあったファイルのパス, イベントが溢れて取りこぼした可能性があるか)
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return [], False
+        try:
+            buffer = os.read(self._fd, _READ_BUFFER_SIZE)
+        except BlockingIOError:
+            return [], False
+
+        paths = []
+        overflowed = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, name_length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + name_length].rstrip(b'\0'))
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            directory = self._directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                # 新しいディレクトリは監視に加え、既に作られたファイルも拾う
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.abspath(path) not in self._excluded:
+                    try:
+                        paths.extend(self.add_tree(path))
+                    except OSError as e:
+                        logger.warning(str(e))
+                continue
+            paths.append(path)
+        return paths, overflowed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class WatchFolderDaemon:
+    """
+    監視フォルダの変換デーモン
+
+    検知したファイルはサイズと更新時刻が settle_seconds 秒変化しなくなってから変換し、
+    同時に変換するファイル数は workers 件までに抑える。
+    """
+
+    def __init__(self, folders: List[Tuple[str, str]], workers: int = 2, settle_seconds: float = None,
+                 poll_interval: float = None, use_inotify: bool = True, stream: TextIO = None, **options):
+        """
+        Args:
+            folders: (入力フォルダ, 出力フォルダ) のリスト
+            workers: 同時に変換するファイル数
+            settle_seconds: 書き込みが終わったとみなすまでの、変化の無い時間（秒）
+            poll_interval: 定期的な走査の間隔（秒。inotifyを使わない場合）
+            use_inotify: inotifyを使うか（Falseの場合は定期的な走査のみ）
+            stream: 変換結果の出力先
+            **options: 変換オプション（optimize, profile）
+        """
+        self.converters = [
+            BulkConverter(source_root, output_root, workers=workers, **options)
+            for source_root, output_root in folders
+        ]
+        self.workers = max(1, workers)
+        self.settle_seconds = config.WATCH_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        self.poll_interval = config.WATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.use_inotify = use_inotify
+        self.stream = stream
+        self._stop_event = threading.Event()
+        self._manifests: List[ConversionManifest] = []
+        # 書き込みの終わりを待っているファイル: (フォルダの番号, 相対パス) -> [サイズ, 更新時刻, 最後に変化した時刻]
+        self._pending: Dict[Tuple[int, str], List[Any]] = {}
+        # 変換中のファイル: Future -> (フォルダの番号, 相対パス, サイズ, 更新時刻)
+        self._in_flight: Dict[Any, Tuple[int, str, int, int]] = {}
+
+    def stop(self) -> None:
+        """監視を停止（変換中のファイルは完了を待つ）"""
+        self._stop_event.set()
+
+    def _folder_of(self, path: str) -> Optional[Tuple[int, str]]:
+        """パスが属する入力フォルダの番号と相対パス（対象外のファイルはNone）"""
+        if not is_source_file(os.path.basename(path)):
+            return None
+        path = os.path.abspath(path)
+        for index, converter in enumerate(self.converters):
+            if path.startswith(converter.output_root + os.sep):
+                continue
+            if path.startswith(converter.source_root + os.sep):
+                return index, os.path.relpath(path, converter.source_root)
+        return None
+
+    def _observe(self, index: int, rel_path: str, size: int = None, mtime_ns: int = None) -> None:
+        """ファイルの変化を記録（書き込みが終わるまで変換を待つ）"""
+        if size is None:
+            try:
+                stat = os.stat(os.path.join(self.converters[index].source_root, rel_path))
+            except OSError:
+                return
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        state = self._pending.get((index, rel_path))
+        if state is None or state[0] != size or state[1] != mtime_ns:
+            self._pending[(index, rel_path)] = [size, mtime_ns, time.monotonic()]
+
+    def _rescan(self) -> None:
+        """すべての入力フォルダを走査し、未処理・変更されたファイルを待ち行列に加える"""
+        for index, converter in enumerate(self.converters):
+            manifest = self._manifests[index]
+            for rel_path, size, mtime_ns in scan_tree(converter.source_root, exclude=[converter.output_root]):
+                if (index, rel_path) in self._pending:
+                    self._observe(index, rel_path, size, mtime_ns)
+                elif not self._is_processed(index, rel_path, size, mtime_ns, manifest.get(rel_path)):
+                    self._observe(index, rel_path, size, mtime_ns)
+
+    def _is_processed(self, index: int, rel_path: str, size: int, mtime_ns: int,
+                      entry: Optional[Dict[str, Any]]) -> bool:
+        """マニフェストの記録から、変更の無い処理済みのファイルか判定"""
+        if entry is None or entry['size'] != size or entry['mtime_ns'] != mtime_ns:
+            return False
+        converter = self.converters[index]
+        return converter.is_current(entry, plan_output_path(converter.source_root, rel_path))
+
+    def _dispatch_ready(self, executor: ThreadPoolExecutor) -> None:
+        """書き込みが終わったファイルを、並列数の上限まで変換に回す"""
+        now = time.monotonic()
+        busy = {(index, rel_path) for index, rel_path, _, _ in self._in_flight.values()}
+        for key in list(self._pending):
+            if len(self._in_flight) >= self.workers:
+                return
+            if key in busy:
+                continue
+            index, rel_path = key
+            converter = self.converters[index]
+            try:
+                stat = os.stat(os.path.join(converter.source_root, rel_path))
+            except OSError:
+                # 書き込み途中で削除・移動されたファイル
+                del self._pending[key]
+                continue
+
+            size, mtime_ns, changed_at = self._pending[key]
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                self._pending[key] = [stat.st_size, stat.st_mtime_ns, now]
+                continue
+            if now - changed_at < self.settle_seconds:
+                continue
+
+            del self._pending[key]
+            entry = self._manifests[index].get(rel_path)
+            if self._is_processed(index, rel_path, size, mtime_ns, entry):
+                continue
+            output_rel = plan_output_path(converter.source_root, rel_path)
+            future = executor.submit(converter.convert_file, rel_path, output_rel, entry)
+            self._in_flight[future] = (index, rel_path, size, mtime_ns)
+
+    def _collect_finished(self, wait_all: bool = False) -> None:
+        """変換が終わったファイルの結果をマニフェストに記録"""
+        for future in list(self._in_flight):
+            if not wait_all and not future.done():
+                continue
+            index, rel_path, size, mtime_ns = self._in_flight.pop(future)
+            result = future.result()
+            self.converters[index].record_result(self._manifests[index], result, size, mtime_ns)
+            if result['status'] != STATUS_SKIPPED:
+                line = f"{result['status']}: {os.path.join(self.converters[index].source_root, rel_path)}"
+                line += f" ({result['error']})" if result['error'] else f" ({result['duration_ms']} ms)"
+                print(line, file=self.stream, flush=True)
+
+    def _create_watcher(self) -> Optional[InotifyWatcher]:
+        """inotifyの監視を開始（使えない場合はNoneを返し、定期的な走査に切り替える）"""
+        if not self.use_inotify:
+            return None
+        try:
+            watcher = InotifyWatcher()
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotifyを利用できないため、{self.poll_interval}秒ごとの走査で監視します: {e}")
+            return None
+        try:
+            for converter in self.converters:
+                watcher.add_tree(converter.source_root, exclude=[converter.output_root])
+        except OSError as e:
+            watcher.close()
+            logger.warning(f"inotifyで監視できないため、{self.poll_interval}秒ごとの走査で監視します: {e}")
+            return None
+        return watcher
+
+    def run(self) -> None:
+        """停止されるまで入力フォルダを監視して変換"""
+        for converter in self.converters:
+            if not os.path.isdir(converter.source_root):
+                raise NotADirectoryError(f"入力ディレクトリが存在しません: {converter.source_root}")
+            os.makedirs(converter.output_root, exist_ok=True)
+            shutil.rmtree(converter.work_root, ignore_errors=True)
+            self._manifests.append(ConversionManifest(converter.manifest_path))
+
+        watcher = self._create_watcher()
+        mode = 'inotify' if watcher is not None else f"{self.poll_interval}秒ごとの走査"
+        logger.info(f"{len(self.converters)}個のフォルダの監視を開始しました（{mode}）")
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='any2pdf-watch')
+        try:
+            # 停止中に置かれたファイルを拾う（処理済みのファイルはマニフェストの記録で飛ばす）
+            self._rescan()
+            last_scan = time.monotonic()
+            while not self._stop_event.is_set():
+                if watcher is not None:
+                    paths, overflowed = watcher.read(_TICK_SECONDS)
+                    for path in paths:
+                        location = self._folder_of(path)
+                        if location is not None:
+                            self._observe(*location)
+                    if overflowed:
+                        logger.warning("inotifyのイベントが溢れたため、入力フォルダを走査し直します")
+                        self._rescan()
+                else:
+                    self._stop_event.wait(_TICK_SECONDS)
+                    if time.monotonic() - last_scan >= self.poll_interval:
+                        self._rescan()
+                        last_scan = time.monotonic()
+                self._collect_finished()
+                self._dispatch_ready(executor)
+        finally:
+            # 変換中のファイルは完了を待って記録する（途中のPDFは出力フォルダに現れない）
+            executor.shutdown(wait=True)
+            self._collect_finished(wait_all=True)
+            if watcher is not None:
+                watcher.close()
+            for manifest in self._manifests:
+                manifest.close()
+            for converter in self.converters:
+                shutil.rmtree(converter.work_root, ignore_errors=True)
+            logger.info("フォルダの監視を停止しました")
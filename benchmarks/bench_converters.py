@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+変換関数のベンチマーク
+
+合成コーパスの各ファイルについて convert_image_to_pdf / convert_office_file_to_pdf を
+直接呼び出し、経過時間・CPU時間・出力サイズとプロセスのピークRSSを計測します。
+キャッシュは無効にして計測します。
+
+使い方:
+    python -m benchmarks.bench_converters --repeat 5 --soffice auto --json converters.json
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (  # noqa: E402
+    configure_environment, environment_info, peak_rss_kb, resolve_soffice, summarize_latencies, write_results
+)
+from benchmarks.corpus import generate_corpus  # noqa: E402
+
+
+def run(corpus: List[Dict[str, Any]], repeat: int, work_dir: str) -> List[Dict[str, Any]]:
+    """コーパスの各ファイルを repeat 回変換して計測"""
+    # 環境変数を設定してからインポートする
+    from app.pdf_converter import convert_image_to_pdf, convert_office_file_to_pdf
+
+    # 変換ごとのログ出力は計測の妨げになるため抑制する
+    logging.getLogger().setLevel(logging.WARNING)
+
+    converters = {'image': convert_image_to_pdf, 'office': convert_office_file_to_pdf}
+    results = []
+    for item in corpus:
+        converter = converters[item['kind']]
+        wall: List[float] = []
+        cpu: List[float] = []
+        output_bytes = 0
+        error = None
+        for attempt in range(repeat):
+            output_dir = os.path.join(work_dir, 'out', f"{item['name']}_{attempt}")
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            try:
+                pdf_path = converter(item['path'], output_dir)
+            except Exception as e:
+                error = str(e)
+                break
+            cpu.append((time.process_time() - cpu_start) * 1000)
+            wall.append((time.perf_counter() - wall_start) * 1000)
+            output_bytes = os.path.getsize(pdf_path)
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        summary = summarize_latencies(wall)
+        results.append({
+            'name': item['name'],
+            'kind': item['kind'],
+            'input_bytes': item['bytes'],
+            'output_bytes': output_bytes,
+            'cpu_ms': round(statistics.median(cpu), 2) if cpu else 0.0,
+            'error': error,
+            **summary,
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="変換関数のベンチマーク")
+    parser.add_argument('--repeat', type=int, default=5, help="ファイルごとの繰り返し回数")
+    parser.add_argument('--scale', type=float, default=1.0, help="コーパスの規模の倍率")
+    parser.add_argument('--kinds', default='image,office', help="計測する種類（image, office）")
+    parser.add_argument('--soffice', choices=('auto', 'stub', 'system'), default='auto',
+                        help="使用するsoffice（auto: 見つからなければスタブ）")
+    parser.add_argument('--json', dest='json_path', help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    soffice = resolve_soffice(args.soffice)
+    if soffice is None:
+        parser.error("LibreOffice（soffice）が見つかりません")
+    kinds = tuple(kind.strip() for kind in args.kinds.split(',') if kind.strip())
+
+    with tempfile.TemporaryDirectory(prefix='any2pdf_bench_') as work_dir:
+        configure_environment(work_dir, soffice)
+        corpus = generate_corpus(os.path.join(work_dir, 'corpus'), args.scale, kinds=kinds)
+        results = run(corpus, args.repeat, work_dir)
+
+    print(f"{'file':<26}{'in KB':>9}{'out KB':>9}{'p50 ms':>10}{'p95 ms':>10}{'cpu ms':>10}  error")
+    for result in results:
+        print(f"{result['name']:<26}{result['input_bytes'] / 1024:>9.0f}{result['output_bytes'] / 1024:>9.0f}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['cpu_ms']:>10.1f}  {result['error'] or ''}")
+    peak = peak_rss_kb()
+    print(f"peak RSS: {peak / 1024:.0f} MB" if peak else "peak RSS: -")
+
+    if args.json_path:
+        write_results(args.json_path, {
+            'benchmark': 'converters',
+            'environment': environment_info(soffice),
+            'parameters': {'repeat': args.repeat, 'scale': args.scale, 'kinds': list(kinds)},
+            'peak_rss_kb': peak,
+            'results': results,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+画像→PDF変換のベンチマーク
+
+従来の変換処理（RGB変換→quality=95のJPEGを一時ファイルに保存→img2pdf）と、
+現在の image_to_pdf_bytes（そのまま埋め込み／メモリ上での正規化）を比較し、
+画像1枚あたりの経過時間・CPU時間・出力サイズを表示します。
+
+使い方:
+    python -m benchmarks.bench_image_to_pdf --repeat 5 --json result.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import img2pdf
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.pdf_converter import image_to_pdf_bytes  # noqa: E402
+
+
+def legacy_image_to_pdf(input_path: str, work_dir: str) -> bytes:
+    """変更前の変換処理（比較用）"""
+    with Image.open(input_path) as img:
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        temp_path = os.path.join(work_dir, "temp_legacy.jpg")
+        img.save(temp_path, 'JPEG', quality=95)
+        pdf_bytes = img2pdf.convert([temp_path])
+        os.remove(temp_path)
+    return pdf_bytes
+
+
+def make_sample_images(directory: str) -> Dict[str, str]:
+    """ベンチマーク用の画像を生成"""
+    samples = {}
+
+    # 写真相当（グラデーション＋図形）の大きなJPEG
+    photo = Image.linear_gradient('L').resize((4000, 3000)).convert('RGB')
+    draw = ImageDraw.Draw(photo)
+    for i in range(0, 4000, 200):
+        draw.ellipse((i, i % 3000, i + 300, (i % 3000) + 300), fill=(i % 256, 80, 160))
+    samples['photo_4000x3000.jpg'] = os.path.join(directory, 'photo_4000x3000.jpg')
+    photo.save(samples['photo_4000x3000.jpg'], 'JPEG', quality=90)
+
+    # スクリーンショット相当のPNG
+    screen = Image.new('RGB', (1920, 1080), 'white')
+    draw = ImageDraw.Draw(screen)
+    for y in range(0, 1080, 24):
+        draw.text((20, y), "Any2Pdf benchmark " * 8, fill='black')
+    samples['screenshot_1920x1080.png'] = os.path.join(directory, 'screenshot_1920x1080.png')
+    screen.save(samples['screenshot_1920x1080.png'], 'PNG')
+
+    # 透過付きPNG（正規化が必要な画像）
+    alpha = screen.convert('RGBA')
+    alpha.putalpha(200)
+    samples['alpha_1920x1080.png'] = os.path.join(directory, 'alpha_1920x1080.png')
+    alpha.save(samples['alpha_1920x1080.png'], 'PNG')
+
+    return samples
+
+
+def measure(func: Callable[[], bytes], repeat: int) -> Dict[str, float]:
+    """経過時間・CPU時間（ミリ秒の中央値）と出力サイズを計測"""
+    wall: List[float] = []
+    cpu: List[float] = []
+    size = 0
+    for _ in range(repeat):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        size = len(func())
+        cpu.append((time.process_time() - cpu_start) * 1000)
+        wall.append((time.perf_counter() - wall_start) * 1000)
+    return {
+        'wall_ms': round(statistics.median(wall), 2),
+        'cpu_ms': round(statistics.median(cpu), 2),
+        'output_bytes': size,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="画像→PDF変換のベンチマーク")
+    parser.add_argument('--repeat', type=int, default=5, help="画像ごとの繰り返し回数")
+    parser.add_argument('--json', dest='json_path', help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, path in make_sample_images(work_dir).items():
+            legacy = measure(lambda: legacy_image_to_pdf(path, work_dir), args.repeat)
+            current = measure(lambda: image_to_pdf_bytes(path), args.repeat)
+            results.append({'image': name, 'legacy': legacy, 'current': current})
+
+    print(f"{'image':<28}{'legacy ms':>12}{'current ms':>12}{'legacy cpu':>12}{'current cpu':>12}"
+          f"{'legacy KB':>12}{'current KB':>12}")
+    for result in results:
+        legacy, current = result['legacy'], result['current']
+        print(f"{result['image']:<28}{legacy['wall_ms']:>12.1f}{current['wall_ms']:>12.1f}"
+              f"{legacy['cpu_ms']:>12.1f}{current['cpu_ms']:>12.1f}"
+              f"{legacy['output_bytes'] / 1024:>12.0f}{current['output_bytes'] / 1024:>12.0f}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
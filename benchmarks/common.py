@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク共通処理
+実行環境の設定・統計値の計算・結果のJSON保存
+"""
+
+import json
+import math
+import os
+import platform
+import shutil
+import stat
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_SOFFICE = os.path.join(REPO_ROOT, 'benchmarks', 'stub_soffice.py')
+
+
+def resolve_soffice(mode: str) -> Optional[str]:
+    """
+    使用するsofficeを決定
+
+    Args:
+        mode: 'stub'（スタブ）、'system'（インストール済みのLibreOffice）、'auto'（見つからなければスタブ）
+
+    Returns:
+        str: sofficeのパス（'system' でも見つからない場合はNone）
+    """
+    if mode == 'stub':
+        return STUB_SOFFICE
+    found = shutil.which(os.environ.get('ANY2PDF_SOFFICE', 'soffice'))
+    if found or mode == 'system':
+        return found
+    return STUB_SOFFICE
+
+
+def configure_environment(work_dir: str, soffice: str, cache: bool = False) -> Dict[str, str]:
+    """
+    ベンチマーク用の環境変数を設定（app をインポートする前に呼ぶこと）
+
+    uploads/・output/・キャッシュは作業ディレクトリ内に作成し、
+    計測対象が変換処理そのものになるようキャッシュは既定で無効にする
+
+    Returns:
+        Dict[str, str]: 設定した環境変数
+    """
+    if soffice == STUB_SOFFICE:
+        mode = os.stat(STUB_SOFFICE).st_mode
+        os.chmod(STUB_SOFFICE, mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    settings = {
+        'ANY2PDF_UPLOAD_FOLDER': os.path.join(work_dir, 'uploads'),
+        'ANY2PDF_OUTPUT_FOLDER': os.path.join(work_dir, 'output'),
+        'ANY2PDF_CACHE_DIR': os.path.join(work_dir, 'cache'),
+        'ANY2PDF_SOFFICE': soffice,
+    }
+    if not cache:
+        settings['ANY2PDF_CACHE_MAX_BYTES'] = '0'
+    if soffice == STUB_SOFFICE:
+        # スタブはUNO接続を受け付けないため、常駐ワーカープールを使わない
+        settings['ANY2PDF_OFFICE_POOL_SIZE'] = '0'
+    os.environ.update(settings)
+    return settings
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """線形補間によるパーセンタイル"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict[str, float]:
+    """レイテンシ（ミリ秒）の統計値"""
+    return {
+        'count': len(latencies_ms),
+        'min_ms': round(min(latencies_ms), 2) if latencies_ms else 0.0,
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+        'p50_ms': round(percentile(latencies_ms, 50), 2),
+        'p95_ms': round(percentile(latencies_ms, 95), 2),
+        'p99_ms': round(percentile(latencies_ms, 99), 2),
+        'max_ms': round(max(latencies_ms), 2) if latencies_ms else 0.0,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10, check=True
+        )
+        return result.stdout.decode().strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment_info(soffice: Optional[str]) -> Dict[str, Any]:
+    """実行環境の情報（結果を比較する際の前提条件）"""
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'soffice': 'stub' if soffice == STUB_SOFFICE else soffice,
+    }
+
+
+def peak_rss_kb(pid: Optional[int] = None) -> Optional[int]:
+    """
+    プロセスのピークRSS（KB）
+
+    Linuxでは /proc/<pid>/status の VmHWM を、それ以外では自プロセスの ru_maxrss を使う
+    """
+    status_path = f"/proc/{pid or 'self'}/status"
+    if os.path.exists(status_path):
+        with open(status_path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    if pid is None:
+        try:
+            import resource
+        except ImportError:
+            return None
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOSはバイト単位
+        return usage // 1024 if sys.platform == 'darwin' else usage
+    return None
+
+
+def write_results(path: str, payload: Dict[str, Any]) -> None:
+    """結果をJSONで保存"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"結果を保存しました: {path}")
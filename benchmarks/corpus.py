@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用の合成コーパス
+
+サイズ・カラーモードの異なる画像（Pillow）と、小さい／大きい docx・xlsx・pptx を生成します。
+Officeファイルは外部ライブラリを使わずに最小構成のOOXMLを直接書き出します。
+乱数は固定シードのため、同じ引数なら毎回同じコーパスが生成されます。
+
+使い方:
+    python -m benchmarks.corpus corpus_dir --scale 1.0
+"""
+
+import argparse
+import os
+import random
+import zipfile
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+from PIL import Image, ImageDraw
+
+# (ファイル名, 幅, 高さ, モード, 保存形式, 保存オプション)
+IMAGE_SPECS = [
+    ('small_rgb.jpg', 640, 480, 'RGB', 'JPEG', {'quality': 85}),
+    ('photo_rgb.jpg', 4000, 3000, 'RGB', 'JPEG', {'quality': 90}),
+    ('photo_progressive.jpg', 2000, 1500, 'RGB', 'JPEG', {'quality': 90, 'progressive': True}),
+    ('scan_cmyk.jpg', 2480, 3508, 'CMYK', 'JPEG', {'quality': 90}),
+    ('scan_gray.png', 2480, 3508, 'L', 'PNG', {}),
+    ('screenshot_rgb.png', 1920, 1080, 'RGB', 'PNG', {}),
+    ('diagram_palette.png', 1600, 1200, 'P', 'PNG', {}),
+    ('overlay_rgba.png', 1920, 1080, 'RGBA', 'PNG', {}),
+]
+
+# (種類, 規模) -> 生成する量（scale=1.0 の場合）
+OFFICE_SPECS = {
+    ('docx', 'small'): 20,       # 段落数
+    ('docx', 'large'): 4000,
+    ('xlsx', 'small'): 50,       # 行数（10列）
+    ('xlsx', 'large'): 20000,
+    ('pptx', 'small'): 3,        # スライド数
+    ('pptx', 'large'): 120,
+}
+
+_WORDS = (
+    "any2pdf convert office document image archive page layout render font table chart "
+    "slide sheet column row paragraph heading margin export quality latency throughput"
+).split()
+
+_CONTENT_TYPES_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+)
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _relationships(rels: List[tuple]) -> str:
+    items = ''.join(f'<Relationship Id="{rid}" Type="{_REL_NS}/{kind}" Target="{target}"/>'
+                    for rid, kind, target in rels)
+    return f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{_PKG_REL_NS}">{items}</Relationships>'
+
+
+def _draw_image(spec: tuple, scale: float, rng: random.Random) -> Image.Image:
+    name, width, height, mode, _, _ = spec
+    width = max(16, int(width * scale))
+    height = max(16, int(height * scale))
+
+    # グラデーションの背景に図形と文字を描いて、写真・文書に近い圧縮率にする
+    base = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(base)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        size = rng.randrange(16, max(17, width // 6))
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        draw.ellipse((x, y, x + size, y + size), fill=color)
+    for y in range(0, height, 32):
+        draw.text((16, y), _sentence(rng, 10), fill='black')
+
+    if mode == 'P':
+        return base.convert('P', palette=Image.ADAPTIVE, colors=64)
+    if mode == 'RGBA':
+        rgba = base.convert('RGBA')
+        rgba.putalpha(Image.linear_gradient('L').resize((width, height)))
+        return rgba
+    return base.convert(mode)
+
+
+def write_docx(path: str, paragraphs: int, rng: random.Random) -> None:
+    """段落数を指定して docx を作成"""
+    body = ''.join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(_sentence(rng, 24))}</w:t></w:r></w:p>'
+        for _ in range(paragraphs)
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}<w:sectPr><w:pgSz w:w="11906" w:h="16838"/></w:sectPr></w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES_HEAD + (
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ))
+        zf.writestr('_rels/.rels', _relationships([('rId1', 'officeDocument', 'word/document.xml')]))
+        zf.writestr('word/document.xml', document)
+
+
+def _column_name(index: int) -> str:
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+
+def write_xlsx(path: str, rows: int, rng: random.Random, columns: int = 10) -> None:
+    """行数を指定して xlsx を作成（先頭列は文字列、残りは数値）"""
+    sheet_rows = []
+    for row in range(1, rows + 1):
+        cells = [f'<c r="A{row}" t="inlineStr"><is><t>{escape(_sentence(rng, 3))}</t></is></c>']
+        cells.extend(
+            f'<c r="{_column_name(col)}{row}"><v>{rng.randrange(100000) / 100}</v></c>'
+            for col in range(1, columns)
+        )
+        sheet_rows.append(f'<row r="{row}">{"".join(cells)}</row>')
+    sheet = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'<sheetData>{"".join(sheet_rows)}</sheetData></worksheet>'
+    )
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        f'xmlns:r="{_REL_NS}"><sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    )
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES_HEAD + (
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ))
+        zf.writestr('_rels/.rels', _relationships([('rId1', 'officeDocument', 'xl/workbook.xml')]))
+        zf.writestr('xl/workbook.xml', workbook)
+        zf.writestr('xl/_rels/workbook.xml.rels', _relationships([('rId1', 'worksheet', 'worksheets/sheet1.xml')]))
+        zf.writestr('xl/worksheets/sheet1.xml', sheet)
+
+
+_PML_NS = ('xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+           f'xmlns:r="{_REL_NS}" xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"')
+_EMPTY_TREE = ('<p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+               '<p:grpSpPr/>')
+_THEME = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<a:theme xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" name="Bench"><a:themeElements>'
+    '<a:clrScheme name="Bench">'
+    '<a:dk1><a:srgbClr val="000000"/></a:dk1><a:lt1><a:srgbClr val="FFFFFF"/></a:lt1>'
+    '<a:dk2><a:srgbClr val="1F497D"/></a:dk2><a:lt2><a:srgbClr val="EEECE1"/></a:lt2>'
+    '<a:accent1><a:srgbClr val="4F81BD"/></a:accent1><a:accent2><a:srgbClr val="C0504D"/></a:accent2>'
+    '<a:accent3><a:srgbClr val="9BBB59"/></a:accent3><a:accent4><a:srgbClr val="8064A2"/></a:accent4>'
+    '<a:accent5><a:srgbClr val="4BACC6"/></a:accent5><a:accent6><a:srgbClr val="F79646"/></a:accent6>'
+    '<a:hlink><a:srgbClr val="0000FF"/></a:hlink><a:folHlink><a:srgbClr val="800080"/></a:folHlink>'
+    '</a:clrScheme>'
+    '<a:fontScheme name="Bench"><a:majorFont><a:latin typeface="Arial"/><a:ea typeface=""/><a:cs typeface=""/>'
+    '</a:majorFont><a:minorFont><a:latin typeface="Arial"/><a:ea typeface=""/><a:cs typeface=""/>'
+    '</a:minorFont></a:fontScheme>'
+    '<a:fmtScheme name="Bench">'
+    '<a:fillStyleLst>' + '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>' * 3 + '</a:fillStyleLst>'
+    '<a:lnStyleLst>' + '<a:ln w="9525"><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:ln>' * 3 +
+    '</a:lnStyleLst>'
+    '<a:effectStyleLst>' + '<a:effectStyle><a:effectLst/></a:effectStyle>' * 3 + '</a:effectStyleLst>'
+    '<a:bgFillStyleLst>' + '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>' * 3 + '</a:bgFillStyleLst>'
+    '</a:fmtScheme></a:themeElements></a:theme>'
+)
+
+
+def _slide_xml(title: str, body: str) -> str:
+    shapes = []
+    for shape_id, (text, y, size) in enumerate(((title, 457200, 3200), (body, 1600200, 1800)), start=2):
+        shapes.append(
+            f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="Text {shape_id}"/><p:cNvSpPr txBox="1"/><p:nvPr/>'
+            f'</p:nvSpPr><p:spPr><a:xfrm><a:off x="457200" y="{y}"/><a:ext cx="8229600" cy="1143000"/></a:xfrm>'
+            '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr>'
+            f'<p:txBody><a:bodyPr wrap="square"/><a:lstStyle/><a:p><a:r><a:rPr lang="en-US" sz="{size}"/>'
+            f'<a:t>{escape(text)}</a:t></a:r></a:p></p:txBody></p:sp>'
+        )
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><p:sld {_PML_NS}>'
+            f'<p:cSld><p:spTree>{_EMPTY_TREE}{"".join(shapes)}</p:spTree></p:cSld>'
+            '<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>')
+
+
+def write_pptx(path: str, slides: int, rng: random.Random) -> None:
+    """スライド数を指定して pptx を作成（各スライドにタイトルと本文）"""
+    master = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><p:sldMaster {_PML_NS}>'
+        f'<p:cSld><p:spTree>{_EMPTY_TREE}</p:spTree></p:cSld>'
+        '<p:clrMap bg1="lt1" tx1="dk1" bg2="lt2" tx2="dk2" accent1="accent1" accent2="accent2" '
+        'accent3="accent3" accent4="accent4" accent5="accent5" accent6="accent6" hlink="hlink" '
+        'folHlink="folHlink"/><p:sldLayoutIdLst><p:sldLayoutId id="2147483649" r:id="rId1"/></p:sldLayoutIdLst>'
+        '</p:sldMaster>'
+    )
+    layout = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><p:sldLayout {_PML_NS} type="blank">'
+        f'<p:cSld name="Blank"><p:spTree>{_EMPTY_TREE}</p:spTree></p:cSld>'
+        '<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sldLayout>'
+    )
+    slide_ids = ''.join(f'<p:sldId id="{256 + i}" r:id="rId{i + 2}"/>' for i in range(slides))
+    presentation = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><p:presentation {_PML_NS}>'
+        '<p:sldMasterIdLst><p:sldMasterId id="2147483648" r:id="rId1"/></p:sldMasterIdLst>'
+        f'<p:sldIdLst>{slide_ids}</p:sldIdLst>'
+        '<p:sldSz cx="9144000" cy="6858000"/><p:notesSz cx="6858000" cy="9144000"/></p:presentation>'
+    )
+    presentation_rels = [('rId1', 'slideMaster', 'slideMasters/slideMaster1.xml')]
+    presentation_rels.extend((f'rId{i + 2}', 'slide', f'slides/slide{i + 1}.xml') for i in range(slides))
+    presentation_rels.append((f'rId{slides + 2}', 'theme', 'theme/theme1.xml'))
+
+    overrides = [
+        ('/ppt/presentation.xml', 'presentationml.presentation.main+xml'),
+        ('/ppt/slideMasters/slideMaster1.xml', 'presentationml.slideMaster+xml'),
+        ('/ppt/slideLayouts/slideLayout1.xml', 'presentationml.slideLayout+xml'),
+        ('/ppt/theme/theme1.xml', 'theme+xml'),
+    ]
+    overrides.extend((f'/ppt/slides/slide{i + 1}.xml', 'presentationml.slide+xml') for i in range(slides))
+    content_types = _CONTENT_TYPES_HEAD + ''.join(
+        f'<Override PartName="{part}" ContentType="application/vnd.openxmlformats-officedocument.{kind}"/>'
+        for part, kind in overrides
+    ) + '</Types>'
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', content_types)
+        zf.writestr('_rels/.rels', _relationships([('rId1', 'officeDocument', 'ppt/presentation.xml')]))
+        zf.writestr('ppt/presentation.xml', presentation)
+        zf.writestr('ppt/_rels/presentation.xml.rels', _relationships(presentation_rels))
+        zf.writestr('ppt/slideMasters/slideMaster1.xml', master)
+        zf.writestr('ppt/slideMasters/_rels/slideMaster1.xml.rels', _relationships([
+            ('rId1', 'slideLayout', '../slideLayouts/slideLayout1.xml'),
+            ('rId2', 'theme', '../theme/theme1.xml'),
+        ]))
+        zf.writestr('ppt/slideLayouts/slideLayout1.xml', layout)
+        zf.writestr('ppt/slideLayouts/_rels/slideLayout1.xml.rels', _relationships([
+            ('rId1', 'slideMaster', '../slideMasters/slideMaster1.xml'),
+        ]))
+        zf.writestr('ppt/theme/theme1.xml', _THEME)
+        for i in range(slides):
+            zf.writestr(f'ppt/slides/slide{i + 1}.xml', _slide_xml(f"Slide {i + 1}", _sentence(rng, 30)))
+            zf.writestr(f'ppt/slides/_rels/slide{i + 1}.xml.rels', _relationships([
+                ('rId1', 'slideLayout', '../slideLayouts/slideLayout1.xml'),
+            ]))
+
+
+_OFFICE_WRITERS = {'docx': write_docx, 'xlsx': write_xlsx, 'pptx': write_pptx}
+
+
+def generate_corpus(directory: str, scale: float = 1.0, seed: int = 0,
+                    kinds: tuple = ('image', 'office')) -> List[Dict[str, object]]:
+    """
+    コーパスを生成
+
+    Args:
+        directory: 出力先ディレクトリ
+        scale: 画像の辺の長さ・Officeファイルの量に掛ける倍率
+        seed: 乱数のシード
+        kinds: 生成する種類（'image', 'office'）
+
+    Returns:
+        List[Dict]: 生成したファイル（name, kind, path, bytes）
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+
+    if 'image' in kinds:
+        for spec in IMAGE_SPECS:
+            name, _, _, _, image_format, options = spec
+            path = os.path.join(directory, name)
+            image = _draw_image(spec, scale, rng)
+            image.save(path, image_format, **options)
+            image.close()
+            corpus.append({'name': name, 'kind': 'image', 'path': path, 'bytes': os.path.getsize(path)})
+
+    if 'office' in kinds:
+        for (extension, size), amount in OFFICE_SPECS.items():
+            name = f"{size}.{extension}"
+            path = os.path.join(directory, name)
+            _OFFICE_WRITERS[extension](path, max(1, int(amount * scale)), rng)
+            corpus.append({'name': name, 'kind': 'office', 'path': path, 'bytes': os.path.getsize(path)})
+
+    return corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成コーパスを生成")
+    parser.add_argument('directory', help="出力先ディレクトリ")
+    parser.add_argument('--scale', type=float, default=1.0, help="画像サイズ・Officeファイルの量の倍率")
+    parser.add_argument('--seed', type=int, default=0, help="乱数のシード")
+    args = parser.parse_args()
+
+    for item in generate_corpus(args.directory, args.scale, args.seed):
+        print(f"{item['kind']:<8}{item['name']:<28}{item['bytes'] / 1024:>10.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
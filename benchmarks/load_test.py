@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP APIの負荷試験
+
+app/api_server.py を別プロセスで起動し、合成コーパスのファイルを指定した並列数で
+/api/convert/office・/api/convert/image に送信して、並列数ごとに
+スループット・レイテンシ（p50/p95/p99）・サーバーのピークRSS・出力サイズを計測します。
+
+並列数ごとにサーバーを起動し直すため、ピークRSSは並列数ごとの値になります。
+--url を指定した場合は起動済みのサーバーに送信します（ピークRSSは計測しません）。
+
+使い方:
+    python -m benchmarks.load_test --concurrency 1,4,8 --requests 40 --json load.json
+"""
+
+import argparse
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (  # noqa: E402
+    REPO_ROOT, configure_environment, environment_info, peak_rss_kb, resolve_soffice, summarize_latencies,
+    write_results
+)
+from benchmarks.corpus import generate_corpus  # noqa: E402
+
+ENDPOINTS = {'image': '/api/convert/image', 'office': '/api/convert/office'}
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServerProcess:
+    """計測対象のAPIサーバー（別プロセス）"""
+
+    def __init__(self, work_dir: str, env: Dict[str, str]):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.work_dir = work_dir
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+        self._peak_rss_kb: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self, timeout: float = 60) -> None:
+        env = {**os.environ, **self.env, 'PYTHONPATH': REPO_ROOT}
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.serve', '--port', str(self.port)],
+            cwd=self.work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("APIサーバーの起動に失敗しました")
+            try:
+                if requests.get(f"{self.url}/api/health", timeout=2).ok:
+                    break
+            except requests.RequestException:
+                time.sleep(0.2)
+        else:
+            self.stop()
+            raise RuntimeError("APIサーバーの起動がタイムアウトしました")
+
+        self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+        self._sampler.start()
+
+    def _sample_rss(self) -> None:
+        # VmHWM はプロセスの生存中しか読めないため、定期的に取得しておく
+        while not self._stop_event.wait(0.5):
+            self._record_rss()
+
+    def _record_rss(self) -> None:
+        try:
+            value = peak_rss_kb(self.process.pid)
+        except OSError:
+            return
+        if value is not None:
+            self._peak_rss_kb = max(self._peak_rss_kb or 0, value)
+
+    @property
+    def peak_rss_kb(self) -> Optional[int]:
+        return self._peak_rss_kb
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self.process is None:
+            return
+        self._record_rss()
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def _send(session_factory, url: str, item: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """1件のファイルを送信してレイテンシと結果を記録"""
+    session = session_factory()
+    started = time.perf_counter()
+    try:
+        with open(item['path'], 'rb') as f:
+            response = session.post(
+                f"{url}{ENDPOINTS[item['kind']]}", files={'file': (item['name'], f)}, timeout=timeout
+            )
+        body = response.content
+        ok = response.status_code == 200
+        error = None if ok else f"HTTP {response.status_code}"
+    except requests.RequestException as e:
+        body = b''
+        ok = False
+        error = str(e)
+    return {
+        'name': item['name'],
+        'latency_ms': (time.perf_counter() - started) * 1000,
+        'ok': ok,
+        'error': error,
+        'input_bytes': item['bytes'],
+        'output_bytes': len(body),
+    }
+
+
+def run_level(url: str, corpus: List[Dict[str, Any]], concurrency: int, total_requests: int,
+              timeout: float) -> Dict[str, Any]:
+    """1つの並列数で total_requests 件を送信"""
+    local = threading.local()
+
+    def session_factory():
+        # スレッドごとにコネクションを再利用する
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    items = list(itertools.islice(itertools.cycle(corpus), total_requests))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(lambda item: _send(session_factory, url, item, timeout), items))
+    elapsed = time.perf_counter() - started
+
+    succeeded = [sample for sample in samples if sample['ok']]
+    errors: Dict[str, int] = {}
+    for sample in samples:
+        if not sample['ok']:
+            errors[sample['error']] = errors.get(sample['error'], 0) + 1
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'succeeded': len(succeeded),
+        'failed': len(samples) - len(succeeded),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(succeeded) / elapsed, 2) if elapsed > 0 else 0.0,
+        'input_bytes': sum(sample['input_bytes'] for sample in samples),
+        'output_bytes': sum(sample['output_bytes'] for sample in succeeded),
+        'latency': summarize_latencies([sample['latency_ms'] for sample in succeeded]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP APIの負荷試験")
+    parser.add_argument('--concurrency', default='1,4,8', help="並列数（カンマ区切りで複数指定）")
+    parser.add_argument('--requests', type=int, default=40, help="並列数ごとのリクエスト数")
+    parser.add_argument('--scale', type=float, default=0.5, help="コーパスの規模の倍率")
+    parser.add_argument('--kinds', default='image,office', help="送信する種類（image, office）")
+    parser.add_argument('--soffice', choices=('auto', 'stub', 'system'), default='auto',
+                        help="使用するsoffice（auto: 見つからなければスタブ）")
+    parser.add_argument('--url', help="起動済みのサーバーのURL（指定しない場合は自動で起動）")
+    parser.add_argument('--timeout', type=float, default=600, help="リクエストのタイムアウト（秒）")
+    parser.add_argument('--json', dest='json_path', help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    levels = [int(value) for value in args.concurrency.split(',') if value.strip()]
+    kinds = tuple(kind.strip() for kind in args.kinds.split(',') if kind.strip())
+    soffice = None if args.url else resolve_soffice(args.soffice)
+    if args.url is None and soffice is None:
+        parser.error("LibreOffice（soffice）が見つかりません")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='any2pdf_load_') as work_dir:
+        corpus = generate_corpus(os.path.join(work_dir, 'corpus'), args.scale, kinds=kinds)
+        env = configure_environment(work_dir, soffice) if soffice else {}
+
+        for concurrency in levels:
+            server = None
+            url = args.url
+            if url is None:
+                server = ServerProcess(work_dir, env)
+                server.start()
+                url = server.url
+            try:
+                result = run_level(url, corpus, concurrency, args.requests, args.timeout)
+            finally:
+                if server is not None:
+                    server.stop()
+            result['server_peak_rss_kb'] = server.peak_rss_kb if server is not None else None
+            results.append(result)
+
+            latency = result['latency']
+            rss = result['server_peak_rss_kb']
+            print(f"concurrency={concurrency:<4} ok={result['succeeded']}/{result['requests']}  "
+                  f"{result['throughput_rps']:.2f} req/s  p50={latency['p50_ms']:.0f}ms "
+                  f"p95={latency['p95_ms']:.0f}ms p99={latency['p99_ms']:.0f}ms  "
+                  f"out={result['output_bytes'] / 1024 / 1024:.1f}MB  "
+                  f"rss={(rss / 1024) if rss else 0:.0f}MB")
+
+    if args.json_path:
+        write_results(args.json_path, {
+            'benchmark': 'load_test',
+            'environment': environment_info(soffice),
+            'parameters': {
+                'concurrency': levels, 'requests': args.requests, 'scale': args.scale,
+                'kinds': list(kinds), 'url': args.url,
+            },
+            'corpus': [{'name': item['name'], 'kind': item['kind'], 'bytes': item['bytes']} for item in corpus],
+            'results': results,
+        })
+
+
+if __name__ == '__main__':
+    main()
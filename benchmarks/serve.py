@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+負荷試験用のAPIサーバー起動スクリプト
+
+app/api_server.py のアプリケーションを、デバッグ・リローダー無しのマルチスレッドWSGIサーバーで起動します。
+環境変数は benchmarks.common.configure_environment で設定済みであることを前提とします。
+
+使い方:
+    python -m benchmarks.serve --port 5050
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="負荷試験用のAPIサーバー")
+    parser.add_argument('--host', default='127.0.0.1', help="待ち受けるホスト")
+    parser.add_argument('--port', type=int, default=5050, help="待ち受けるポート")
+    args = parser.parse_args()
+
+    from app.api_server import app
+
+    # リクエストごとのアクセスログは計測の妨げになるため抑制する
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    server = make_server(args.host, args.port, app, threaded=True)
+    print(f"ready http://{args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用の soffice スタブ
+
+LibreOfficeが無い環境でもベンチマークを実行できるよう、
+`soffice --headless --convert-to pdf --outdir <dir> <files...>` と同じ引数を受け付け、
+入力ファイルごとに <dir>/<ファイル名>.pdf を出力します。
+
+出力は1ページの有効なPDFで、入力と同じサイズのストリームを含みます。
+変換にかかる時間は次の環境変数で模擬できます:
+    ANY2PDF_STUB_DELAY         ファイルごとの固定の待ち時間（秒、既定 0.05）
+    ANY2PDF_STUB_DELAY_PER_MB  入力1MBあたりの追加の待ち時間（秒、既定 0.02）
+"""
+
+import os
+import sys
+import time
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def build_pdf(title: str, payload: bytes) -> bytes:
+    """タイトルを1行表示するページと、payload をそのまま格納したストリームを持つPDFを作成"""
+    safe_title = title.encode('ascii', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+    content = b"BT /F1 12 Tf 72 770 Td (" + safe_title + b") Tj ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(content)).encode() + b" >>\nstream\n" + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length " + str(len(payload)).encode() + b" >>\nstream\n" + payload + b"\nendstream",
+    ]
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += str(number).encode() + b" 0 obj\n" + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 " + str(len(objects) + 1).encode() + b"\n0000000000 65535 f \n"
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += b"trailer\n<< /Size " + str(len(objects) + 1).encode() + b" /Root 1 0 R >>\n"
+    output += b"startxref\n" + str(xref_offset).encode() + b"\n%%EOF\n"
+    return bytes(output)
+
+
+def main(argv) -> int:
+    if '--outdir' not in argv:
+        print("--outdir が指定されていません", file=sys.stderr)
+        return 1
+    output_dir = argv[argv.index('--outdir') + 1]
+
+    inputs = []
+    skip_next = False
+    for arg in argv:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg in ('--outdir', '--convert-to'):
+            skip_next = True
+            continue
+        if arg.startswith('-'):
+            continue
+        inputs.append(arg)
+
+    delay = _float_env('ANY2PDF_STUB_DELAY', 0.05)
+    delay_per_mb = _float_env('ANY2PDF_STUB_DELAY_PER_MB', 0.02)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for path in inputs:
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except OSError as e:
+            print(f"入力ファイルを読み込めません: {path}: {e}", file=sys.stderr)
+            continue
+        time.sleep(delay + delay_per_mb * len(payload) / (1024 * 1024))
+        base_name = os.path.splitext(os.path.basename(path))[0]
+        with open(os.path.join(output_dir, base_name + '.pdf'), 'wb') as f:
+            f.write(build_pdf(os.path.basename(path), payload))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -5,47 +5,95 @@ PDF変換APIサーバー起動スクリプト
 
 このスクリプトはFlaskベースのRESTful APIサーバーを起動します。
 Officeファイルと画像ファイルをPDFに変換する機能を提供します。
+
+--server asgi を指定すると、FastAPI/uvicornによる本番モードで起動します。
+    python run_api_server.py --server asgi --workers 4
 """
 
 import os
 import sys
+import argparse
 import logging
-from app.api_server import app
+from app import config
+from app.logging_setup import setup_logging
+from app.office_pool import get_office_pool
+from app.storage import start_storage_janitor
 
 # ログ設定
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
+def parse_args():
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description="PDF変換APIサーバー")
+    parser.add_argument('--server', choices=('flask', 'asgi'), default='flask',
+                        help="flask: 開発用サーバー / asgi: FastAPI+uvicornによる本番モード")
+    parser.add_argument('--host', default='0.0.0.0', help="待ち受けるホスト")
+    parser.add_argument('--port', type=int, default=5000, help="待ち受けるポート")
+    parser.add_argument('--workers', type=int, default=config.ASGI_WORKERS,
+                        help="ASGIモードのワーカープロセス数（ANY2PDF_ASGI_WORKERS）")
+    return parser.parse_args()
+
+
 def main():
     """
     APIサーバーのメイン起動関数
     """
+    args = parse_args()
     try:
         # 必要なディレクトリを作成
-        os.makedirs('uploads', exist_ok=True)
-        os.makedirs('output', exist_ok=True)
-        
+        os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
+        os.makedirs(config.OUTPUT_FOLDER, exist_ok=True)
+
         logger.info("=" * 50)
         logger.info("PDF変換APIサーバーを起動しています...")
         logger.info("=" * 50)
         logger.info("利用可能なエンドポイント:")
         logger.info("  GET  /api/health          - ヘルスチェック")
+        logger.info("  GET  /api/metrics         - メトリクス（Prometheus形式）")
         logger.info("  POST /api/convert/office  - Officeファイル変換")
+        logger.info("  POST /api/convert/office/batch - Officeファイル一括変換")
         logger.info("  POST /api/convert/image   - 画像ファイル変換")
-        logger.info("  GET  /api/download/<id>   - PDFダウンロード")
+        logger.info("  POST /api/convert/images  - 複数画像を1つのPDFに変換")
+        if args.server == 'flask':
+            # ジョブはプロセス内で管理するため、Flaskモードでのみ提供する
+            logger.info("  POST /api/jobs/office     - Officeファイル非同期変換")
+            logger.info("  POST /api/jobs/image      - 画像ファイル非同期変換")
+            logger.info("  GET  /api/jobs/<id>       - ジョブ状態確認")
+            logger.info("  GET  /api/jobs/<id>/result - 変換結果ダウンロード")
         logger.info("=" * 50)
-        logger.info("サーバーURL: http://localhost:5000")
+        logger.info(f"サーバーURL: http://localhost:{args.port}")
         logger.info("停止するには Ctrl+C を押してください")
         logger.info("=" * 50)
-        
+
+        if args.server == 'asgi':
+            # ASGIアプリケーションを起動（プール・ジャニターは各ワーカープロセスで起動する）
+            import uvicorn
+            logger.info(f"ASGIモードで起動します (workers={args.workers})")
+            if args.workers > 1:
+                # 同じログファイルを複数のプロセスでローテーションしないよう、ワーカープロセスごとに分ける
+                # （--workers で指定された場合も、起動するワーカープロセスに環境変数で引き継ぐ）
+                os.environ['ANY2PDF_LOG_FILE_PER_PROCESS'] = '1'
+            uvicorn.run(
+                'app.asgi_server:app',
+                host=args.host,
+                port=args.port,
+                workers=max(1, args.workers)
+            )
+            return
+
+        # LibreOfficeワーカープールを事前に起動
+        get_office_pool()
+
+        # uploads/・output/ のジャニターを開始
+        start_storage_janitor()
+
         # Flaskアプリケーションを起動
+        from app.api_server import app
         app.run(
-            host='0.0.0.0',
-            port=5000,
+            host=args.host,
+            port=args.port,
             debug=True,
             use_reloader=False  # 重複起動を防ぐ
         )